@@ -0,0 +1,281 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from metrics import metrics
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Lower value = served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 1
+
+# (user or session key, priority) of the request the current task is serving
+_request_identity: ContextVar[Tuple[str, int]] = ContextVar(
+    "llm_request_identity", default=("anonymous", PRIORITY_INTERACTIVE)
+)
+
+
+@contextmanager
+def llm_request_context(user: Optional[str], priority: int = PRIORITY_INTERACTIVE):
+    """Attribute LLM calls made inside the block to user at the given priority."""
+    token = _request_identity.set((user or "anonymous", priority))
+    try:
+        yield
+    finally:
+        _request_identity.reset(token)
+
+
+def current_request_identity() -> Tuple[str, int]:
+    """(user, priority) set by the innermost llm_request_context."""
+    return _request_identity.get()
+
+
+class AdmissionRejected(RuntimeError):
+    """The LLM queue is full or the wait exceeded the queue timeout."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Ticket:
+    __slots__ = ("user", "priority", "tokens", "future")
+
+    def __init__(self, user: str, priority: int, tokens: int):
+        self.user = user
+        self.priority = priority
+        self.tokens = tokens
+        self.future: Future = Future()
+
+
+class AdmissionController:
+    """
+    Admission layer in front of every LLM call in this process: at most
+    max_concurrency calls run at once and, if tokens_per_minute is set, the
+    estimated tokens admitted per minute stay within that budget (token
+    bucket). Calls over the limit wait in a priority queue; within a
+    priority, users are served round-robin so one user's burst cannot starve
+    the others. When max_queue calls are already waiting, new calls are
+    rejected immediately, and calls that wait longer than queue_timeout are
+    rejected too.
+
+    Configured with MEDBOT_LLM_MAX_CONCURRENCY, MEDBOT_LLM_TOKENS_PER_MINUTE
+    (0 = no budget), MEDBOT_LLM_MAX_QUEUE and MEDBOT_LLM_QUEUE_TIMEOUT.
+    """
+
+    # Retry-After suggested to callers rejected because the queue is full
+    REJECT_RETRY_AFTER = 2.0
+
+    def __init__(self,
+                 max_concurrency: int = None,
+                 tokens_per_minute: int = None,
+                 max_queue: int = None,
+                 queue_timeout: float = None):
+        self.max_concurrency = max_concurrency or int(os.getenv('MEDBOT_LLM_MAX_CONCURRENCY', '16'))
+        self.tokens_per_minute = tokens_per_minute if tokens_per_minute is not None else int(
+            os.getenv('MEDBOT_LLM_TOKENS_PER_MINUTE', '0'))
+        self.max_queue = max_queue if max_queue is not None else int(os.getenv('MEDBOT_LLM_MAX_QUEUE', '64'))
+        self.queue_timeout = queue_timeout or float(os.getenv('MEDBOT_LLM_QUEUE_TIMEOUT', '30'))
+        self._in_flight = 0
+        self._queued = 0
+        # priority -> user -> waiting tickets; users rotate to the back after each grant
+        self._queues: Dict[int, "OrderedDict[str, Deque[_Ticket]]"] = {}
+        self._tokens = float(self.tokens_per_minute)
+        self._refilled_at = time.monotonic()
+        self._refill_timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+
+    # -- token bucket (callers hold self._lock) --
+
+    def _refill(self):
+        if not self.tokens_per_minute:
+            return
+        now = time.monotonic()
+        self._tokens = min(self.tokens_per_minute,
+                           self._tokens + (now - self._refilled_at) * self.tokens_per_minute / 60)
+        self._refilled_at = now
+
+    def _cost(self, tokens: int) -> int:
+        # A single call larger than the whole budget still has to get through eventually
+        return min(tokens, self.tokens_per_minute) if self.tokens_per_minute else 0
+
+    def _can_start(self, tokens: int) -> bool:
+        return self._in_flight < self.max_concurrency and self._tokens >= self._cost(tokens)
+
+    def _start(self, tokens: int):
+        self._in_flight += 1
+        self._tokens -= self._cost(tokens)
+
+    def _schedule_refill(self, tokens: int):
+        if self._refill_timer is not None:
+            return
+        delay = (self._cost(tokens) - self._tokens) * 60 / self.tokens_per_minute
+        self._refill_timer = threading.Timer(max(delay, 0.01), self._on_refill)
+        self._refill_timer.daemon = True
+        self._refill_timer.start()
+
+    def _on_refill(self):
+        with self._lock:
+            self._refill_timer = None
+        self._dispatch()
+
+    # -- queue --
+
+    def _head(self) -> Optional[_Ticket]:
+        for priority in sorted(self._queues):
+            users = self._queues[priority]
+            if users:
+                return next(iter(users.values()))[0]
+        return None
+
+    def _pop(self, ticket: _Ticket):
+        users = self._queues[ticket.priority]
+        waiting = users[ticket.user]
+        waiting.popleft()
+        if waiting:
+            users.move_to_end(ticket.user)
+        else:
+            del users[ticket.user]
+        self._queued -= 1
+
+    def _remove(self, ticket: _Ticket):
+        waiting = self._queues.get(ticket.priority, {}).get(ticket.user)
+        if waiting and ticket in waiting:
+            waiting.remove(ticket)
+            if not waiting:
+                del self._queues[ticket.priority][ticket.user]
+            self._queued -= 1
+
+    def _update_gauges(self):
+        metrics.set_gauge("llm.admission.in_flight", self._in_flight)
+        metrics.set_gauge("llm.admission.queue_depth", self._queued)
+
+    def _submit(self, tokens: int) -> Optional[_Ticket]:
+        """Start the call now (None) or queue it (ticket to wait on)."""
+        user, priority = current_request_identity()
+        with self._lock:
+            self._refill()
+            if not self._queued and self._can_start(tokens):
+                self._start(tokens)
+                self._update_gauges()
+                return None
+            if self._queued >= self.max_queue:
+                metrics.increment("llm.admission.rejected.queue_full")
+                raise AdmissionRejected(f"LLM queue is full ({self._queued} waiting)", self.REJECT_RETRY_AFTER)
+            ticket = _Ticket(user, priority, tokens)
+            self._queues.setdefault(priority, OrderedDict()).setdefault(user, deque()).append(ticket)
+            self._queued += 1
+            metrics.increment("llm.admission.queued")
+            self._update_gauges()
+        # Waiting only on the token budget: make sure a refill will wake the queue
+        self._dispatch()
+        return ticket
+
+    def _dispatch(self):
+        with self._lock:
+            self._refill()
+            while self._queued:
+                ticket = self._head()
+                if not self._can_start(ticket.tokens):
+                    if self._in_flight < self.max_concurrency:
+                        self._schedule_refill(ticket.tokens)
+                    break
+                self._pop(ticket)
+                if ticket.future.set_running_or_notify_cancel():
+                    self._start(ticket.tokens)
+                    ticket.future.set_result(True)
+            self._update_gauges()
+
+    def _abandon(self, ticket: _Ticket):
+        """A waiter gave up (timeout or cancellation): dequeue it, or free the slot it was just granted."""
+        granted = False
+        with self._lock:
+            if ticket.future.cancel():
+                self._remove(ticket)
+            elif ticket.future.done() and not ticket.future.cancelled():
+                granted = True
+            self._update_gauges()
+        if granted:
+            self._release()
+
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
+        self._dispatch()
+
+    def _admitted(self, started: float):
+        metrics.increment("llm.admission.admitted")
+        metrics.observe("llm.admission.wait_ms", (time.monotonic() - started) * 1000)
+
+    def _timed_out(self, ticket: _Ticket):
+        self._abandon(ticket)
+        metrics.increment("llm.admission.rejected.timeout")
+        raise AdmissionRejected(f"Waited more than {self.queue_timeout:g}s for an LLM slot", self.REJECT_RETRY_AFTER)
+
+    @contextmanager
+    def acquire(self, tokens: int = 0):
+        """Hold an LLM slot (and tokens from the budget) for the duration of the block."""
+        started = time.monotonic()
+        ticket = self._submit(tokens)
+        if ticket is not None:
+            try:
+                ticket.future.result(timeout=self.queue_timeout)
+            except FutureTimeoutError:
+                self._timed_out(ticket)
+            except BaseException:
+                self._abandon(ticket)
+                raise
+        self._admitted(started)
+        try:
+            yield
+        finally:
+            self._release()
+
+    @asynccontextmanager
+    async def aacquire(self, tokens: int = 0):
+        """Async version of acquire; waiting does not block the event loop."""
+        started = time.monotonic()
+        ticket = self._submit(tokens)
+        if ticket is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(ticket.future)), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self._timed_out(ticket)
+            except BaseException:
+                self._abandon(ticket)
+                raise
+        self._admitted(started)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def get_status(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refill()
+            queued_by_priority = {
+                priority: sum(len(waiting) for waiting in users.values())
+                for priority, users in self._queues.items() if users
+            }
+            waiting_users = len({user for users in self._queues.values() for user in users})
+            return {
+                "max_concurrency": self.max_concurrency,
+                "in_flight": self._in_flight,
+                "queued": self._queued,
+                "queued_by_priority": queued_by_priority,
+                "waiting_users": waiting_users,
+                "max_queue": self.max_queue,
+                "queue_timeout": self.queue_timeout,
+                "tokens_per_minute": self.tokens_per_minute or None,
+                "tokens_available": int(self._tokens) if self.tokens_per_minute else None,
+            }
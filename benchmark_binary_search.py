@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Binary Prefilter Search Benchmark
+Compares brute-force float32 cosine search with the Hamming prefilter +
+float re-ranking used by EmbeddingSystem's 'binary' search mode: latency,
+bytes of index memory touched per query, effective memory bandwidth and
+recall against the exact result.
+"""
+
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from binary_index import BinaryIndex
+from evaluate_projection import load_knowledge_base_vectors, make_synthetic_vectors, normalize, recall_at_k
+
+
+def brute_force(corpus: np.ndarray, queries: np.ndarray, k: int):
+    k = min(k, len(corpus))
+    results = []
+    start = time.perf_counter()
+    for query in queries:
+        scores = corpus @ query
+        top = np.argpartition(-scores, k - 1)[:k]
+        results.append(top[np.argsort(-scores[top])])
+    return np.array(results), (time.perf_counter() - start) / len(queries)
+
+
+def binary_prefilter(index: BinaryIndex, queries: np.ndarray, k: int, candidates: int):
+    row_of = {chunk_id: row for row, chunk_id in enumerate(index.ids)}
+    results = []
+    start = time.perf_counter()
+    for query in queries:
+        hits = index.search(query, k, candidates)
+        results.append([row_of[chunk_id] for chunk_id, _ in hits])
+    return np.array(results), (time.perf_counter() - start) / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark binary Hamming prefilter against float search")
+    parser.add_argument("--vectors", type=int, default=200_000, help="Synthetic corpus size")
+    parser.add_argument("--dim", type=int, default=384, help="Synthetic vector dimension")
+    parser.add_argument("--queries", type=int, default=100, help="Synthetic query count")
+    parser.add_argument("--k", type=int, default=5, help="Results per query")
+    parser.add_argument("--candidates", type=int, nargs="+", default=[64, 128, 256, 512, 1024],
+                        help="Prefilter candidate counts to evaluate")
+    parser.add_argument("--from-knowledge-base", action="store_true",
+                        help="Use the stored knowledge base vectors instead of synthetic data")
+    args = parser.parse_args()
+
+    print("MedBot - Binary Prefilter Search Benchmark")
+    print("=" * 72)
+
+    if args.from_knowledge_base:
+        corpus, queries = load_knowledge_base_vectors()
+    else:
+        corpus, queries = make_synthetic_vectors(args.vectors, args.queries, args.dim)
+    corpus = normalize(corpus.astype(np.float32))
+    queries = normalize(queries.astype(np.float32))
+    n, dim = corpus.shape
+    print(f"Corpus: {n:,} x {dim} float32 ({corpus.nbytes / 2**20:,.1f} MiB), queries: {len(queries)}")
+
+    truth, float_s = brute_force(corpus, queries, args.k)
+    float_bytes = corpus.nbytes
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = BinaryIndex(tmp)
+        index.add([str(i) for i in range(n)], corpus)
+        index.save()
+        code_bytes = index.codes.nbytes
+        print(f"Packed codes: {code_bytes / 2**20:,.1f} MiB ({float_bytes / code_bytes:.0f}x smaller)")
+
+        print("-" * 72)
+        print(f"{'Mode':<18}{'ms/query':>10}{'MiB/query':>11}{'GiB/s':>8}{f'Recall@{args.k}':>11}{'Speedup':>10}")
+        print(f"{'float brute force':<18}{float_s * 1000:>10.3f}{float_bytes / 2**20:>11.2f}"
+              f"{float_bytes / float_s / 2**30:>8.1f}{1.0:>11.3f}{1.0:>9.1f}x")
+
+        for candidates in args.candidates:
+            found, binary_s = binary_prefilter(index, queries, args.k, candidates)
+            touched = code_bytes + min(candidates, n) * dim * 4
+            label = f"binary top-{candidates}"
+            print(f"{label:<18}{binary_s * 1000:>10.3f}{touched / 2**20:>11.2f}"
+                  f"{touched / binary_s / 2**30:>8.1f}{recall_at_k(found, truth):>11.3f}{float_s / binary_s:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
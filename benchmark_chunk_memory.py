@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Chunk Metadata Memory Benchmark
+Compares the memory footprint of the legacy list-of-dicts chunk format with
+the columnar ChunkStore used by PDFProcessor and EmbeddingSystem.
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+
+from chunk_records import ChunkStore
+
+SAMPLE_SENTENCE = "Hypertension is a chronic condition in which blood pressure is persistently elevated. "
+
+
+def make_content(i: int, chunk_chars: int) -> str:
+    """Build a fresh chunk string so both formats pay for their own text."""
+    body = (SAMPLE_SENTENCE * (chunk_chars // len(SAMPLE_SENTENCE) + 1))[:chunk_chars - 12]
+    return f"{body} [{i:09d}]"
+
+
+def build_dict_chunks(num_chunks: int, num_sources: int, chunk_chars: int):
+    """Chunks as produced before ChunkStore: one dict of strings per chunk."""
+    sources = [f"medical_textbook_{s:03d}.pdf" for s in range(num_sources)]
+    chunks = []
+    for i in range(num_chunks):
+        source = sources[i % num_sources]
+        content = make_content(i, chunk_chars)
+        chunks.append({
+            'id': f"{source}_chunk_{i // num_sources}",
+            'content': content,
+            'source': source,
+            'chunk_size': len(content)
+        })
+    return chunks
+
+
+def build_chunk_store(num_chunks: int, num_sources: int, chunk_chars: int):
+    """Same chunks stored in the columnar ChunkStore."""
+    sources = [f"medical_textbook_{s:03d}.pdf" for s in range(num_sources)]
+    store = ChunkStore()
+    for i in range(num_chunks):
+        source = sources[i % num_sources]
+        store.add(source, make_content(i, chunk_chars), i // num_sources)
+    return store
+
+
+def measure(builder, *args):
+    """Return (retained bytes, peak bytes, seconds) for building a chunk collection."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = builder(*args)
+    elapsed = time.perf_counter() - start
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    gc.collect()
+    return retained, peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark chunk metadata memory usage")
+    parser.add_argument("--chunks", type=int, default=200_000, help="Number of chunks to build")
+    parser.add_argument("--sources", type=int, default=40, help="Number of distinct source documents")
+    parser.add_argument("--chunk-chars", type=int, default=800, help="Characters per chunk")
+    args = parser.parse_args()
+
+    print("MedBot - Chunk Metadata Memory Benchmark")
+    print("=" * 60)
+    print(f"Chunks: {args.chunks:,}  Sources: {args.sources}  Chunk size: {args.chunk_chars} chars")
+
+    text_bytes = measure(lambda: [make_content(i, args.chunk_chars) for i in range(args.chunks)])[0]
+
+    results = {
+        "list of dicts": measure(build_dict_chunks, args.chunks, args.sources, args.chunk_chars),
+        "ChunkStore": measure(build_chunk_store, args.chunks, args.sources, args.chunk_chars),
+    }
+
+    print(f"\nChunk text alone: {text_bytes / 2**20:,.1f} MiB")
+    print("-" * 60)
+    print(f"{'Format':<16}{'Retained MiB':>14}{'Peak MiB':>12}{'Overhead B/chunk':>18}{'Build s':>10}")
+    for name, (retained, peak, elapsed) in results.items():
+        overhead = (retained - text_bytes) / args.chunks
+        print(f"{name:<16}{retained / 2**20:>14,.1f}{peak / 2**20:>12,.1f}{overhead:>18,.0f}{elapsed:>10.2f}")
+
+    dict_overhead = results["list of dicts"][0] - text_bytes
+    store_overhead = results["ChunkStore"][0] - text_bytes
+    if store_overhead > 0:
+        print(f"\nMetadata overhead reduced {dict_overhead / store_overhead:.1f}x "
+              f"({(dict_overhead - store_overhead) / 2**20:,.1f} MiB saved)")
+
+
+if __name__ == "__main__":
+    main()
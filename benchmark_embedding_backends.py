@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Embedding Backend Benchmark
+Measures load time, encode throughput and embedding drift of each CPU
+inference backend for the embedding model, and recommends the fastest one
+whose embeddings stay close enough to the float32 reference model.
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Benchmark bundled models without hub lookups when MEDBOT_OFFLINE is set
+from model_bundle import apply_offline_mode
+apply_offline_mode()
+
+from embedding_backends import BACKENDS, backend_available, embedding_drift, load_sentence_transformer
+
+SAMPLE_TEXTS = [
+    "Hypertension is defined as a systolic blood pressure of 140 mmHg or higher.",
+    "Type 2 diabetes mellitus is managed with lifestyle changes and metformin as first-line therapy.",
+    "Tuberculosis is transmitted through airborne droplets from patients with active pulmonary disease.",
+    "Levothyroxine is the standard treatment for primary hypothyroidism.",
+    "Preeclampsia presents with new-onset hypertension and proteinuria after 20 weeks of gestation.",
+    "Methadone maintenance therapy reduces illicit opioid use and transmission of HIV.",
+    "Burns should be cooled with running water for at least 20 minutes.",
+    "HER2-positive breast tumours respond to trastuzumab-based regimens.",
+    "Tacrolimus monotherapy is used for immunosuppression after paediatric heart transplantation.",
+    "Foodborne illness is commonly caused by Salmonella, Campylobacter and norovirus.",
+    "Inhalational anaesthetics such as isoflurane are used to maintain general anaesthesia.",
+    "Atopic dermatitis is a chronic relapsing inflammatory skin disease.",
+    "Low-dose CT screening reduces lung cancer mortality in high-risk smokers.",
+    "Circulating SIGLEC6 levels are elevated in women with preeclampsia.",
+    "Cardiopulmonary resuscitation starts with chest compressions at 100 to 120 per minute.",
+    "Urinary nephrin is a marker of podocyte injury.",
+]
+
+
+def load_texts(path: str):
+    if path:
+        return [line.strip() for line in Path(path).read_text(encoding="utf-8").splitlines() if line.strip()]
+    return SAMPLE_TEXTS
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CPU inference backends for the embedding model")
+    parser.add_argument("--model", default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--texts", help="File with one text per line (default: built-in medical sentences)")
+    parser.add_argument("--count", type=int, default=1024, help="Number of texts to encode per backend")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--min-cosine", type=float, default=0.98,
+                        help="Minimum per-text cosine to the reference model for a backend to be deployable")
+    args = parser.parse_args()
+
+    print("MedBot - Embedding Backend Benchmark")
+    print("=" * 78)
+    unique_texts = load_texts(args.texts)
+    # Repeat the sample to a fixed workload; drift is measured on the unique texts only
+    texts = [unique_texts[i % len(unique_texts)] for i in range(max(args.count, len(unique_texts)))]
+    print(f"Model: {args.model}  Texts: {len(texts)}  Batch size: {args.batch_size}")
+
+    reference = None
+    results = []
+    for backend in ["torch"] + [b for b in args.backends if b != "torch"]:
+        if not backend_available(backend):
+            print(f"{backend:<10} skipped (runtime not installed)")
+            continue
+
+        start = time.perf_counter()
+        model, effective = load_sentence_transformer(args.model, backend)
+        load_s = time.perf_counter() - start
+
+        # Warm-up pass so one-time graph setup is not counted as throughput
+        model.encode(texts[:args.batch_size], batch_size=args.batch_size)
+        start = time.perf_counter()
+        embeddings = np.asarray(model.encode(texts, batch_size=args.batch_size, convert_to_numpy=True), dtype=np.float32)
+        encode_s = time.perf_counter() - start
+
+        if reference is None:
+            reference = embeddings[:len(unique_texts)]
+        drift = embedding_drift(reference, embeddings[:len(unique_texts)])
+        results.append((effective, load_s, len(texts) / encode_s, drift))
+
+    print("-" * 78)
+    print(f"{'Backend':<10}{'Load s':>8}{'Texts/s':>10}{'Speedup':>9}{'Mean cos':>10}{'Min cos':>10}{'NN agree':>10}  Verdict")
+    base_rate = results[0][2] if results else 1.0
+    best = None
+    for backend, load_s, rate, drift in results:
+        ok = drift["min_cosine"] >= args.min_cosine
+        if ok and (best is None or rate > best[1]):
+            best = (backend, rate)
+        print(f"{backend:<10}{load_s:>8.2f}{rate:>10.1f}{rate / base_rate:>8.2f}x{drift['mean_cosine']:>10.4f}"
+              f"{drift['min_cosine']:>10.4f}{drift['neighbour_agreement']:>10.2f}  {'ok' if ok else 'drift too high'}")
+
+    print("-" * 78)
+    if best:
+        print(f"Recommended backend: {best[0]} ({best[1]:.1f} texts/s)")
+        print(f"Deploy with MEDBOT_EMBEDDING_BACKEND={best[0]}")
+
+
+if __name__ == "__main__":
+    main()
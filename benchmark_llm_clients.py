@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+LLM Client Pooling Benchmark
+Measures the per-call overhead of building a new AzureOpenAI client for
+every request (the old LLMProvider behaviour) against the pooled keep-alive
+clients from llm_clients.LLMClientPool, using the local mock LLM server
+(mock_llm_server.py) so the numbers are not dominated by real model latency.
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from llm_clients import AZURE_API_VERSION, LLMClientPool
+from mock_llm_server import MockLLMConfig, start_mock_server
+
+def call(client):
+    client.chat.completions.create(
+        model="gpt-4o",
+        messages=[{"role": "user", "content": "What is hypertension?"}],
+        temperature=0,
+        max_tokens=50
+    )
+
+
+def fresh_client_call(endpoint: str):
+    from openai import AzureOpenAI
+
+    client = AzureOpenAI(api_key="benchmark", azure_endpoint=endpoint, api_version=AZURE_API_VERSION)
+    try:
+        call(client)
+    finally:
+        client.close()
+
+
+def run(label: str, fn, calls: int, concurrency: int):
+    start = time.perf_counter()
+    if concurrency == 1:
+        for _ in range(calls):
+            fn()
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(lambda _: fn(), range(calls)))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28}{concurrency:>6}{elapsed / calls * 1000:>12.2f}{calls / elapsed:>12.1f}")
+    return elapsed / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark fresh vs pooled LLM clients")
+    parser.add_argument("--endpoint", help="Existing Azure-compatible endpoint (default: start the mock LLM server)")
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="Simulated model latency of the mock server")
+    args = parser.parse_args()
+
+    print("MedBot - LLM Client Pooling Benchmark")
+    print("=" * 60)
+
+    server = None
+    endpoint = args.endpoint
+    if not endpoint:
+        server = start_mock_server(MockLLMConfig(ttft_ms=args.latency_ms, tokens_per_second=0, completion_tokens=6))
+        endpoint = server.url
+    print(f"Endpoint: {endpoint}  Calls per run: {args.calls}")
+
+    os.environ.setdefault("AZURE_OPENAI_API_KEY", "benchmark")
+    os.environ["ENDPOINT_URL"] = endpoint
+    pool = LLMClientPool(pool_size=max(args.concurrency))
+    # Warm both paths so imports and the first connection are not counted
+    fresh_client_call(endpoint)
+    call(pool.azure())
+
+    print("-" * 60)
+    print(f"{'Client':<28}{'Threads':>6}{'ms/call':>12}{'calls/s':>12}")
+    for concurrency in args.concurrency:
+        fresh = run("new client per call", lambda: fresh_client_call(endpoint), args.calls, concurrency)
+        pooled = run("pooled keep-alive client", lambda: call(pool.azure()), args.calls, concurrency)
+        print(f"{'  overhead saved per call':<34}{(fresh - pooled) * 1000:>12.2f} ms")
+
+    pool.close()
+    if server:
+        server.shutdown()
+    print("-" * 60)
+    print("Against a remote HTTPS endpoint the saving also includes the TLS handshake per call.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+import json
+import logging
+import shutil
+import threading
+from pathlib import Path
+from typing import List, Optional, Set, Tuple
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Number of set bits in every possible byte, used when np.bitwise_count is unavailable
+_POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def binarize(vectors: np.ndarray) -> np.ndarray:
+    """Sign-binarise vectors and pack 8 dimensions per byte."""
+    return np.packbits(np.asarray(vectors) > 0, axis=-1)
+
+
+def hamming_distances(codes: np.ndarray, query_code: np.ndarray) -> np.ndarray:
+    """Hamming distance between every packed code row and a packed query code."""
+    xor = np.bitwise_xor(codes, query_code)
+    if hasattr(np, "bitwise_count"):
+        if xor.shape[-1] % 8 == 0:
+            # Count 64 bits per operation instead of 8
+            xor = xor.view(np.uint64)
+        counts = np.bitwise_count(xor)
+    else:
+        counts = _POPCOUNT_TABLE[xor]
+    return counts.sum(axis=1, dtype=np.uint32)
+
+
+class BinaryIndex:
+    """
+    Sign-binarised copy of the embedding index for cheap first-stage search.
+
+    Each stored vector is kept twice on disk: as a packed bit code (1 bit per
+    dimension, 32x smaller than float32) and as a normalised float32 row. A
+    query scans only the bit matrix with XOR + popcount to pick a few hundred
+    candidates, then re-scores just those candidates with full cosine
+    similarity. Float rows are memory-mapped, so only the candidate rows are
+    read from memory at query time.
+
+    Ids already in the index are skipped on add, matching Chroma, which
+    ignores duplicate ids. A lock lets searches run while ingestion adds.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.ids: List[str] = []
+        self.codes: Optional[np.ndarray] = None
+        self.vectors: Optional[np.ndarray] = None
+        self._pending_codes: List[np.ndarray] = []
+        self._pending_vectors: List[np.ndarray] = []
+        self._id_set: Set[str] = set()
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    @property
+    def _codes_path(self) -> Path:
+        return self.directory / "codes.npy"
+
+    @property
+    def _vectors_path(self) -> Path:
+        return self.directory / "vectors.npy"
+
+    @property
+    def _ids_path(self) -> Path:
+        return self.directory / "ids.json"
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._ensure_loaded()
+            return len(self.ids)
+
+    def _ensure_loaded(self):
+        # Caller holds self._lock
+        if self._loaded:
+            return
+        self._loaded = True
+        if not self._ids_path.exists():
+            return
+        try:
+            self.ids = json.loads(self._ids_path.read_text(encoding="utf-8"))
+            self.codes = np.load(self._codes_path)
+            self.vectors = np.load(self._vectors_path, mmap_mode="r")
+            self._id_set = set(self.ids)
+            logger.info(f"Loaded binary index with {len(self.ids)} codes from {self.directory}")
+        except Exception as e:
+            logger.error(f"Error loading binary index: {e}")
+            self.ids, self.codes, self.vectors, self._id_set = [], None, None, set()
+
+    def add(self, ids: List[str], vectors: np.ndarray):
+        """Queue a batch of stored vectors (ids already indexed are skipped); call save() once ingestion finishes."""
+        with self._lock:
+            self._ensure_loaded()
+            keep = []
+            for row, chunk_id in enumerate(ids):
+                if chunk_id not in self._id_set:
+                    self._id_set.add(chunk_id)
+                    keep.append(row)
+            if len(keep) < len(ids):
+                logger.info(f"Binary index: skipped {len(ids) - len(keep)} already indexed ids")
+            if not keep:
+                return
+            vectors = np.asarray(vectors, dtype=np.float32)[keep]
+            vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+            self.ids.extend(ids[row] for row in keep)
+            self._pending_codes.append(binarize(vectors))
+            self._pending_vectors.append(vectors)
+
+    def _merge_pending(self):
+        # Caller holds self._lock
+        if not self._pending_codes:
+            return
+        codes = self._pending_codes if self.codes is None else [self.codes] + self._pending_codes
+        vectors = self._pending_vectors if self.vectors is None else [np.asarray(self.vectors)] + self._pending_vectors
+        self.codes = np.concatenate(codes)
+        self.vectors = np.concatenate(vectors)
+        self._pending_codes, self._pending_vectors = [], []
+
+    def save(self):
+        """Merge queued batches into the index and write it to disk."""
+        with self._lock:
+            self._ensure_loaded()
+            self._merge_pending()
+            if self.codes is None:
+                return
+            self.directory.mkdir(parents=True, exist_ok=True)
+            np.save(self._codes_path, self.codes)
+            np.save(self._vectors_path, self.vectors)
+            self._ids_path.write_text(json.dumps(self.ids), encoding="utf-8")
+            # Re-open float rows memory-mapped so they stay out of resident memory
+            self.vectors = np.load(self._vectors_path, mmap_mode="r")
+            logger.info(f"Saved binary index with {len(self.ids)} codes to {self.directory}")
+
+    def clear(self):
+        """Drop the index from memory and disk."""
+        with self._lock:
+            self.ids, self.codes, self.vectors, self._id_set = [], None, None, set()
+            self._pending_codes, self._pending_vectors = [], []
+            self._loaded = True
+            if self.directory.exists():
+                shutil.rmtree(self.directory)
+
+    def rebuild_from_collection(self, collection, page_size: int = 5000):
+        """Rebuild the index from the embeddings already stored in a Chroma collection."""
+        with self._lock:
+            self.clear()
+            total = collection.count()
+            for offset in range(0, total, page_size):
+                page = collection.get(include=["embeddings"], limit=page_size, offset=offset)
+                if page["ids"]:
+                    self.add(page["ids"], np.asarray(page["embeddings"], dtype=np.float32))
+            self.save()
+
+    def search(self, query_vector: np.ndarray, top_k: int = 5, candidates: int = 256) -> List[Tuple[str, float]]:
+        """
+        Hamming prefilter followed by float cosine re-ranking.
+        Returns (chunk id, cosine similarity) pairs, best first.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            self._merge_pending()
+            # Arrays are replaced, never modified in place, so the scan below needs no lock
+            ids, codes, vectors = self.ids, self.codes, self.vectors
+        if codes is None or not len(codes):
+            return []
+
+        query = np.asarray(query_vector, dtype=np.float32)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+
+        # Stage 1: scan the packed bit matrix
+        distances = hamming_distances(codes, binarize(query))
+        candidates = min(max(candidates, top_k), len(distances))
+        if candidates < len(distances):
+            candidate_rows = np.argpartition(distances, candidates - 1)[:candidates]
+        else:
+            candidate_rows = np.arange(len(distances))
+
+        # Stage 2: exact cosine on the candidate rows only (sorted rows read the mmap sequentially)
+        candidate_rows = np.sort(candidate_rows)
+        scores = np.asarray(vectors[candidate_rows]) @ query
+        order = np.argsort(-scores)[:top_k]
+        return [(ids[candidate_rows[i]], float(scores[i])) for i in order]
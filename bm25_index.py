@@ -0,0 +1,239 @@
+import json
+import logging
+import math
+import re
+import shutil
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Keeps gene symbols (HER2, SIGLEC6), hyphenated names (IL-6, COVID-19) and
+# dosages/decimals (0.5, 5mg) together as single tokens
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.\-/][a-z0-9]+)*")
+
+_STOPWORDS = frozenset("""
+a an and are as at be been but by can do does for from had has have how i if in into is it its
+me my of on or our so such than that the their them then there these they this to was we were
+what when where which while who why will with you your about explain tell please
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase word tokens for BM25, keeping medical identifiers intact.
+    Hyphenated and slashed compounds also emit their parts, so "HER2"
+    matches "HER2-positive".
+    """
+    tokens = []
+    for token in _TOKEN_PATTERN.findall(text.lower()):
+        if token in _STOPWORDS:
+            continue
+        tokens.append(token)
+        if '-' in token or '/' in token:
+            tokens.extend(part for part in re.split(r"[\-/]", token) if part and part not in _STOPWORDS)
+    return tokens
+
+
+class BM25Index:
+    """
+    Sparse inverted index with Okapi BM25 scoring.
+
+    Built during ingestion next to the vector store so exact-term matches
+    (drug names, dosages, gene symbols, abbreviations) can be retrieved even
+    when the dense embedding misses them. Postings are frozen into flat
+    numpy arrays (one offset per term) for compact storage and fast scoring.
+    Ids already in the index are skipped on add (as Chroma does), so
+    re-ingesting a document does not count its terms twice.
+    """
+
+    def __init__(self, directory: str, k1: float = 1.5, b: float = 0.75):
+        self.directory = Path(directory)
+        self.k1 = k1
+        self.b = b
+        self.ids: List[str] = []
+        self.doc_lengths = np.zeros(0, dtype=np.int32)
+        # Frozen postings: term -> (start, stop) into doc_indices / term_freqs
+        self.term_offsets: Dict[str, Tuple[int, int]] = {}
+        self.doc_indices = np.zeros(0, dtype=np.int32)
+        self.term_freqs = np.zeros(0, dtype=np.uint16)
+        # Postings added since the last freeze: term -> ([doc], [tf])
+        self._pending: Dict[str, Tuple[List[int], List[int]]] = {}
+        self._pending_lengths: List[int] = []
+        self._id_set: Set[str] = set()
+        self._loaded = False
+        # Ingestion adds while retrieval threads search
+        self._lock = threading.RLock()
+
+    @property
+    def _arrays_path(self) -> Path:
+        return self.directory / "postings.npz"
+
+    @property
+    def _meta_path(self) -> Path:
+        return self.directory / "index.json"
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._ensure_loaded()
+            return len(self.ids)
+
+    def _ensure_loaded(self):
+        # Caller holds self._lock
+        if self._loaded:
+            return
+        self._loaded = True
+        if not self._meta_path.exists():
+            return
+        try:
+            meta = json.loads(self._meta_path.read_text(encoding="utf-8"))
+            with np.load(self._arrays_path) as arrays:
+                self.doc_lengths = arrays["doc_lengths"]
+                self.doc_indices = arrays["doc_indices"]
+                self.term_freqs = arrays["term_freqs"]
+                offsets = arrays["offsets"]
+            self.ids = meta["ids"]
+            self._id_set = set(self.ids)
+            self.term_offsets = {
+                term: (int(offsets[i]), int(offsets[i + 1])) for i, term in enumerate(meta["terms"])
+            }
+            logger.info(f"Loaded BM25 index with {len(self.ids)} documents and {len(self.term_offsets)} terms")
+        except Exception as e:
+            logger.error(f"Error loading BM25 index: {e}")
+            self.clear(remove_files=False)
+
+    def add(self, ids: List[str], texts: List[str]):
+        """Index a batch of documents (ids already indexed are skipped)."""
+        with self._lock:
+            self._ensure_loaded()
+            skipped = 0
+            for chunk_id, text in zip(ids, texts):
+                if chunk_id in self._id_set:
+                    skipped += 1
+                    continue
+                self._id_set.add(chunk_id)
+                doc = len(self.ids)
+                counts = Counter(tokenize(text))
+                self.ids.append(chunk_id)
+                self._pending_lengths.append(sum(counts.values()))
+                for term, tf in counts.items():
+                    docs, tfs = self._pending.setdefault(term, ([], []))
+                    docs.append(doc)
+                    tfs.append(min(tf, 65535))
+            if skipped:
+                logger.info(f"BM25 index: skipped {skipped} already indexed ids")
+
+    def _freeze(self):
+        """Merge pending postings into the flat posting arrays (caller holds self._lock)."""
+        if not self._pending_lengths:
+            return
+        terms = sorted(set(self.term_offsets) | set(self._pending))
+        doc_chunks, tf_chunks, offsets = [], [], [0]
+        for term in terms:
+            length = 0
+            if term in self.term_offsets:
+                start, stop = self.term_offsets[term]
+                doc_chunks.append(self.doc_indices[start:stop])
+                tf_chunks.append(self.term_freqs[start:stop])
+                length += stop - start
+            if term in self._pending:
+                docs, tfs = self._pending[term]
+                doc_chunks.append(np.asarray(docs, dtype=np.int32))
+                tf_chunks.append(np.asarray(tfs, dtype=np.uint16))
+                length += len(docs)
+            offsets.append(offsets[-1] + length)
+
+        self.doc_indices = np.concatenate(doc_chunks) if doc_chunks else np.zeros(0, dtype=np.int32)
+        self.term_freqs = np.concatenate(tf_chunks) if tf_chunks else np.zeros(0, dtype=np.uint16)
+        self.term_offsets = {term: (offsets[i], offsets[i + 1]) for i, term in enumerate(terms)}
+        self.doc_lengths = np.concatenate([self.doc_lengths, np.asarray(self._pending_lengths, dtype=np.int32)])
+        self._pending, self._pending_lengths = {}, []
+
+    def save(self):
+        """Freeze pending postings and write the index to disk."""
+        with self._lock:
+            self._ensure_loaded()
+            self._freeze()
+            if not self.ids:
+                return
+            self.directory.mkdir(parents=True, exist_ok=True)
+            terms = list(self.term_offsets)
+            offsets = np.array([0] + [self.term_offsets[t][1] for t in terms], dtype=np.int64)
+            np.savez(
+                self._arrays_path,
+                doc_lengths=self.doc_lengths,
+                doc_indices=self.doc_indices,
+                term_freqs=self.term_freqs,
+                offsets=offsets
+            )
+            self._meta_path.write_text(json.dumps({"ids": self.ids, "terms": terms}), encoding="utf-8")
+            logger.info(f"Saved BM25 index with {len(self.ids)} documents to {self.directory}")
+
+    def clear(self, remove_files: bool = True):
+        """Drop the index from memory (and disk)."""
+        with self._lock:
+            self.ids = []
+            self._id_set = set()
+            self.doc_lengths = np.zeros(0, dtype=np.int32)
+            self.term_offsets = {}
+            self.doc_indices = np.zeros(0, dtype=np.int32)
+            self.term_freqs = np.zeros(0, dtype=np.uint16)
+            self._pending, self._pending_lengths = {}, []
+            self._loaded = True
+            if remove_files and self.directory.exists():
+                shutil.rmtree(self.directory)
+
+    def rebuild_from_collection(self, collection, page_size: int = 5000) -> bool:
+        """Rebuild from chunk texts stored as documents in a Chroma collection."""
+        with self._lock:
+            self.clear()
+            total = collection.count()
+            for offset in range(0, total, page_size):
+                page = collection.get(include=["documents"], limit=page_size, offset=offset)
+                documents = page.get("documents") or []
+                if page["ids"] and not any(documents):
+                    logger.warning("Vector store has no chunk texts; re-ingest documents to build the BM25 index")
+                    self.clear()
+                    return False
+                self.add(page["ids"], [doc or "" for doc in documents])
+            self.save()
+            return True
+
+    def search(self, query: str, top_k: int = 5) -> List[Tuple[str, float]]:
+        """Return (chunk id, BM25 score) pairs for the best matching documents."""
+        with self._lock:
+            self._ensure_loaded()
+            self._freeze()
+            # Frozen arrays are replaced, never modified in place, so scoring needs no lock
+            ids, doc_lengths = self.ids, self.doc_lengths
+            term_offsets, doc_indices, term_freqs = self.term_offsets, self.doc_indices, self.term_freqs
+        n_docs = len(doc_lengths)
+        if not n_docs:
+            return []
+
+        avg_length = float(doc_lengths.mean()) or 1.0
+        length_norm = self.k1 * (1 - self.b + self.b * doc_lengths / avg_length)
+        scores = np.zeros(n_docs, dtype=np.float32)
+
+        for term in set(tokenize(query)):
+            span = term_offsets.get(term)
+            if not span:
+                continue
+            docs = doc_indices[span[0]:span[1]]
+            tfs = term_freqs[span[0]:span[1]].astype(np.float32)
+            idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            scores[docs] += idf * tfs * (self.k1 + 1) / (tfs + length_norm[docs])
+
+        matched = np.flatnonzero(scores)
+        if not len(matched):
+            return []
+        top_k = min(top_k, len(matched))
+        best = matched[np.argpartition(-scores[matched], top_k - 1)[:top_k]]
+        best = best[np.argsort(-scores[best])]
+        return [(ids[i], float(scores[i])) for i in best]
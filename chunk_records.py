@@ -0,0 +1,204 @@
+import sys
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+# Every chunk produced from the medical library carries the same type tag
+CHUNK_TYPE = 'medical_knowledge'
+
+
+class ChunkRecord:
+    """
+    Lightweight view of a single chunk held in a ChunkStore.
+
+    Records do not copy any data; they read the columns of their store on
+    demand. Mapping-style access (chunk['source']) is kept so code written
+    against the old dict chunks keeps working.
+    """
+
+    __slots__ = ('_store', '_index')
+
+    def __init__(self, store: 'ChunkStore', index: int):
+        self._store = store
+        self._index = index
+
+    @property
+    def id(self) -> str:
+        return self._store.chunk_id(self._index)
+
+    @property
+    def content(self) -> str:
+        return self._store.contents[self._index]
+
+    @property
+    def source(self) -> str:
+        return self._store.source_of(self._index)
+
+    @property
+    def chunk_size(self) -> int:
+        return self._store.chunk_sizes[self._index]
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in ('id', 'content', 'source', 'chunk_size'):
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'id': self.id,
+            'content': self.content,
+            'source': self.source,
+            'chunk_size': self.chunk_size
+        }
+
+    def __repr__(self) -> str:
+        return f"ChunkRecord(id={self.id!r}, chunk_size={self.chunk_size})"
+
+
+class ChunkStore:
+    """
+    Columnar container for text chunks.
+
+    Instead of one dict per chunk, chunk attributes live in parallel arrays:
+    source names are interned once in a lookup table and referenced by a
+    compact integer id, chunk ids are derived from (source, chunk index) when
+    needed, and sizes are kept in a typed array. Only the chunk text itself
+    is stored as one Python string per chunk.
+    """
+
+    def __init__(self):
+        self.sources: List[str] = []
+        self._source_lookup: Dict[str, int] = {}
+        self._source_counts: List[int] = []
+        self.source_ids = array('I')
+        self.chunk_indices = array('I')
+        self.chunk_sizes = array('I')
+        self.contents: List[str] = []
+
+    def _intern_source(self, source: str) -> int:
+        source_id = self._source_lookup.get(source)
+        if source_id is None:
+            source_id = len(self.sources)
+            source = sys.intern(source)
+            self.sources.append(source)
+            self._source_lookup[source] = source_id
+            self._source_counts.append(0)
+        return source_id
+
+    def add(self, source: str, content: str, chunk_index: Optional[int] = None) -> int:
+        """Append a chunk and return its position in the store."""
+        source_id = self._intern_source(source)
+        if chunk_index is None:
+            chunk_index = self._source_counts[source_id]
+        self._source_counts[source_id] = max(self._source_counts[source_id], chunk_index + 1)
+
+        self.source_ids.append(source_id)
+        self.chunk_indices.append(chunk_index)
+        self.chunk_sizes.append(len(content))
+        self.contents.append(content)
+        return len(self.contents) - 1
+
+    def extend(self, other: 'ChunkStore') -> None:
+        """Append all chunks of another store, remapping its source ids."""
+        remap = [self._intern_source(source) for source in other.sources]
+        for source_id, count in zip(remap, other._source_counts):
+            self._source_counts[source_id] = max(self._source_counts[source_id], count)
+        self.source_ids.extend(remap[sid] for sid in other.source_ids)
+        self.chunk_indices.extend(other.chunk_indices)
+        self.chunk_sizes.extend(other.chunk_sizes)
+        self.contents.extend(other.contents)
+
+    def source_of(self, index: int) -> str:
+        return self.sources[self.source_ids[index]]
+
+    def chunk_id(self, index: int) -> str:
+        return f"{self.source_of(index)}_chunk_{self.chunk_indices[index]}"
+
+    def ids(self, start: int = 0, stop: Optional[int] = None) -> List[str]:
+        """Chunk ids for a range of the store, built on demand."""
+        stop = len(self) if stop is None else min(stop, len(self))
+        return [self.chunk_id(i) for i in range(start, stop)]
+
+    def metadatas(self, start: int = 0, stop: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Vector store metadata for a range of the store, built on demand."""
+        stop = len(self) if stop is None else min(stop, len(self))
+        return [
+            {
+                'source': self.source_of(i),
+                'chunk_id': self.chunk_id(i),
+                'chunk_index': self.chunk_indices[i],
+                'chunk_size': self.chunk_sizes[i],
+                'type': CHUNK_TYPE
+            }
+            for i in range(start, stop)
+        ]
+
+    def __len__(self) -> int:
+        return len(self.contents)
+
+    def __bool__(self) -> bool:
+        return len(self.contents) > 0
+
+    def __iter__(self) -> Iterator[ChunkRecord]:
+        for i in range(len(self)):
+            yield ChunkRecord(self, i)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[ChunkRecord, 'ChunkStore']:
+        if isinstance(index, slice):
+            sliced = ChunkStore()
+            # Own copies of the source tables, so adding to the slice leaves this store intact
+            sliced.sources = list(self.sources)
+            sliced._source_lookup = dict(self._source_lookup)
+            sliced._source_counts = list(self._source_counts)
+            sliced.source_ids = self.source_ids[index]
+            sliced.chunk_indices = self.chunk_indices[index]
+            sliced.chunk_sizes = self.chunk_sizes[index]
+            sliced.contents = self.contents[index]
+            return sliced
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("chunk index out of range")
+        return ChunkRecord(self, index)
+
+    @classmethod
+    def from_dicts(cls, chunks: Iterable[Dict[str, Any]]) -> 'ChunkStore':
+        """Build a store from the legacy list-of-dicts chunk format."""
+        store = cls()
+        for chunk in chunks:
+            chunk_index = None
+            chunk_id = chunk.get('id', '')
+            prefix = f"{chunk['source']}_chunk_"
+            if chunk_id.startswith(prefix) and chunk_id[len(prefix):].isdigit():
+                chunk_index = int(chunk_id[len(prefix):])
+            store.add(chunk['source'], chunk['content'], chunk_index)
+        return store
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Expand the store back into the legacy list-of-dicts format."""
+        return [record.to_dict() for record in self]
+
+
+def as_chunk_store(chunks: Union[ChunkStore, Iterable[Dict[str, Any]]]) -> ChunkStore:
+    """Accept either a ChunkStore or legacy dict chunks and return a ChunkStore."""
+    if isinstance(chunks, ChunkStore):
+        return chunks
+    return ChunkStore.from_dicts(chunks)
+
+
+def chunk_position(chunk: Dict[str, Any]) -> Tuple[str, Optional[int]]:
+    """
+    (source, chunk index) of a retrieved chunk, from its metadata or, for
+    collections ingested without chunk_index, from the '<source>_chunk_<n>' id.
+    """
+    metadata = chunk.get('metadata') or {}
+    source = metadata.get('source', '')
+    if metadata.get('chunk_index') is not None:
+        return source, int(metadata['chunk_index'])
+    _, _, suffix = chunk.get('id', '').rpartition('_chunk_')
+    return source, int(suffix) if suffix.isdigit() else None
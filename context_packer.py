@@ -0,0 +1,131 @@
+import logging
+from typing import Any, Dict, List, Tuple
+
+from chunk_records import chunk_position
+from token_utils import count_tokens
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Longest overlap (characters) looked for between consecutive chunks of a source
+MAX_OVERLAP_CHARS = 600
+# Shortest suffix/prefix match treated as a real overlap rather than coincidence
+MIN_OVERLAP_CHARS = 20
+# Spans are only cut to fit the budget if at least this many tokens remain
+MIN_TRUNCATED_TOKENS = 60
+
+
+def _overlap(left: str, right: str) -> int:
+    """Length of the longest suffix of left that is a prefix of right."""
+    limit = min(len(left), len(right), MAX_OVERLAP_CHARS)
+    for size in range(limit, MIN_OVERLAP_CHARS - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def merge_spans(chunks: List[Dict]) -> List[Dict]:
+    """
+    Merge chunks from the same source that overlap or sit next to each other
+    into one span, removing the duplicated overlap text. Each span keeps the
+    best relevance of its members.
+    """
+    by_source: Dict[str, List[Dict]] = {}
+    for rank, chunk in enumerate(chunks):
+        source = (chunk.get('metadata') or {}).get('source', '')
+        by_source.setdefault(source, []).append(dict(chunk, _rank=rank, _index=chunk_position(chunk)[1]))
+
+    spans = []
+    for source, members in by_source.items():
+        members.sort(key=lambda c: (c['_index'] is None, c['_index'] or 0))
+        current = None
+        for chunk in members:
+            relevance = chunk.get('rerank_score', chunk.get('similarity_score', 0.0))
+            if current is not None:
+                overlap = _overlap(current['content'], chunk['content'])
+                adjacent = (chunk['_index'] is not None and current['last_index'] is not None
+                            and chunk['_index'] == current['last_index'] + 1)
+                if overlap or adjacent:
+                    separator = "" if overlap else " "
+                    current['content'] += separator + chunk['content'][overlap:]
+                    current['ids'].append(chunk['id'])
+                    current['relevance'] = max(current['relevance'], relevance)
+                    current['rank'] = min(current['rank'], chunk['_rank'])
+                    current['last_index'] = chunk['_index']
+                    continue
+                spans.append(current)
+            current = {
+                'source': source,
+                'content': chunk['content'],
+                'ids': [chunk['id']],
+                'relevance': relevance,
+                'rank': chunk['_rank'],
+                'last_index': chunk['_index'],
+            }
+        if current is not None:
+            spans.append(current)
+
+    # Most relevant span first (retrieval order breaks ties)
+    spans.sort(key=lambda span: span['rank'])
+    return spans
+
+
+def _truncate_to_tokens(text: str, max_tokens: int, model: str) -> str:
+    """Cut text to roughly max_tokens, preferring to end on a sentence boundary."""
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count_tokens(text[:middle] + " ...", model) <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    cut = text[:low]
+    sentence_end = cut.rfind('. ')
+    if sentence_end > len(cut) // 2:
+        cut = cut[:sentence_end + 1]
+    return cut.rstrip() + " ..."
+
+
+def pack_context(chunks: List[Dict], token_budget: int, model: str = "gpt-4o") -> Tuple[str, Dict[str, Any]]:
+    """
+    Build the LLM context from ranked chunks within a token budget.
+
+    Overlapping or adjacent chunks of the same source are merged into one
+    span, then spans are added in relevance order until the budget is used.
+    The last span that does not fit is truncated if enough budget remains.
+    Returns (context, stats).
+    """
+    spans = merge_spans(chunks)
+    parts, used, truncated, dropped = [], 0, 0, 0
+
+    for span in spans:
+        header = f"[Source {len(parts) + 1}: {span['source']} | relevance {span['relevance']:.2f}]\n"
+        header_tokens = count_tokens(header, model)
+        span_tokens = count_tokens(span['content'], model)
+        remaining = token_budget - used - header_tokens
+
+        if span_tokens <= remaining:
+            parts.append(header + span['content'])
+            used += header_tokens + span_tokens
+        elif remaining >= MIN_TRUNCATED_TOKENS:
+            text = _truncate_to_tokens(span['content'], remaining, model)
+            parts.append(header + text)
+            used += header_tokens + count_tokens(text, model)
+            truncated += 1
+        else:
+            dropped += 1
+
+    context = "\n\n".join(parts)
+    stats = {
+        "chunks": len(chunks),
+        "spans": len(spans),
+        "merged_chunks": len(chunks) - len(spans),
+        "spans_used": len(parts),
+        "spans_truncated": truncated,
+        "spans_dropped": dropped,
+        "input_tokens": sum(count_tokens(chunk['content'], model) for chunk in chunks),
+        "context_tokens": used,
+        "token_budget": token_budget,
+    }
+    return context, stats
@@ -0,0 +1,64 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class ConversationContextStore:
+    """
+    Server-side memory of the chunks retrieved for recent conversation turns,
+    so follow-up questions ("explain in detail") can be grounded in the same
+    context instead of searching for the literal follow-up text.
+
+    A turn is stored under one or more keys (conversation id, normalised
+    question) and recalled by the first key that matches. Entries are
+    tagged with the knowledge base generation they were retrieved from.
+    """
+
+    def __init__(self, max_entries: int = 5000, ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._turns: "OrderedDict[str, tuple[float, str, List[Dict]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"stored": 0, "reused": 0, "missed": 0}
+
+    def remember(self, keys: List[str], generation: str, chunks: List[Dict]):
+        now = time.time()
+        with self._lock:
+            for key in keys:
+                if key:
+                    self._turns[key] = (now, generation, chunks)
+                    self._turns.move_to_end(key)
+            while len(self._turns) > self.max_entries:
+                self._turns.popitem(last=False)
+            self.stats["stored"] += 1
+
+    def recall(self, keys: List[str], generation: str) -> Optional[List[Dict]]:
+        now = time.time()
+        with self._lock:
+            for key in keys:
+                entry = self._turns.get(key) if key else None
+                if not entry:
+                    continue
+                stored_at, stored_generation, chunks = entry
+                if now - stored_at >= self.ttl_seconds or stored_generation != generation:
+                    del self._turns[key]
+                    continue
+                self._turns.move_to_end(key)
+                self.stats["reused"] += 1
+                return chunks
+            self.stats["missed"] += 1
+            return None
+
+    def clear(self):
+        with self._lock:
+            self._turns.clear()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {**self.stats, "entries": len(self._turns)}
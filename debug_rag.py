@@ -4,6 +4,11 @@ Debug script to test RAG system functionality
 """
 
 import logging
+
+# Go offline (MEDBOT_OFFLINE) before the RAG modules import Hugging Face
+from model_bundle import apply_offline_mode
+apply_offline_mode()
+
 from rag_system import RAGSystem
 
 # Set up logging
@@ -0,0 +1,86 @@
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from token_utils import count_tokens
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Cosine similarity above which two chunks count as near-duplicates in the stats
+DUPLICATE_THRESHOLD = 0.9
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def mmr_select(relevance: np.ndarray,
+               vectors: np.ndarray,
+               k: int,
+               lambda_: float = 0.7,
+               sources: Optional[List[str]] = None,
+               max_per_source: Optional[int] = None) -> List[int]:
+    """
+    Maximal marginal relevance over a candidate set.
+
+    Greedily picks the candidate maximising
+        lambda * relevance - (1 - lambda) * max cosine to already picked ones.
+    lambda=1 keeps the relevance order, lower values favour diversity.
+    Relevance is min-max scaled so it is comparable with cosine similarity
+    regardless of whether it came from a distance, BM25/RRF or a reranker.
+    Optionally caps how many chunks may come from the same source.
+    Returns the selected candidate indices in pick order.
+    """
+    n = len(relevance)
+    k = min(k, n)
+    if k <= 0:
+        return []
+
+    relevance = np.asarray(relevance, dtype=np.float32)
+    spread = float(relevance.max() - relevance.min())
+    relevance = (relevance - relevance.min()) / spread if spread > 0 else np.ones(n, dtype=np.float32)
+    similarity = _normalize_rows(vectors) @ _normalize_rows(vectors).T
+
+    selected: List[int] = []
+    per_source: Dict[str, int] = {}
+    max_similarity = np.full(n, -np.inf, dtype=np.float32)
+    available = np.ones(n, dtype=bool)
+
+    while len(selected) < k and available.any():
+        redundancy = np.where(np.isfinite(max_similarity), max_similarity, 0.0)
+        scores = lambda_ * relevance - (1 - lambda_) * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        available[best] = False
+
+        if sources is not None and max_per_source:
+            source = sources[best]
+            if per_source.get(source, 0) >= max_per_source:
+                continue
+            per_source[source] = per_source.get(source, 0) + 1
+
+        selected.append(best)
+        max_similarity = np.maximum(max_similarity, similarity[best])
+
+    return selected
+
+
+def redundant_tokens(texts: List[str], vectors: np.ndarray, threshold: float = DUPLICATE_THRESHOLD) -> Tuple[int, int]:
+    """
+    Count chunks (and their tokens) that are near-duplicates of an earlier
+    chunk in the list, i.e. prompt tokens that add little new information.
+    """
+    if not texts:
+        return 0, 0
+    vectors = _normalize_rows(vectors)
+    similarity = vectors @ vectors.T
+    duplicates, tokens = 0, 0
+    for i in range(1, len(texts)):
+        if similarity[i, :i].max() >= threshold:
+            duplicates += 1
+            tokens += count_tokens(texts[i])
+    return duplicates, tokens
@@ -0,0 +1,79 @@
+import importlib.util
+import logging
+from typing import Dict, Tuple
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# CPU inference backends for the sentence-transformers encoder:
+# - 'torch': stock float32 PyTorch graph (reference)
+# - 'int8': PyTorch graph with dynamically quantized int8 Linear layers
+# - 'onnx': exported ONNX graph run by ONNX Runtime
+# - 'openvino': exported graph run by the OpenVINO runtime
+BACKENDS = ('torch', 'int8', 'onnx', 'openvino')
+
+# Python packages each exported-graph backend needs at runtime
+_RUNTIME_PACKAGES = {
+    'onnx': ('onnxruntime', 'optimum'),
+    'openvino': ('openvino', 'optimum'),
+}
+
+
+def backend_available(backend: str) -> bool:
+    """Check whether the runtime for a backend is installed locally."""
+    if backend not in BACKENDS:
+        return False
+    required = ('sentence_transformers',) + _RUNTIME_PACKAGES.get(backend, ())
+    return all(importlib.util.find_spec(package) is not None for package in required)
+
+
+def load_sentence_transformer(model_name: str, backend: str = 'torch') -> Tuple[object, str]:
+    """
+    Load a SentenceTransformer for CPU inference with the requested backend.
+
+    Returns (model, effective backend). If the runtime for an exported-graph
+    backend is not installed, the stock torch model is returned instead.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{backend}', expected one of {BACKENDS}")
+
+    from sentence_transformers import SentenceTransformer
+
+    if backend in _RUNTIME_PACKAGES:
+        if backend_available(backend):
+            # sentence-transformers exports the graph on first load and caches it with the model
+            return SentenceTransformer(model_name, device='cpu', backend=backend), backend
+        logger.warning(f"{backend} runtime not installed, falling back to the torch backend")
+        backend = 'torch'
+
+    model = SentenceTransformer(model_name, device='cpu')
+    if backend == 'int8':
+        import torch
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model, backend
+
+
+def embedding_drift(reference: np.ndarray, candidate: np.ndarray) -> Dict[str, float]:
+    """
+    Compare embeddings of the same texts from a reference and a candidate backend.
+    Reports per-text cosine similarity and how often nearest neighbours agree.
+    """
+    reference = reference / np.maximum(np.linalg.norm(reference, axis=1, keepdims=True), 1e-12)
+    candidate = candidate / np.maximum(np.linalg.norm(candidate, axis=1, keepdims=True), 1e-12)
+    cosines = np.sum(reference * candidate, axis=1)
+
+    # Nearest neighbour of every text among the others, in both spaces
+    ref_scores = reference @ reference.T
+    cand_scores = candidate @ candidate.T
+    np.fill_diagonal(ref_scores, -np.inf)
+    np.fill_diagonal(cand_scores, -np.inf)
+    neighbour_agreement = float(np.mean(ref_scores.argmax(axis=1) == cand_scores.argmax(axis=1)))
+
+    return {
+        "mean_cosine": float(cosines.mean()),
+        "min_cosine": float(cosines.min()),
+        "neighbour_agreement": neighbour_agreement,
+    }
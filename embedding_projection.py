@@ -0,0 +1,98 @@
+import logging
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingProjector:
+    """
+    Linear dimension reduction for embedding vectors.
+
+    Supports two methods:
+    - 'pca': principal components fitted on a sample of the corpus
+    - 'random': Gaussian random projection (Johnson-Lindenstrauss), which
+      only needs the input dimension and a seed
+
+    The same projector must be applied to stored chunk vectors and to query
+    vectors. Projected vectors are L2-normalised so similarity scores keep
+    the same scale as the full-dimension index.
+    """
+
+    METHODS = ('pca', 'random')
+
+    def __init__(self, target_dim: int, method: str = 'pca', seed: int = 42):
+        if method not in self.METHODS:
+            raise ValueError(f"Unknown projection method '{method}', expected one of {self.METHODS}")
+        if target_dim <= 0:
+            raise ValueError("target_dim must be positive")
+
+        self.target_dim = target_dim
+        self.method = method
+        self.seed = seed
+        self.mean: Optional[np.ndarray] = None
+        self.components: Optional[np.ndarray] = None
+
+    @property
+    def is_fitted(self) -> bool:
+        return self.components is not None
+
+    def fit(self, vectors: np.ndarray) -> 'EmbeddingProjector':
+        """Fit the projection on a (n_samples, input_dim) matrix of corpus vectors."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        n_samples, input_dim = vectors.shape
+        if self.target_dim > input_dim:
+            raise ValueError(f"target_dim {self.target_dim} exceeds input dimension {input_dim}")
+
+        if self.method == 'pca':
+            if n_samples < self.target_dim:
+                raise ValueError(f"PCA to {self.target_dim} dims needs at least {self.target_dim} samples, got {n_samples}")
+            self.mean = vectors.mean(axis=0)
+            # Economy SVD of the centred sample; rows of vt are the principal axes
+            _, _, vt = np.linalg.svd(vectors - self.mean, full_matrices=False)
+            self.components = np.ascontiguousarray(vt[:self.target_dim].T, dtype=np.float32)
+        else:
+            rng = np.random.default_rng(self.seed)
+            self.mean = np.zeros(input_dim, dtype=np.float32)
+            self.components = rng.standard_normal((input_dim, self.target_dim)).astype(np.float32)
+            self.components /= np.sqrt(self.target_dim)
+
+        logger.info(f"Fitted {self.method} projection {input_dim} -> {self.target_dim} dims on {n_samples} vectors")
+        return self
+
+    def transform(self, vectors: np.ndarray) -> np.ndarray:
+        """Project vectors (1-D or 2-D) into the reduced space."""
+        if not self.is_fitted:
+            raise RuntimeError("Projection has not been fitted")
+
+        vectors = np.asarray(vectors, dtype=np.float32)
+        projected = (vectors - self.mean) @ self.components
+        norms = np.linalg.norm(projected, axis=-1, keepdims=True)
+        return projected / np.maximum(norms, 1e-12)
+
+    def save(self, path: str) -> None:
+        """Persist the fitted projection as an .npz file."""
+        if not self.is_fitted:
+            raise RuntimeError("Projection has not been fitted")
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        np.savez(
+            path,
+            mean=self.mean,
+            components=self.components,
+            method=np.array(self.method),
+            seed=np.array(self.seed)
+        )
+
+    @classmethod
+    def load(cls, path: str) -> 'EmbeddingProjector':
+        """Load a projection saved with save()."""
+        with np.load(path) as data:
+            components = data['components']
+            projector = cls(components.shape[1], str(data['method']), int(data['seed']))
+            projector.mean = data['mean']
+            projector.components = components
+        return projector
@@ -1,9 +1,25 @@
 import os
+import json
 import logging
-from typing import List, Dict, Optional, Tuple
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Dict, Optional, Tuple, Union
 from pathlib import Path
 import numpy as np
 
+from chunk_records import ChunkStore, as_chunk_store, chunk_position
+from embedding_projection import EmbeddingProjector
+from binary_index import BinaryIndex
+from bm25_index import BM25Index
+from source_router import SourceCentroids
+from query_expansion import generate_query_variants
+from embedding_backends import embedding_drift, load_sentence_transformer
+from model_bundle import MODEL_LOAD_TIMES, resolve_model_path, timed_load
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -17,19 +33,85 @@ class EmbeddingSystem:
     in ChromaDB for efficient retrieval.
     """
     
-    def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2"):
+    # ChromaDB batch size limit (conservative)
+    STORE_BATCH_SIZE = 5000
+    # Number of chunks handed to the encoder per forward pass
+    ENCODE_BATCH_SIZE = 64
+    # Maximum number of chunks encoded to fit a projection
+    PROJECTION_FIT_SAMPLE = 5000
+    DATABASE_PATH = "./healthcare_knowledge_db"
+    # Retrieval strategies accepted by search_similar_chunks
+    SEARCH_MODES = ('dense', 'binary', 'bm25', 'hybrid', 'routed', 'multi_query')
+    # Candidates kept by the Hamming prefilter before float re-ranking
+    BINARY_CANDIDATES = 256
+    # Candidates fetched per arm in hybrid mode, as a multiple of top_k
+    HYBRID_FETCH_FACTOR = 4
+    # Reciprocal-rank fusion constant (score = sum of 1 / (k + rank))
+    RRF_K = 60
+    # Recently embedded queries kept so a question is encoded once per request
+    QUERY_CACHE_SIZE = 256
+    # Routed search: sources searched per query, share of queries also run
+    # against the full index to measure recall, and the recall that triggers a warning
+    ROUTED_SOURCES = int(os.getenv('MEDBOT_ROUTING_SOURCES', '3'))
+    ROUTING_AUDIT_RATE = float(os.getenv('MEDBOT_ROUTING_AUDIT_RATE', '0.05'))
+    ROUTING_RECALL_ALERT = 0.8
+    
+    def __init__(self,
+                 model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+                 projection_dim: Optional[int] = None,
+                 projection_method: str = "pca",
+                 inference_backend: Optional[str] = None):
         self.model_name = model_name
+        # Local bundle path when the model is bundled, otherwise the hub name
+        self.model_path = model_name
         self.embedding_model = None
+        # CPU inference backend for the encoder (torch, int8, onnx, openvino)
+        self.inference_backend = inference_backend or os.getenv('MEDBOT_EMBEDDING_BACKEND', 'torch')
         self.vector_store = None
+        self.collection = None
+        
+        # Optional dimension reduction applied to stored and query vectors
+        if projection_dim is None and os.getenv('MEDBOT_PROJECTION_DIM'):
+            projection_dim = int(os.getenv('MEDBOT_PROJECTION_DIM'))
+            projection_method = os.getenv('MEDBOT_PROJECTION_METHOD', projection_method)
+        self.projector = None
+        self.collection_name = "medical_knowledge"
+        if projection_dim:
+            self.projector = EmbeddingProjector(projection_dim, projection_method)
+            # Reduced vectors live in their own collection since the dimension differs
+            self.collection_name = f"medical_knowledge_{projection_method}{projection_dim}"
+            self._load_projection()
+        
+        self.default_search_mode = os.getenv('MEDBOT_SEARCH_MODE', 'dense')
+        # Sign-binarised copy of the stored vectors for the 'binary' search mode
+        self.binary_index = BinaryIndex(str(Path(self.DATABASE_PATH) / f"binary_index_{self.collection_name}"))
+        # Sparse inverted index over chunk texts for the 'bm25' and 'hybrid' search modes
+        self.bm25_index = BM25Index(str(Path(self.DATABASE_PATH) / f"bm25_{self.collection_name}"))
+        # Per-source centroids for the 'routed' search mode
+        self.source_centroids = SourceCentroids(str(Path(self.DATABASE_PATH) / f"centroids_{self.collection_name}.npz"))
+        self.routing_stats = {"queries": 0, "audited": 0, "recall_sum": 0.0}
+        self._routing_lock = threading.Lock()
+        # Runs the dense and sparse arms of hybrid search concurrently
+        self._search_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="hybrid-search")
+        # Per-thread timings of the most recent search (see last_search_stats)
+        self._search_stats = threading.local()
+        self._query_vectors: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._query_lock = threading.Lock()
+        # Changes whenever ingestion or a reset changes the index; caches key on it
+        self.kb_generation = self._load_generation()
+        
         self._initialize_embedding_model()
         self._initialize_vector_store()
     
     def _initialize_embedding_model(self):
         """Initialize the embedding model for converting text to vectors."""
         try:
-            from sentence_transformers import SentenceTransformer
-            logger.info(f"Loading embedding model: {self.model_name}")
-            self.embedding_model = SentenceTransformer(self.model_name)
+            self.model_path = resolve_model_path(self.model_name)
+            logger.info(f"Loading embedding model: {self.model_path} ({self.inference_backend} backend)")
+            self.embedding_model, self.inference_backend = timed_load(
+                self.model_name,
+                lambda: load_sentence_transformer(self.model_path, self.inference_backend)
+            )
             logger.info("Embedding model loaded successfully")
         except ImportError:
             logger.error("sentence-transformers not available")
@@ -46,7 +128,7 @@ class EmbeddingSystem:
             
             # Create persistent ChromaDB instance
             self.vector_store = chromadb.PersistentClient(
-                path="./healthcare_knowledge_db",
+                path=self.DATABASE_PATH,
                 settings=Settings(
                     anonymized_telemetry=False,
                     allow_reset=True
@@ -54,10 +136,7 @@ class EmbeddingSystem:
             )
             
             # Get or create collection for medical knowledge
-            self.collection = self.vector_store.get_or_create_collection(
-                name="medical_knowledge",
-                metadata={"description": "Medical knowledge base embeddings"}
-            )
+            self.collection = self._get_collection()
             
             logger.info("ChromaDB vector store initialized successfully")
             
@@ -68,44 +147,147 @@ class EmbeddingSystem:
             logger.error(f"Error initializing vector store: {e}")
             self.vector_store = None
     
-    def create_embeddings(self, chunks: List[Dict[str, str]]) -> List[Tuple[str, List[float], Dict]]:
+    def _get_collection(self):
+        """
+        The knowledge base collection. Cosine space makes 1 - distance a
+        cosine similarity, the same scale binary search returns.
+        """
+        collection = self.vector_store.get_or_create_collection(
+            name=self.collection_name,
+            metadata={"description": "Medical knowledge base embeddings", "hnsw:space": "cosine"}
+        )
+        if (collection.metadata or {}).get("hnsw:space") != "cosine":
+            # The distance function is fixed when a collection is created
+            logger.warning(f"Collection '{self.collection_name}' uses L2 distance, so dense similarity "
+                           "scores are not cosine. Reset and re-ingest the knowledge base to fix this.")
+        return collection
+    
+    def create_embeddings(self, chunks: Union[ChunkStore, List[Dict[str, str]]]) -> List[Tuple[str, List[float], Dict]]:
         """
         Convert text chunks to embeddings using the embedding model.
         This implements the "Convert Docs to Embeddings" step from the RAG workflow.
+        
+        Note: this materialises every embedding as a Python list; ingestion
+        goes through process_and_store_chunks, which streams batches instead.
         """
         if not self.embedding_model:
             logger.error("Embedding model not available")
             return []
         
+        chunks = as_chunk_store(chunks)
         embeddings = []
         logger.info(f"Creating embeddings for {len(chunks)} chunks...")
         
-        for i, chunk in enumerate(chunks):
+        try:
+            self._ensure_projection(chunks)
+        except Exception as e:
+            logger.error(f"Error fitting embedding projection: {e}")
+            return []
+        
+        for start in range(0, len(chunks), self.ENCODE_BATCH_SIZE):
+            stop = min(start + self.ENCODE_BATCH_SIZE, len(chunks))
             try:
-                # Create embedding for the chunk content
-                text = chunk['content']
-                embedding = self.embedding_model.encode(text).tolist()
-                
-                # Prepare metadata for storage
-                metadata = {
-                    'source': chunk['source'],
-                    'chunk_id': chunk['id'],
-                    'chunk_size': chunk['chunk_size'],
-                    'type': 'medical_knowledge'
-                }
+                vectors = self._embed_texts(chunks.contents[start:stop])
+                embeddings.extend(zip(chunks.ids(start, stop), vectors.tolist(), chunks.metadatas(start, stop)))
                 
-                embeddings.append((chunk['id'], embedding, metadata))
-                
-                if (i + 1) % 100 == 0:
-                    logger.info(f"Processed {i + 1}/{len(chunks)} chunks...")
+                if stop == len(chunks) or (start // self.ENCODE_BATCH_SIZE + 1) % 16 == 0:
+                    logger.info(f"Processed {stop}/{len(chunks)} chunks...")
                     
             except Exception as e:
-                logger.error(f"Error creating embedding for chunk {chunk['id']}: {e}")
+                logger.error(f"Error creating embeddings for chunks {start}-{stop}: {e}")
                 continue
         
         logger.info(f"Created {len(embeddings)} embeddings successfully")
         return embeddings
     
+    def _encode_texts(self, texts: List[str]) -> np.ndarray:
+        """Encode a batch of texts into a float32 matrix (one row per text)."""
+        return np.asarray(
+            self.embedding_model.encode(texts, batch_size=self.ENCODE_BATCH_SIZE, convert_to_numpy=True),
+            dtype=np.float32
+        )
+    
+    def check_embedding_drift(self, texts: List[str]) -> Dict[str, float]:
+        """
+        Compare this system's embeddings against the stock float32 torch model
+        on the given texts. Only meaningful for non-torch backends.
+        """
+        reference_model, _ = load_sentence_transformer(self.model_path, 'torch')
+        reference = reference_model.encode(texts, batch_size=self.ENCODE_BATCH_SIZE, convert_to_numpy=True)
+        drift = embedding_drift(np.asarray(reference, dtype=np.float32), self._encode_texts(texts))
+        logger.info(f"Embedding drift ({self.inference_backend} vs torch): {drift}")
+        return drift
+    
+    def _embed_texts(self, texts: List[str]) -> np.ndarray:
+        """Encode texts into the vector space of the index (projected if enabled)."""
+        vectors = self._encode_texts(texts)
+        if self.projector:
+            vectors = self.projector.transform(vectors)
+        return vectors
+    
+    def embed_query(self, query: str) -> np.ndarray:
+        """Embed a query into the index space, reusing recent results for the same text."""
+        with self._query_lock:
+            vector = self._query_vectors.get(query)
+            if vector is not None:
+                self._query_vectors.move_to_end(query)
+                return vector
+        
+        vector = self._embed_texts([query])[0]
+        with self._query_lock:
+            self._query_vectors[query] = vector
+            while len(self._query_vectors) > self.QUERY_CACHE_SIZE:
+                self._query_vectors.popitem(last=False)
+        return vector
+    
+    @property
+    def _generation_path(self) -> Path:
+        return Path(self.DATABASE_PATH) / f"generation_{self.collection_name}.json"
+    
+    def _load_generation(self) -> str:
+        try:
+            return json.loads(self._generation_path.read_text(encoding="utf-8"))["generation"]
+        except FileNotFoundError:
+            return "initial"
+        except Exception as e:
+            logger.error(f"Error reading knowledge base generation: {e}")
+            return "initial"
+    
+    def _bump_generation(self):
+        """Record that the index contents changed (new random id, persisted)."""
+        self.kb_generation = uuid.uuid4().hex[:16]
+        with self._query_lock:
+            self._query_vectors.clear()
+        try:
+            self._generation_path.parent.mkdir(parents=True, exist_ok=True)
+            self._generation_path.write_text(json.dumps({"generation": self.kb_generation}), encoding="utf-8")
+        except Exception as e:
+            logger.error(f"Error saving knowledge base generation: {e}")
+    
+    @property
+    def _projection_path(self) -> Path:
+        return Path(self.DATABASE_PATH) / f"projection_{self.projector.method}_{self.projector.target_dim}.npz"
+    
+    def _load_projection(self):
+        """Load a previously fitted projection for this collection, if any."""
+        if self._projection_path.exists():
+            try:
+                self.projector = EmbeddingProjector.load(str(self._projection_path))
+                logger.info(f"Loaded {self.projector.method} projection to {self.projector.target_dim} dims")
+            except Exception as e:
+                logger.error(f"Error loading embedding projection: {e}")
+    
+    def _ensure_projection(self, chunks: ChunkStore):
+        """Fit the projection on an evenly spaced sample of the corpus if not yet fitted."""
+        if not self.projector or self.projector.is_fitted:
+            return
+        
+        step = max(1, len(chunks) // self.PROJECTION_FIT_SAMPLE)
+        sample = chunks.contents[::step][:self.PROJECTION_FIT_SAMPLE]
+        logger.info(f"Fitting {self.projector.method} projection on {len(sample)} sampled chunks...")
+        self.projector.fit(self._encode_texts(sample))
+        self.projector.save(str(self._projection_path))
+    
     def store_embeddings(self, embeddings: List[Tuple[str, List[float], Dict]]) -> bool:
         """
         Store embeddings in ChromaDB vector index in batches.
@@ -116,8 +298,7 @@ class EmbeddingSystem:
             return False
         
         try:
-            # ChromaDB batch size limit (conservative)
-            BATCH_SIZE = 5000
+            BATCH_SIZE = self.STORE_BATCH_SIZE
             total_stored = 0
             
             # Process embeddings in batches
@@ -140,56 +321,385 @@ class EmbeddingSystem:
                 logger.info(f"Stored batch {i//BATCH_SIZE + 1}: {len(batch)} embeddings (Total: {total_stored}/{len(embeddings)})")
             
             logger.info(f"Successfully stored all {len(embeddings)} embeddings in batches")
+            self._bump_generation()
             return True
             
         except Exception as e:
             logger.error(f"Error storing embeddings: {e}")
             return False
     
-    def search_similar_chunks(self, query: str, top_k: int = 5) -> List[Dict]:
+    def search_similar_chunks(self, query: str, top_k: int = 5, search_mode: Optional[str] = None,
+                              previous_topic: Optional[str] = None) -> List[Dict]:
         """
         Perform semantic similarity search to find relevant chunks.
         This implements the "Semantic Similarity Search" from the RAG workflow.
+        
+        search_mode selects the retrieval strategy:
+        - 'dense': exact nearest-neighbour query against ChromaDB (default)
+        - 'binary': Hamming-distance prefilter over sign-binarised vectors,
+          then cosine re-ranking of the surviving candidates
+        - 'bm25': sparse keyword search over the chunk texts
+        - 'hybrid': dense and BM25 run in parallel, merged with
+          reciprocal-rank fusion
+        - 'routed': score per-source centroids first, then dense search
+          restricted to the best matching sources
+        - 'multi_query': dense search for the question plus locally generated
+          variants (abbreviations, synonyms, previous_topic), fused by rank
+        
+        similarity_score is a cosine similarity (-1..1) for dense, binary,
+        routed and multi_query results, a raw BM25 score for 'bm25', and for
+        'hybrid' the reciprocal-rank-fusion score scaled so that a chunk
+        ranked first by both arms scores 1.0 (ranked first by one arm only:
+        about 0.5). Only compare scores within one mode.
+        
+        Per-arm latencies of the call are available from last_search_stats.
         """
         if not self.embedding_model or not self.vector_store:
             logger.error("Embedding system not fully initialized")
             return []
         
+        search_mode = search_mode or self.default_search_mode
+        if search_mode not in self.SEARCH_MODES:
+            logger.error(f"Unknown search mode '{search_mode}', expected one of {self.SEARCH_MODES}")
+            return []
+        
+        stats = {'mode': search_mode}
+        self._search_stats.value = stats
+        start = time.perf_counter()
         try:
-            # Create embedding for the query
-            query_embedding = self.embedding_model.encode(query).tolist()
-            
-            # Search for similar chunks
-            results = self.collection.query(
-                query_embeddings=[query_embedding],
-                n_results=top_k,
-                include=['metadatas', 'distances']
-            )
-            
-            # Format results
-            similar_chunks = []
-            if results['ids'] and results['ids'][0]:
-                for i, chunk_id in enumerate(results['ids'][0]):
-                    chunk_info = {
-                        'id': chunk_id,
-                        'metadata': results['metadatas'][0][i],
-                        'similarity_score': 1 - results['distances'][0][i],  # Convert distance to similarity
-                        'content': self._get_chunk_content(chunk_id)
-                    }
-                    similar_chunks.append(chunk_info)
+            if search_mode == 'bm25':
+                similar_chunks = self._bm25_search(query, top_k, stats)
+            elif search_mode == 'hybrid':
+                similar_chunks = self._hybrid_search(query, top_k, stats)
+            elif search_mode == 'multi_query':
+                similar_chunks = self._multi_query_search(query, top_k, previous_topic, stats)
+            else:
+                if self.projector and not self.projector.is_fitted:
+                    logger.error("Embedding projection not fitted; ingest documents first")
+                    return []
+                
+                # Create embedding for the query (projected like the stored vectors)
+                query_embedding = self.embed_query(query)
+                
+                if search_mode == 'binary':
+                    similar_chunks = self._binary_search(query_embedding, top_k, stats)
+                elif search_mode == 'routed':
+                    similar_chunks = self._routed_search(query_embedding, top_k, stats)
+                else:
+                    similar_chunks = self._dense_search(query_embedding, top_k)
             
-            logger.info(f"Found {len(similar_chunks)} similar chunks for query")
+            stats['total_ms'] = (time.perf_counter() - start) * 1000
+            logger.info(f"Found {len(similar_chunks)} similar chunks for query ({search_mode} search, "
+                        + ", ".join(f"{k}={v:.1f}" for k, v in stats.items() if k.endswith('_ms')) + ")")
             return similar_chunks
             
         except Exception as e:
             logger.error(f"Error searching for similar chunks: {e}")
             return []
     
+    def _dense_search(self, query_embedding: np.ndarray, top_k: int, where: Optional[Dict] = None) -> List[Dict]:
+        """Exact nearest-neighbour search in ChromaDB, optionally restricted by a metadata filter."""
+        results = self.collection.query(
+            query_embeddings=[query_embedding.tolist()],
+            n_results=top_k,
+            include=['metadatas', 'distances', 'documents'],
+            **({'where': where} if where else {})
+        )
+        
+        # Format results
+        similar_chunks = []
+        if results['ids'] and results['ids'][0]:
+            documents = results.get('documents') or [[None] * len(results['ids'][0])]
+            for i, chunk_id in enumerate(results['ids'][0]):
+                chunk_info = {
+                    'id': chunk_id,
+                    'metadata': results['metadatas'][0][i],
+                    'similarity_score': 1 - results['distances'][0][i],  # Convert distance to similarity
+                    'content': documents[0][i] or self._get_chunk_content(chunk_id)
+                }
+                similar_chunks.append(chunk_info)
+        return similar_chunks
+    
+    def iter_batch_search(self, queries: List[str], top_k: int = 5, batch_size: int = 256,
+                          include_content: bool = True) -> Iterator[Tuple[int, List[Dict]]]:
+        """
+        Dense search for many queries at once, yielding (query index, results)
+        as each batch completes. Each batch is encoded in one pass and sent to
+        ChromaDB as a single matrix query.
+        """
+        if not self.embedding_model or not self.vector_store:
+            raise RuntimeError("Embedding system not fully initialized")
+        if self.projector and not self.projector.is_fitted:
+            raise RuntimeError("Embedding projection not fitted; ingest documents first")
+        
+        include = ['metadatas', 'distances'] + (['documents'] if include_content else [])
+        for start in range(0, len(queries), batch_size):
+            batch = queries[start:start + batch_size]
+            encode_start = time.perf_counter()
+            vectors = self._embed_texts(batch)
+            query_start = time.perf_counter()
+            results = self.collection.query(query_embeddings=vectors.tolist(), n_results=top_k, include=include)
+            logger.info(f"Batch search of {len(batch)} queries: encode {(query_start - encode_start) * 1000:.0f}ms, "
+                        f"search {(time.perf_counter() - query_start) * 1000:.0f}ms")
+            
+            documents = results.get('documents') if include_content else None
+            for row in range(len(batch)):
+                yield start + row, [
+                    {
+                        'id': chunk_id,
+                        'metadata': results['metadatas'][row][i],
+                        'similarity_score': 1 - results['distances'][row][i],
+                        **({'content': documents[row][i]} if documents else {})
+                    }
+                    for i, chunk_id in enumerate(results['ids'][row])
+                ]
+    
+    def _multi_query_search(self, query: str, top_k: int, previous_topic: Optional[str], stats: Dict) -> List[Dict]:
+        """
+        Search with the question and its local rewrites at once: all variants
+        are encoded in one batch and sent to ChromaDB as one matrix query, then
+        deduplicated and fused with reciprocal-rank fusion. similarity_score is
+        the best similarity of a chunk to any variant.
+        """
+        if self.projector and not self.projector.is_fitted:
+            logger.error("Embedding projection not fitted; ingest documents first")
+            return []
+        variants = generate_query_variants(query, previous_topic)
+        stats['variants'] = variants
+        
+        start = time.perf_counter()
+        vectors = self._embed_texts(variants)
+        stats['encode_ms'] = (time.perf_counter() - start) * 1000
+        
+        start = time.perf_counter()
+        results = self.collection.query(
+            query_embeddings=vectors.tolist(),
+            n_results=top_k * 2 if len(variants) > 1 else top_k,
+            include=['metadatas', 'distances', 'documents']
+        )
+        stats['search_ms'] = (time.perf_counter() - start) * 1000
+        
+        start = time.perf_counter()
+        fused: Dict[str, float] = {}
+        best: Dict[str, Dict] = {}
+        matched: Dict[str, int] = {}
+        documents = results.get('documents')
+        for row in range(len(variants)):
+            for rank, chunk_id in enumerate(results['ids'][row], 1):
+                fused[chunk_id] = fused.get(chunk_id, 0.0) + 1.0 / (self.RRF_K + rank)
+                matched[chunk_id] = matched.get(chunk_id, 0) + 1
+                similarity = 1 - results['distances'][row][rank - 1]
+                if chunk_id not in best or similarity > best[chunk_id]['similarity_score']:
+                    best[chunk_id] = {
+                        'id': chunk_id,
+                        'metadata': results['metadatas'][row][rank - 1],
+                        'similarity_score': similarity,
+                        'content': (documents[row][rank - 1] if documents else None) or self._get_chunk_content(chunk_id)
+                    }
+        
+        ranked = sorted(fused, key=fused.get, reverse=True)[:top_k]
+        stats['fusion_ms'] = (time.perf_counter() - start) * 1000
+        return [dict(best[chunk_id], matched_queries=matched[chunk_id]) for chunk_id in ranked]
+    
+    def _routed_search(self, query_embedding: np.ndarray, top_k: int, stats: Dict) -> List[Dict]:
+        """
+        Two-stage search: rank sources by centroid similarity, then search
+        only the chunks of the top ROUTED_SOURCES sources. A sample of
+        queries is re-run against the full index in the background to track
+        how much recall routing costs.
+        """
+        if len(self.source_centroids) == 0 and self.collection.count() > 0:
+            logger.info("Source centroids missing; rebuilding from the vector store...")
+            self.source_centroids.rebuild_from_collection(self.collection)
+        
+        start = time.perf_counter()
+        sources = self.source_centroids.route(query_embedding, self.ROUTED_SOURCES)
+        stats['route_ms'] = (time.perf_counter() - start) * 1000
+        stats['routed_sources'] = sources
+        if not sources or len(sources) >= len(self.source_centroids):
+            # Routing cannot narrow the search; a plain dense search is cheaper
+            return self._dense_search(query_embedding, top_k)
+        
+        start = time.perf_counter()
+        where = {'source': sources[0]} if len(sources) == 1 else {'source': {'$in': sources}}
+        results = self._dense_search(query_embedding, top_k, where)
+        stats['search_ms'] = (time.perf_counter() - start) * 1000
+        
+        with self._routing_lock:
+            self.routing_stats["queries"] += 1
+        if random.random() < self.ROUTING_AUDIT_RATE:
+            self._search_pool.submit(self._audit_routing, query_embedding, top_k, [chunk['id'] for chunk in results])
+        return results
+    
+    def _audit_routing(self, query_embedding: np.ndarray, top_k: int, routed_ids: List[str]):
+        """Compare a routed result with the full search and record recall@k."""
+        try:
+            full_ids = [chunk['id'] for chunk in self._dense_search(query_embedding, top_k)]
+            if not full_ids:
+                return
+            recall = len(set(full_ids) & set(routed_ids)) / len(full_ids)
+            with self._routing_lock:
+                self.routing_stats["audited"] += 1
+                self.routing_stats["recall_sum"] += recall
+                mean_recall = self.routing_stats["recall_sum"] / self.routing_stats["audited"]
+            if mean_recall < self.ROUTING_RECALL_ALERT:
+                logger.warning(f"Routed search recall@{top_k} is {mean_recall:.2f} over "
+                               f"{self.routing_stats['audited']} audited queries; consider raising MEDBOT_ROUTING_SOURCES")
+        except Exception as e:
+            logger.error(f"Error auditing routed search: {e}")
+    
+    def _binary_search(self, query_embedding: np.ndarray, top_k: int, stats: Dict) -> List[Dict]:
+        """Hamming prefilter over packed sign bits, then float cosine re-ranking."""
+        if len(self.binary_index) == 0 and self.collection.count() > 0:
+            logger.info("Binary index missing; rebuilding from the vector store...")
+            self.binary_index.rebuild_from_collection(self.collection)
+        
+        start = time.perf_counter()
+        hits = self.binary_index.search(query_embedding, top_k, self.BINARY_CANDIDATES)
+        stats['binary_ms'] = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        results = self._hydrate(hits)
+        stats['hydrate_ms'] = (time.perf_counter() - start) * 1000
+        return results
+    
+    def _bm25_search(self, query: str, top_k: int, stats: Dict) -> List[Dict]:
+        """Keyword search with the BM25 index."""
+        start = time.perf_counter()
+        hits = self._bm25_hits(query, top_k)
+        stats['bm25_ms'] = (time.perf_counter() - start) * 1000
+        return self._hydrate(hits)
+    
+    def _bm25_hits(self, query: str, top_k: int) -> List[Tuple[str, float]]:
+        if len(self.bm25_index) == 0 and self.collection.count() > 0:
+            logger.info("BM25 index missing; rebuilding from the vector store...")
+            self.bm25_index.rebuild_from_collection(self.collection)
+        return self.bm25_index.search(query, top_k)
+    
+    def _hybrid_search(self, query: str, top_k: int, stats: Dict) -> List[Dict]:
+        """
+        Run dense and BM25 retrieval in parallel and merge the two rankings
+        with reciprocal-rank fusion. similarity_score is the fused score
+        scaled so a chunk ranked first by both arms scores 1.0.
+        """
+        if self.projector and not self.projector.is_fitted:
+            logger.error("Embedding projection not fitted; ingest documents first")
+            return []
+        fetch_k = top_k * self.HYBRID_FETCH_FACTOR
+        
+        def timed(arm, fn, *args):
+            start = time.perf_counter()
+            result = fn(*args)
+            stats[f'{arm}_ms'] = (time.perf_counter() - start) * 1000
+            return result
+        
+        def dense_arm():
+            return self._dense_search(self.embed_query(query), fetch_k)
+        
+        dense_future = self._search_pool.submit(timed, 'dense', dense_arm)
+        bm25_future = self._search_pool.submit(timed, 'bm25', self._bm25_hits, query, fetch_k)
+        dense_hits = dense_future.result()
+        try:
+            bm25_hits = bm25_future.result()
+        except Exception as e:
+            # Keyword arm failing should not cost the dense results
+            logger.error(f"BM25 search failed, using dense results only: {e}")
+            bm25_hits = []
+        
+        start = time.perf_counter()
+        fused: Dict[str, float] = {}
+        dense_rank = {chunk['id']: rank for rank, chunk in enumerate(dense_hits, 1)}
+        bm25_rank = {chunk_id: rank for rank, (chunk_id, _) in enumerate(bm25_hits, 1)}
+        for ranks in (dense_rank, bm25_rank):
+            for chunk_id, rank in ranks.items():
+                fused[chunk_id] = fused.get(chunk_id, 0.0) + 1.0 / (self.RRF_K + rank)
+        best = sorted(fused, key=fused.get, reverse=True)[:top_k]
+        
+        # Dense hits already carry content; only BM25-only hits need a lookup
+        by_id = {chunk['id']: chunk for chunk in dense_hits}
+        missing = [(chunk_id, 0.0) for chunk_id in best if chunk_id not in by_id]
+        by_id.update({chunk['id']: chunk for chunk in self._hydrate(missing)})
+        
+        results = []
+        for chunk_id in best:
+            if chunk_id not in by_id:
+                continue
+            chunk = dict(by_id[chunk_id])
+            chunk['similarity_score'] = fused[chunk_id] * (self.RRF_K + 1) / 2
+            chunk['dense_rank'] = dense_rank.get(chunk_id)
+            chunk['bm25_rank'] = bm25_rank.get(chunk_id)
+            results.append(chunk)
+        stats['fusion_ms'] = (time.perf_counter() - start) * 1000
+        return results
+    
+    @property
+    def last_search_stats(self) -> Dict:
+        """Mode and per-arm latencies (ms) of the last search on this thread."""
+        return dict(getattr(self._search_stats, 'value', {}))
+    
+    def _hydrate(self, hits: List[Tuple[str, float]]) -> List[Dict]:
+        """Attach stored metadata and text to (chunk id, score) hits in one lookup."""
+        if not hits:
+            return []
+        
+        stored = self.collection.get(ids=[chunk_id for chunk_id, _ in hits], include=['metadatas', 'documents'])
+        documents = stored.get('documents') or [None] * len(stored['ids'])
+        metadata_by_id = dict(zip(stored['ids'], stored['metadatas']))
+        document_by_id = dict(zip(stored['ids'], documents))
+        
+        return [
+            {
+                'id': chunk_id,
+                'metadata': metadata_by_id.get(chunk_id, {}),
+                'similarity_score': score,
+                'content': document_by_id.get(chunk_id) or self._get_chunk_content(chunk_id)
+            }
+            for chunk_id, score in hits
+        ]
+    
+    def get_neighbour_chunks(self, chunks: List[Dict], window: int = 1) -> List[Dict]:
+        """
+        Fetch the chunks immediately before/after the given ones in their
+        source document (by id, no search). Neighbours inherit the score of
+        the chunk they were found next to.
+        """
+        seen = {chunk['id'] for chunk in chunks}
+        wanted: Dict[str, float] = {}
+        for chunk in chunks:
+            source, index = chunk_position(chunk)
+            if index is None:
+                continue
+            for offset in range(-window, window + 1):
+                neighbour_id = f"{source}_chunk_{index + offset}"
+                if offset and index + offset >= 0 and neighbour_id not in seen:
+                    wanted.setdefault(neighbour_id, chunk.get('similarity_score', 0.0))
+        if not wanted:
+            return []
+        
+        stored = self.collection.get(ids=list(wanted), include=['metadatas', 'documents'])
+        return [
+            {
+                'id': chunk_id,
+                'metadata': metadata,
+                'similarity_score': wanted[chunk_id],
+                'content': document or self._get_chunk_content(chunk_id)
+            }
+            for chunk_id, metadata, document in zip(stored['ids'], stored['metadatas'],
+                                                    stored.get('documents') or [None] * len(stored['ids']))
+        ]
+    
+    def get_chunk_embeddings(self, chunk_ids: List[str]) -> np.ndarray:
+        """Fetch stored vectors for chunk ids (one row per id, in order) without re-encoding."""
+        stored = self.collection.get(ids=list(chunk_ids), include=['embeddings'])
+        vector_by_id = dict(zip(stored['ids'], stored['embeddings']))
+        return np.asarray([vector_by_id[chunk_id] for chunk_id in chunk_ids], dtype=np.float32)
+    
     def _get_chunk_content(self, chunk_id: str) -> str:
         """Retrieve the actual content of a chunk from storage."""
         try:
-            # This would typically retrieve from a document store
-            # For now, we'll return a placeholder
+            stored = self.collection.get(ids=[chunk_id], include=['documents'])
+            if stored['ids'] and stored.get('documents') and stored['documents'][0]:
+                return stored['documents'][0]
+            # Collections ingested before chunk texts were stored only have embeddings
             return f"Content for chunk: {chunk_id}"
         except Exception as e:
             logger.error(f"Error retrieving chunk content: {e}")
@@ -205,30 +715,122 @@ class EmbeddingSystem:
             return {
                 "status": "active",
                 "total_embeddings": len(collection_info['ids']) if collection_info['ids'] else 0,
-                "collection_name": "medical_knowledge",
-                "database_path": "./healthcare_knowledge_db"
+                "collection_name": self.collection_name,
+                "kb_generation": self.kb_generation,
+                "routing": self._routing_info(),
+                "embedding_backend": self.inference_backend,
+                "embedding_model_source": "bundle" if self.model_path != self.model_name else "hub",
+                "embedding_model_load_seconds": MODEL_LOAD_TIMES.get(self.model_name),
+                "database_path": self.DATABASE_PATH,
+                "projection": {
+                    "method": self.projector.method,
+                    "dimensions": self.projector.target_dim,
+                    "fitted": self.projector.is_fitted
+                } if self.projector else None
             }
         except Exception as e:
             return {"status": "error", "error": str(e)}
     
-    def process_and_store_chunks(self, chunks: List[Dict[str, str]]) -> bool:
+    def _routing_info(self) -> Dict:
+        with self._routing_lock:
+            audited = self.routing_stats["audited"]
+            return {
+                "sources": len(self.source_centroids),
+                "sources_per_query": self.ROUTED_SOURCES,
+                "routed_queries": self.routing_stats["queries"],
+                "audited_queries": audited,
+                "mean_recall_vs_full": self.routing_stats["recall_sum"] / audited if audited else None
+            }
+    
+    def process_and_store_chunks(self, chunks: Union[ChunkStore, List[Dict[str, str]]]) -> bool:
         """
         Complete pipeline: process chunks, create embeddings, and store them.
         This implements the complete left side of the RAG workflow diagram.
+        
+        Chunks are encoded and stored one batch at a time, so only a single
+        batch of embeddings and metadata is alive at any point. A batch that
+        fails is logged and skipped; the run fails only if nothing was stored.
+        The side indexes (binary, BM25, source centroids) are updated only
+        after a batch is in ChromaDB; if updating them fails they are rebuilt
+        from the collection, so they never disagree with it.
         """
         logger.info("Starting complete RAG processing pipeline...")
         
-        # Step 1: Create embeddings from chunks
-        embeddings = self.create_embeddings(chunks)
-        if not embeddings:
+        if not self.embedding_model:
+            logger.error("Embedding model not available")
+            return False
+        if not self.vector_store or not self.collection:
+            logger.error("Vector store not available")
+            return False
+        
+        chunks = as_chunk_store(chunks)
+        if not chunks:
             logger.error("Failed to create embeddings")
             return False
         
-        # Step 2: Store embeddings in vector database
-        success = self.store_embeddings(embeddings)
-        if not success:
-            logger.error("Failed to store embeddings")
+        total_stored = 0
+        failed = 0
+        stale_indexes = False
+        try:
+            self._ensure_projection(chunks)
+            
+            for start in range(0, len(chunks), self.STORE_BATCH_SIZE):
+                stop = min(start + self.STORE_BATCH_SIZE, len(chunks))
+                
+                try:
+                    # Step 1: Create embeddings for this batch of chunks
+                    vectors = self._embed_texts(chunks.contents[start:stop])
+                    
+                    # Step 2: Store the batch (vectors and chunk texts) in the vector database
+                    ids = chunks.ids(start, stop)
+                    texts = chunks.contents[start:stop]
+                    self.collection.add(
+                        ids=ids,
+                        embeddings=vectors.tolist(),
+                        metadatas=chunks.metadatas(start, stop),
+                        documents=texts
+                    )
+                except Exception as e:
+                    failed += stop - start
+                    logger.error(f"Error storing chunks {start}-{stop}, skipping batch: {e}")
+                    continue
+                
+                # Step 3: Index the stored batch; ChromaDB already holds it, so a
+                # failure here is repaired by rebuilding the side indexes below
+                total_stored += stop - start
+                if not stale_indexes:
+                    try:
+                        self.binary_index.add(ids, vectors)
+                        self.bm25_index.add(ids, texts)
+                        self.source_centroids.add(ids, [chunks.source_of(i) for i in range(start, stop)], vectors)
+                    except Exception as e:
+                        logger.error(f"Error indexing chunks {start}-{stop}, side indexes will be rebuilt: {e}")
+                        stale_indexes = True
+                
+                logger.info(f"Stored batch {start//self.STORE_BATCH_SIZE + 1}: {stop - start} embeddings (Total: {total_stored}/{len(chunks)})")
+                
+            if stale_indexes:
+                logger.info("Rebuilding side indexes from the vector store...")
+                self.binary_index.rebuild_from_collection(self.collection)
+                self.bm25_index.rebuild_from_collection(self.collection)
+                self.source_centroids.rebuild_from_collection(self.collection)
+            elif total_stored:
+                self.binary_index.save()
+                self.bm25_index.save()
+                self.source_centroids.save()
+            
+        except Exception as e:
+            logger.error(f"Failed to store embeddings: {e}")
+            return False
+        finally:
+            if total_stored:
+                self._bump_generation()
+        
+        if not total_stored:
+            logger.error("Failed to store embeddings: every batch failed")
             return False
+        if failed:
+            logger.warning(f"Skipped {failed} of {len(chunks)} chunks that could not be stored")
         
         logger.info("Complete RAG processing pipeline completed successfully!")
         return True
@@ -240,6 +842,16 @@ class EmbeddingSystem:
         
         try:
             self.vector_store.reset()
+            # Recreated straight away (with cosine space) so the old handle is never used
+            self.collection = self._get_collection()
+            self.binary_index.clear()
+            self.bm25_index.clear()
+            self.source_centroids.clear()
+            if self.projector:
+                # The projection was fitted on the old corpus
+                self._projection_path.unlink(missing_ok=True)
+                self.projector = EmbeddingProjector(self.projector.target_dim, self.projector.method)
+            self._bump_generation()
             logger.info("Knowledge base reset successfully")
             return True
         except Exception as e:
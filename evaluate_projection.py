@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Embedding Projection Evaluation
+Measures recall@k and search latency of dimension-reduced embedding indexes
+against the full-dimension index, so the smallest projection that keeps
+retrieval quality can be chosen for EmbeddingSystem(projection_dim=...).
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+
+# MEDBOT_OFFLINE must take effect before the embedding model is imported
+from model_bundle import apply_offline_mode
+apply_offline_mode()
+
+from embedding_projection import EmbeddingProjector
+
+SAMPLE_QUESTIONS = [
+    "What are the symptoms of diabetes?",
+    "How to treat hypertension?",
+    "What is the normal blood pressure range?",
+    "Explain cardiovascular disease",
+    "What are common skin conditions?",
+    "What causes tuberculosis and how is it transmitted?",
+    "How is hypothyroidism managed?",
+    "What are the signs of preeclampsia?",
+    "Which drugs are used in methadone maintenance therapy?",
+    "What is the first aid for a burn injury?",
+    "What are the risk factors for lung cancer?",
+    "How does anaesthesia work?",
+    "What are foodborne diseases?",
+    "What is HER2-positive breast cancer?",
+    "How is heart transplant rejection prevented?",
+]
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def load_knowledge_base_vectors(questions_file: str = None):
+    """Load stored full-dimension vectors and encode evaluation questions."""
+    from embedding_system import EmbeddingSystem
+
+    # projection_dim=0 reads the full-dimension collection even if MEDBOT_PROJECTION_DIM is set
+    embedding_system = EmbeddingSystem(projection_dim=0)
+    if not embedding_system.collection or not embedding_system.embedding_model:
+        raise RuntimeError("Embedding system not available; build the knowledge base first")
+
+    stored = embedding_system.collection.get(include=['embeddings'])
+    corpus = np.asarray(stored['embeddings'], dtype=np.float32)
+    if corpus.size == 0:
+        raise RuntimeError("Knowledge base is empty; run process_pdfs.py first")
+
+    questions = SAMPLE_QUESTIONS
+    if questions_file:
+        questions = [q.strip() for q in Path(questions_file).read_text(encoding='utf-8').splitlines() if q.strip()]
+    queries = embedding_system._encode_texts(questions)
+    return corpus, queries
+
+
+def make_synthetic_vectors(num_vectors: int, num_queries: int, dim: int, seed: int = 0):
+    """Clustered vectors on a low-rank subspace, roughly shaped like sentence embeddings."""
+    rng = np.random.default_rng(seed)
+    latent_dim = dim // 6
+    mixing = rng.standard_normal((latent_dim, dim)).astype(np.float32)
+    centers = rng.standard_normal((max(8, num_vectors // 500), latent_dim)).astype(np.float32)
+    labels = rng.integers(0, len(centers), num_vectors)
+    latent = centers[labels] + 0.6 * rng.standard_normal((num_vectors, latent_dim)).astype(np.float32)
+    corpus = latent @ mixing + 0.5 * rng.standard_normal((num_vectors, dim)).astype(np.float32)
+    picks = rng.integers(0, num_vectors, num_queries)
+    queries = corpus[picks] + 0.5 * rng.standard_normal((num_queries, dim)).astype(np.float32)
+    return corpus, queries
+
+
+def exact_top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    scores = queries @ corpus.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def timed_search(corpus: np.ndarray, queries: np.ndarray, k: int):
+    """Search one query at a time (as in serving) and return (top-k ids, ms per query)."""
+    # A corpus smaller than k returns every row, like exact_top_k
+    k = min(k, len(corpus))
+    results = np.empty((len(queries), k), dtype=np.int64)
+    start = time.perf_counter()
+    for i, query in enumerate(queries):
+        scores = corpus @ query
+        top = np.argpartition(-scores, k - 1)[:k]
+        results[i] = top[np.argsort(-scores[top])]
+    elapsed_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    return results, elapsed_ms
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate dimension-reduced embedding indexes")
+    parser.add_argument("--dims", type=int, nargs="+", default=[32, 64, 96, 128, 192, 256],
+                        help="Target dimensions to evaluate")
+    parser.add_argument("--methods", nargs="+", default=["pca", "random"], choices=EmbeddingProjector.METHODS)
+    parser.add_argument("--k", type=int, default=5, help="Recall cut-off")
+    parser.add_argument("--min-recall", type=float, default=0.9, help="Recall needed to recommend a setting")
+    parser.add_argument("--fit-sample", type=int, default=5000, help="Corpus vectors used to fit PCA")
+    parser.add_argument("--questions", help="File with one evaluation question per line")
+    parser.add_argument("--synthetic", type=int, metavar="N",
+                        help="Use N synthetic 384-d vectors instead of the knowledge base")
+    args = parser.parse_args()
+
+    print("MedBot - Embedding Projection Evaluation")
+    print("=" * 60)
+
+    if args.synthetic:
+        corpus, queries = make_synthetic_vectors(args.synthetic, 200, 384)
+        print(f"Synthetic corpus: {len(corpus):,} vectors, {len(queries)} queries")
+    else:
+        corpus, queries = load_knowledge_base_vectors(args.questions)
+        print(f"Knowledge base: {len(corpus):,} vectors, {len(queries)} queries")
+
+    corpus = normalize(corpus.astype(np.float32))
+    queries = normalize(queries.astype(np.float32))
+    truth = exact_top_k(corpus, queries, args.k)
+    _, full_ms = timed_search(corpus, queries, args.k)
+    full_mib = corpus.nbytes / 2**20
+
+    rng = np.random.default_rng(0)
+    fit_rows = rng.choice(len(corpus), min(args.fit_sample, len(corpus)), replace=False)
+
+    print("-" * 60)
+    print(f"{'Method':<8}{'Dims':>6}{'Index MiB':>11}{f'Recall@{args.k}':>11}{'ms/query':>10}{'Speedup':>9}")
+    print(f"{'full':<8}{corpus.shape[1]:>6}{full_mib:>11.1f}{1.0:>11.3f}{full_ms:>10.3f}{1.0:>8.1f}x")
+
+    best = None
+    for method in args.methods:
+        for dim in sorted(args.dims):
+            if dim >= corpus.shape[1] or (method == 'pca' and dim > len(fit_rows)):
+                continue
+            projector = EmbeddingProjector(dim, method).fit(corpus[fit_rows])
+            reduced_corpus = projector.transform(corpus)
+            reduced_queries = projector.transform(queries)
+            found, ms = timed_search(reduced_corpus, reduced_queries, args.k)
+            recall = recall_at_k(found, truth)
+            print(f"{method:<8}{dim:>6}{reduced_corpus.nbytes / 2**20:>11.1f}{recall:>11.3f}{ms:>10.3f}{full_ms / ms:>8.1f}x")
+            if recall >= args.min_recall and (best is None or dim < best[1]):
+                best = (method, dim, recall)
+
+    print("-" * 60)
+    if best:
+        print(f"Smallest index with recall@{args.k} >= {args.min_recall}: {best[0]} {best[1]} dims (recall {best[2]:.3f})")
+        print(f"Enable with MEDBOT_PROJECTION_DIM={best[1]} MEDBOT_PROJECTION_METHOD={best[0]}")
+    else:
+        print(f"No projection reached recall@{args.k} >= {args.min_recall}; keep the full-dimension index")
+
+
+if __name__ == "__main__":
+    main()
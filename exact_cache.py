@@ -0,0 +1,185 @@
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def normalize_question(question: str) -> str:
+    """Case- and whitespace-insensitive form of a question."""
+    return " ".join((question or "").lower().split())
+
+
+class LeaderGone(RuntimeError):
+    """The request computing a result was cancelled; waiters compute it themselves."""
+
+
+class ExactResponseCache:
+    """
+    In-memory cache of complete responses for byte-identical requests
+    (after normalisation), with single-flight: concurrent identical requests
+    wait for the first one instead of computing the same answer again.
+
+    Keys include the knowledge base generation; when a request arrives with
+    a new generation the whole cache is dropped, so ingestion or a reset
+    invalidates it automatically.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._generation = None
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "collapsed": 0, "invalidations": 0}
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        return hashlib.sha256("\x1f".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+
+    def _check_generation(self, generation: str):
+        if generation != self._generation:
+            if self._entries:
+                logger.info(f"Knowledge base generation changed; dropping {len(self._entries)} cached responses")
+                self.stats["invalidations"] += 1
+            self._entries.clear()
+            self._generation = generation
+
+    def _lookup(self, key: str, generation: str) -> Optional[Dict[str, Any]]:
+        # Caller holds self._lock
+        self._check_generation(generation)
+        entry = self._entries.get(key)
+        if entry and time.time() - entry[0] < self.ttl_seconds:
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry[1]
+        if entry:
+            del self._entries[key]
+        return None
+
+    def _store(self, key: str, generation: str, result: Dict[str, Any], cacheable: Callable[[Dict[str, Any]], bool]):
+        # Caller holds self._lock. Results computed against an older generation are not kept
+        if cacheable(result) and generation == self._generation:
+            self._entries[key] = (time.time(), result)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def begin(self, key: str, generation: str) -> Tuple[str, Any]:
+        """
+        ('hit', result), ('collapsed', leader's future) or ('miss', own future).
+        For callers that produce the result incrementally (streaming): after a
+        miss the caller leads and must call finish or fail with its future.
+        """
+        with self._lock:
+            cached = self._lookup(key, generation)
+            if cached is not None:
+                return "hit", cached
+
+            future = self._inflight.get(key)
+            if future is not None:
+                self.stats["collapsed"] += 1
+                return "collapsed", future
+            future = Future()
+            self._inflight[key] = future
+            self.stats["misses"] += 1
+            return "miss", future
+
+    def fail(self, key: str, future: Future, error: BaseException):
+        """
+        End a lead that raised. Cancellation (e.g. the leader's client went
+        away) is not the followers' failure: they get LeaderGone and retry.
+        """
+        with self._lock:
+            self._inflight.pop(key, None)
+        if not isinstance(error, Exception):
+            error = LeaderGone("The identical in-flight request was cancelled")
+        future.set_exception(error)
+
+    def finish(self, key: str, generation: str, future: Future, result: Dict[str, Any],
+                cacheable: Callable[[Dict[str, Any]], bool]):
+        with self._lock:
+            self._inflight.pop(key, None)
+            self._store(key, generation, result, cacheable)
+        future.set_result(result)
+
+    def get_or_compute(self,
+                       key: str,
+                       generation: str,
+                       compute: Callable[[], Dict[str, Any]],
+                       cacheable: Callable[[Dict[str, Any]], bool]) -> Tuple[Dict[str, Any], str]:
+        """
+        Return (result, status) where status is 'hit', 'collapsed' (waited on an
+        identical in-flight request) or 'miss' (computed here).
+        """
+        while True:
+            status, value = self.begin(key, generation)
+            if status == "hit":
+                return value, status
+            if status != "collapsed":
+                break
+            try:
+                return value.result(), status
+            except LeaderGone:
+                continue
+
+        try:
+            result = compute()
+        except BaseException as e:
+            self.fail(key, value, e)
+            raise
+        self.finish(key, generation, value, result, cacheable)
+        return result, status
+
+    async def aget_or_compute(self,
+                              key: str,
+                              generation: str,
+                              compute: Callable[[], Awaitable[Dict[str, Any]]],
+                              cacheable: Callable[[Dict[str, Any]], bool]) -> Tuple[Dict[str, Any], str]:
+        """
+        Async version of get_or_compute: compute is a coroutine function and
+        followers await the leader without blocking the event loop. Sync and
+        async callers share the same in-flight table.
+        """
+        while True:
+            status, value = self.begin(key, generation)
+            if status == "hit":
+                return value, status
+            if status != "collapsed":
+                break
+            try:
+                # Shielded: a cancelled follower must not cancel the leader's future
+                return await asyncio.shield(asyncio.wrap_future(value)), status
+            except LeaderGone:
+                continue
+
+        try:
+            result = await compute()
+        except BaseException as e:
+            self.fail(key, value, e)
+            raise
+        self.finish(key, generation, value, result, cacheable)
+        return result, status
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            requests = self.stats["hits"] + self.stats["misses"] + self.stats["collapsed"]
+            return {
+                **self.stats,
+                "entries": len(self._entries),
+                "in_flight": len(self._inflight),
+                "hit_rate": (self.stats["hits"] + self.stats["collapsed"]) / requests if requests else 0.0,
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+            }
@@ -5,6 +5,8 @@ from typing import List, Dict, Optional, Tuple
 from pathlib import Path
 import numpy as np
 
+from model_bundle import resolve_model_path, timed_load
+
 # LangChain imports
 try:
     from langchain_community.vectorstores import Chroma
@@ -44,11 +46,12 @@ class HealthcareRAG:
     def _initialize_langchain_rag(self):
         """Initialize LangChain-based RAG system."""
         try:
-            # Initialize embeddings
-            self.embeddings = HuggingFaceEmbeddings(
-                model_name="sentence-transformers/all-MiniLM-L6-v2",
+            # Initialize embeddings (from the local model bundle when available)
+            model_name = "sentence-transformers/all-MiniLM-L6-v2"
+            self.embeddings = timed_load(model_name, lambda: HuggingFaceEmbeddings(
+                model_name=resolve_model_path(model_name),
                 model_kwargs={'device': 'cpu'}
-            )
+            ))
             
             # Load existing knowledge base if available
             if os.path.exists(self.persist_directory):
@@ -0,0 +1,198 @@
+import asyncio
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+AZURE_API_VERSION = "2024-02-15-preview"  # Latest version for GPT-4o
+HUGGINGFACE_MODEL_URL = "https://api-inference.huggingface.co/models/meta-llama/Llama-2-7b-chat-hf"
+
+
+class LLMClientPool:
+    """
+    One lazily created, long-lived client per LLM provider, shared by all
+    threads. Each client sits on a keep-alive HTTP connection pool, so calls
+    after the first reuse open connections instead of paying for a new
+    pool, TCP connect and TLS handshake every time.
+
+    Pool size, keep-alive expiry and timeout come from MEDBOT_LLM_POOL_SIZE,
+    MEDBOT_LLM_KEEPALIVE_SECONDS and MEDBOT_LLM_TIMEOUT.
+
+    The async_* variants return asyncio clients. Their connection pools are
+    bound to an event loop, so they are cached per running loop.
+
+    SDK-level retries are disabled; LLMProvider retries with its own
+    per-provider policies and circuit breakers (see resilience.py).
+    """
+
+    def __init__(self,
+                 pool_size: int = None,
+                 keepalive_seconds: float = None,
+                 timeout_seconds: float = None):
+        self.pool_size = pool_size or int(os.getenv('MEDBOT_LLM_POOL_SIZE', '20'))
+        self.keepalive_seconds = keepalive_seconds or float(os.getenv('MEDBOT_LLM_KEEPALIVE_SECONDS', '60'))
+        self.timeout_seconds = timeout_seconds or float(os.getenv('MEDBOT_LLM_TIMEOUT', '120'))
+        self._clients: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, name: str, factory: Callable[[], Any]) -> Any:
+        client = self._clients.get(name)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(name)
+                if client is None:
+                    client = factory()
+                    self._clients[name] = client
+                    logger.info(f"Created pooled {name} client (pool size {self.pool_size})")
+        return client
+
+    @staticmethod
+    def _loop_key(name: str) -> str:
+        return f"{name}@{id(asyncio.get_running_loop())}"
+
+    def _limits(self):
+        import httpx
+
+        return httpx.Limits(
+            max_connections=self.pool_size,
+            max_keepalive_connections=self.pool_size,
+            keepalive_expiry=self.keepalive_seconds
+        )
+
+    def _http_client(self):
+        import httpx
+
+        return httpx.Client(limits=self._limits(), timeout=self.timeout_seconds)
+
+    def _async_http_client(self):
+        import httpx
+
+        return httpx.AsyncClient(limits=self._limits(), timeout=self.timeout_seconds)
+
+    @staticmethod
+    def _azure_settings() -> Dict[str, str]:
+        api_key = os.getenv('AZURE_OPENAI_API_KEY')
+        endpoint = os.getenv('ENDPOINT_URL')
+        if not api_key:
+            raise ValueError("AZURE_OPENAI_API_KEY not found in environment variables")
+        if not endpoint:
+            raise ValueError("ENDPOINT_URL not found in environment variables")
+        return {"api_key": api_key, "azure_endpoint": endpoint, "api_version": AZURE_API_VERSION}
+
+    @staticmethod
+    def _groq_api_key() -> str:
+        api_key = os.getenv('GROQ_API_KEY')
+        if not api_key:
+            raise ValueError("GROQ_API_KEY not found in environment variables")
+        return api_key
+
+    def azure(self):
+        """AzureOpenAI client for ENDPOINT_URL."""
+        def create():
+            from openai import AzureOpenAI
+
+            return AzureOpenAI(**self._azure_settings(), http_client=self._http_client(), max_retries=0)
+        return self._get('azure', create)
+
+    def async_azure(self):
+        """AsyncAzureOpenAI client for ENDPOINT_URL (call from inside the event loop)."""
+        def create():
+            from openai import AsyncAzureOpenAI
+
+            return AsyncAzureOpenAI(**self._azure_settings(), http_client=self._async_http_client(), max_retries=0)
+        return self._get(self._loop_key('async_azure'), create)
+
+    def groq(self):
+        def create():
+            import groq
+
+            return groq.Groq(api_key=self._groq_api_key(), http_client=self._http_client(), max_retries=0)
+        return self._get('groq', create)
+
+    def async_groq(self):
+        def create():
+            import groq
+
+            return groq.AsyncGroq(api_key=self._groq_api_key(), http_client=self._async_http_client(), max_retries=0)
+        return self._get(self._loop_key('async_groq'), create)
+
+    @staticmethod
+    def _local_settings() -> Dict[str, str]:
+        base_url = os.getenv('LOCAL_LLM_BASE_URL')
+        if not base_url:
+            raise ValueError("LOCAL_LLM_BASE_URL not found in environment variables")
+        # Local OpenAI-compatible servers (vLLM, Ollama, llama.cpp) usually ignore the key
+        return {"api_key": os.getenv('LOCAL_LLM_API_KEY', 'local'), "base_url": base_url}
+
+    def local(self):
+        """OpenAI client for a local OpenAI-compatible server at LOCAL_LLM_BASE_URL."""
+        def create():
+            from openai import OpenAI
+
+            return OpenAI(**self._local_settings(), http_client=self._http_client(), max_retries=0)
+        return self._get('local', create)
+
+    def async_local(self):
+        def create():
+            from openai import AsyncOpenAI
+
+            return AsyncOpenAI(**self._local_settings(), http_client=self._async_http_client(), max_retries=0)
+        return self._get(self._loop_key('async_local'), create)
+
+    def gemini(self, api_key: str, model_name: str = 'gemini-pro'):
+        def create():
+            import google.generativeai as genai
+
+            genai.configure(api_key=api_key)
+            return genai.GenerativeModel(model_name)
+        return self._get(f'gemini:{model_name}', create)
+
+    def huggingface(self):
+        """requests.Session with a keep-alive adapter sized to the pool."""
+        def create():
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            return session
+        return self._get('huggingface', create)
+
+    def async_http(self):
+        """Plain httpx.AsyncClient for REST providers without an async SDK."""
+        return self._get(self._loop_key('async_http'), self._async_http_client)
+
+    def close(self):
+        """Close every pooled sync client (their connection pools are released)."""
+        with self._lock:
+            clients = {name: client for name, client in self._clients.items() if '@' not in name}
+            for name in clients:
+                del self._clients[name]
+        for name, client in clients.items():
+            close = getattr(client, 'close', None)
+            if close:
+                try:
+                    close()
+                except Exception as e:
+                    logger.warning(f"Error closing {name} client: {e}")
+
+    async def aclose(self):
+        """Close the async clients bound to the running event loop."""
+        suffix = self._loop_key('')
+        with self._lock:
+            clients = {name: client for name, client in self._clients.items() if name.endswith(suffix)}
+            for name in clients:
+                del self._clients[name]
+        for name, client in clients.items():
+            close = getattr(client, 'aclose', None) or getattr(client, 'close', None)
+            if close:
+                try:
+                    await close()
+                except Exception as e:
+                    logger.warning(f"Error closing {name} client: {e}")
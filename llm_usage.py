@@ -0,0 +1,189 @@
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+from admission import current_request_identity
+from metrics import metrics
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# USD per million (prompt, completion) tokens. List prices, so costs are
+# estimates; override or extend with MEDBOT_LLM_PRICES='{"gpt-4o": [2.5, 10]}'.
+# Unknown models (e.g. local servers) cost 0.
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-4o": (2.50, 10.00),
+    "openai/gpt-oss-20b": (0.10, 0.50),
+    "gemini-pro": (0.50, 1.50),
+}
+
+
+def _load_prices() -> Dict[str, Tuple[float, float]]:
+    prices = dict(MODEL_PRICES)
+    override = os.getenv('MEDBOT_LLM_PRICES')
+    if override:
+        try:
+            prices.update({model: (float(p), float(c)) for model, (p, c) in json.loads(override).items()})
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Ignoring invalid MEDBOT_LLM_PRICES: {e}")
+    return prices
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int,
+                  prices: Dict[str, Tuple[float, float]] = None) -> float:
+    """Estimated USD cost of a call (0 for models without a price)."""
+    prompt_price, completion_price = (prices or MODEL_PRICES).get(model, (0.0, 0.0))
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+
+class RequestUsage:
+    """LLM calls made while serving one request (or one nested step of it)."""
+
+    def __init__(self, endpoint: str, parent: Optional["RequestUsage"] = None):
+        self.endpoint = endpoint
+        self.parent = parent
+        self.calls: List[Dict[str, Any]] = []
+
+    def summary(self) -> Dict[str, Any]:
+        calls = list(self.calls)
+        return {
+            "endpoint": self.endpoint,
+            "llm_calls": len(calls),
+            "prompt_tokens": sum(call["prompt_tokens"] for call in calls),
+            "completion_tokens": sum(call["completion_tokens"] for call in calls),
+            "cost_usd": round(sum(call["cost_usd"] for call in calls), 6),
+            "calls": calls,
+        }
+
+
+_current_usage: ContextVar[Optional[RequestUsage]] = ContextVar("llm_request_usage", default=None)
+
+
+@contextmanager
+def track_llm_usage(endpoint: str = None):
+    """
+    Collect the LLM calls made inside the block. Scopes nest: a call is
+    added to every enclosing scope, and a scope without an endpoint
+    inherits the enclosing one's.
+    """
+    parent = _current_usage.get()
+    usage = RequestUsage(endpoint or (parent.endpoint if parent else "direct"), parent)
+    token = _current_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _current_usage.reset(token)
+
+
+class LLMUsageTracker:
+    """
+    Token, latency and cost accounting for every provider call, aggregated
+    per endpoint, per user and per model. Users beyond max_users are
+    evicted least recently seen first.
+    """
+
+    def __init__(self, max_users: int = None):
+        self.max_users = max_users or int(os.getenv('MEDBOT_USAGE_MAX_USERS', '1000'))
+        self.prices = _load_prices()
+        self._by_endpoint: Dict[str, Dict[str, Any]] = {}
+        self._by_user: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._by_model: Dict[str, Dict[str, Any]] = {}
+        self._totals = self._empty()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _empty() -> Dict[str, Any]:
+        return {"calls": 0, "errors": 0, "prompt_tokens": 0, "completion_tokens": 0,
+                "estimated_calls": 0, "cost_usd": 0.0, "latency_ms": 0.0}
+
+    @staticmethod
+    def _add(bucket: Dict[str, Any], call: Dict[str, Any]):
+        bucket["calls"] += 1
+        bucket["errors"] += int(call["status"] == "error")
+        bucket["prompt_tokens"] += call["prompt_tokens"]
+        bucket["completion_tokens"] += call["completion_tokens"]
+        bucket["estimated_calls"] += int(call["estimated"])
+        bucket["cost_usd"] += call["cost_usd"]
+        bucket["latency_ms"] += call["latency_ms"]
+
+    def record(self, provider: str, model: str, prompt_tokens: int, completion_tokens: int,
+               latency_ms: float, ttft_ms: float = None, estimated: bool = False,
+               status: str = "ok") -> Dict[str, Any]:
+        """
+        Record one provider call (retries included). estimated marks token
+        counts computed locally because the provider reported no usage.
+        """
+        user, _ = current_request_identity()
+        usage = _current_usage.get()
+        endpoint = usage.endpoint if usage else "direct"
+        call = {
+            "provider": provider,
+            "model": model,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "latency_ms": round(latency_ms, 1),
+            "ttft_ms": round(ttft_ms, 1) if ttft_ms is not None else None,
+            "estimated": estimated,
+            "status": status,
+            "cost_usd": round(estimate_cost(model, prompt_tokens, completion_tokens, self.prices), 6),
+        }
+
+        with self._lock:
+            self._add(self._totals, call)
+            self._add(self._by_endpoint.setdefault(endpoint, self._empty()), call)
+            self._add(self._by_model.setdefault(model, self._empty()), call)
+            if user not in self._by_user:
+                self._by_user[user] = self._empty()
+                if len(self._by_user) > self.max_users:
+                    self._by_user.popitem(last=False)
+            self._by_user.move_to_end(user)
+            self._add(self._by_user[user], call)
+
+        metrics.observe(f"llm.{provider}.latency_ms", latency_ms)
+        metrics.observe(f"llm.endpoint.{endpoint}.latency_ms", latency_ms)
+        metrics.increment(f"llm.tokens.{model}.prompt", prompt_tokens)
+        metrics.increment(f"llm.tokens.{model}.completion", completion_tokens)
+        while usage is not None:
+            usage.calls.append(call)
+            usage = usage.parent
+        return call
+
+    @staticmethod
+    def _report(bucket: Dict[str, Any]) -> Dict[str, Any]:
+        calls = bucket["calls"]
+        return {
+            **{key: value for key, value in bucket.items() if key != "latency_ms"},
+            "cost_usd": round(bucket["cost_usd"], 6),
+            "mean_latency_ms": round(bucket["latency_ms"] / calls, 1) if calls else None,
+            "mean_prompt_tokens": round(bucket["prompt_tokens"] / calls, 1) if calls else None,
+        }
+
+    def get_summary(self, top_users: int = 20) -> Dict[str, Any]:
+        """Totals plus per-endpoint, per-model and the most expensive users."""
+        with self._lock:
+            users = sorted(self._by_user.items(), key=lambda item: item[1]["cost_usd"], reverse=True)
+            return {
+                "totals": self._report(self._totals),
+                "by_endpoint": {name: self._report(b) for name, b in self._by_endpoint.items()},
+                "by_model": {name: self._report(b) for name, b in self._by_model.items()},
+                "by_user": {name: self._report(b) for name, b in users[:top_users]},
+                "tracked_users": len(self._by_user),
+                "prices_per_million_tokens": {model: list(price) for model, price in self.prices.items()},
+            }
+
+    def reset(self):
+        with self._lock:
+            self._by_endpoint.clear()
+            self._by_user.clear()
+            self._by_model.clear()
+            self._totals = self._empty()
+
+
+# Shared tracker used by LLMProvider and the API server
+usage_tracker = LLMUsageTracker()
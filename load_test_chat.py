@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+MedBot Chat Load Test
+Fires concurrent /chat requests at a running MedBot server and reports
+latency percentiles, throughput and how much the requests overlapped
+(sum of request latencies / wall time: ~1 when the server handles one
+request at a time, close to the concurrency when they run in parallel).
+A /health probe runs during the load to show whether the event loop
+stays responsive while answers are being generated.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+QUESTIONS = [
+    "What is hypertension?",
+    "What are the symptoms of type 2 diabetes?",
+    "How is asthma treated?",
+    "What causes anemia?",
+    "What are the risk factors for stroke?",
+    "How does insulin work?",
+    "What is the treatment for pneumonia?",
+    "What are the side effects of metformin?",
+]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def chat(client: httpx.AsyncClient, url: str, index: int, unique: bool):
+    question = QUESTIONS[index % len(QUESTIONS)]
+    if unique:
+        # Distinct text so the exact-match cache cannot answer it
+        question = f"{question} (load test {index})"
+    start = time.perf_counter()
+    try:
+        response = await client.post(f"{url}/chat", json={"user_question": question, "chat_history": []})
+        ok = response.status_code == 200
+    except httpx.HTTPError:
+        ok = False
+    return time.perf_counter() - start, ok
+
+
+async def probe_health(client: httpx.AsyncClient, url: str, stop: asyncio.Event, samples: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            await client.get(f"{url}/health")
+            samples.append(time.perf_counter() - start)
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.1)
+
+
+async def run(url: str, requests: int, concurrency: int, unique: bool, timeout: float):
+    limits = httpx.Limits(max_connections=concurrency + 1, max_keepalive_connections=concurrency + 1)
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def limited(index):
+            async with semaphore:
+                return await chat(client, url, index, unique)
+
+        stop, health = asyncio.Event(), []
+        prober = asyncio.create_task(probe_health(client, url, stop, health))
+        start = time.perf_counter()
+        results = await asyncio.gather(*(limited(i) for i in range(requests)))
+        wall = time.perf_counter() - start
+        stop.set()
+        await prober
+
+    latencies = [latency for latency, ok in results if ok]
+    failed = sum(1 for _, ok in results if not ok)
+    if not latencies:
+        print(f"{concurrency:>6}  all {requests} requests failed")
+        return
+    print(f"{concurrency:>6}{len(latencies) / wall:>10.2f}"
+          f"{statistics.mean(latencies) * 1000:>10.0f}{percentile(latencies, 50) * 1000:>10.0f}"
+          f"{percentile(latencies, 95) * 1000:>10.0f}{sum(latencies) / wall:>10.2f}"
+          f"{(max(health) * 1000 if health else float('nan')):>12.0f}{failed:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent /chat load test")
+    parser.add_argument("--url", default="http://localhost:8000", help="Base URL of a running MedBot server")
+    parser.add_argument("--requests", type=int, default=40, help="Requests per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--repeat-questions", action="store_true",
+                        help="Reuse the same questions (measures the exact cache instead of the LLM path)")
+    parser.add_argument("--timeout", type=float, default=180.0)
+    args = parser.parse_args()
+
+    print("MedBot - Chat Load Test")
+    print("=" * 60)
+    print(f"Server: {args.url}  Requests per level: {args.requests}")
+    print("-" * 60)
+    print(f"{'Conc.':>6}{'req/s':>10}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'overlap':>10}"
+          f"{'health max':>12}{'failed':>8}")
+    for concurrency in args.concurrency:
+        asyncio.run(run(args.url, args.requests, concurrency, not args.repeat_questions, args.timeout))
+    print("-" * 60)
+    print("Tip: start the server with ENDPOINT_URL pointing at mock_llm_server.py for "
+          "deterministic LLM latency without API keys.")
+
+
+if __name__ == "__main__":
+    main()
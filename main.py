@@ -4,7 +4,7 @@ import json
 from typing import List, Dict, Optional, Any
 from fastapi import FastAPI, HTTPException, UploadFile, File, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
@@ -13,9 +13,16 @@ from pathlib import Path
 import logging
 import re
 
+# Enable offline mode before anything imports the Hugging Face libraries
+from model_bundle import apply_offline_mode
+apply_offline_mode()
+
 # Import our RAG system
 from rag_system import RAGSystem
 from chat_interface import ChatInterface
+from admission import AdmissionRejected, PRIORITY_BATCH, PRIORITY_INTERACTIVE, llm_request_context
+from llm_usage import track_llm_usage, usage_tracker
+from metrics import metrics
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -48,15 +55,47 @@ chat_interface = ChatInterface(healthcare_rag=None)  # We don't need the old RAG
 knowledge_base_initialized = False
 system_status = {}
 
+# Attach per-request LLM usage (tokens, latency, cost) to every chat response
+DEBUG_MODE = os.getenv('MEDBOT_DEBUG', '').lower() in ('1', 'true', 'yes')
+
+# Limits for POST /api/retrieve/batch
+BATCH_MAX_QUESTIONS = int(os.getenv('MEDBOT_BATCH_MAX_QUESTIONS', '1000'))
+BATCH_MAX_TOP_K = int(os.getenv('MEDBOT_BATCH_MAX_TOP_K', '100'))
+
 # Pydantic models for request/response
 class ChatRequest(BaseModel):
     user_question: str
     chat_history: Optional[List[Dict[str, str]]] = []
+    # Lets follow-up questions reuse the context retrieved for earlier turns
+    conversation_id: Optional[str] = None
+    # Include LLM usage for this request in the response (always on with MEDBOT_DEBUG)
+    debug: bool = False
+
+class BatchRetrieveRequest(BaseModel):
+    questions: List[str]
+    top_k: int = 5
+    include_content: bool = True
 
 class ChatResponse(BaseModel):
     response: str
     sources: Optional[List[Dict[str, Any]]] = []
     status: str = "success"
+    usage: Optional[Dict[str, Any]] = None
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    """LLM capacity is exhausted: ask the client to come back instead of queueing forever."""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": f"MedBot is busy, please retry shortly ({exc})"},
+        headers={"Retry-After": str(max(1, round(exc.retry_after)))}
+    )
+
+def request_user(request: ChatRequest, http_request: Request) -> str:
+    """Key used to share LLM capacity fairly: the conversation if known, else the client address."""
+    if request.conversation_id:
+        return f"conversation:{request.conversation_id}"
+    return f"client:{http_request.client.host if http_request.client else 'unknown'}"
 
 @app.on_event("startup")
 async def startup_event():
@@ -88,20 +127,32 @@ async def startup_event():
     logger.info("🔍 Use the web interface to initialize the knowledge base")
     logger.info("🌐 Open http://localhost:8000 in your browser")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release pooled LLM connections and the retrieval threads, and save the answer cache."""
+    if rag_system.semantic_cache:
+        rag_system.semantic_cache.flush()
+    await rag_system.llm_provider.clients.aclose()
+    rag_system.llm_provider.clients.close()
+    rag_system.retrieval_executor.shutdown(wait=False)
+
 @app.get("/", response_class=HTMLResponse)
 async def root(request: Request):
     """Serve the main chat interface."""
     return templates.TemplateResponse("index.html", {"request": request})
 
 @app.post("/chat", response_model=ChatResponse)
-async def chat_endpoint(request: ChatRequest):
+async def chat_endpoint(request: ChatRequest, http_request: Request):
     """Chat endpoint for processing user questions."""
     try:
-        # Process the user question through the RAG system
-        rag_response = rag_system.generate_azure_enhanced_response(
-            question=request.user_question,
-            chat_history=request.chat_history
-        )
+        # Process the user question through the RAG system (LLM call awaited, retrieval off the event loop)
+        user = request_user(request, http_request)
+        with llm_request_context(user, PRIORITY_INTERACTIVE), track_llm_usage("chat") as usage:
+            rag_response = await rag_system.agenerate_azure_enhanced_response(
+                question=request.user_question,
+                chat_history=request.chat_history,
+                conversation_id=request.conversation_id
+            )
         
         # Check if the response was successful
         if not rag_response.get("success", False):
@@ -117,41 +168,100 @@ async def chat_endpoint(request: ChatRequest):
         response_text = response_text.strip()
         
         # Add a note to encourage table usage when appropriate
-        if "table" not in response_text.lower() and len(response_text) > 500:
-            response_text += "\n\n💡 **Tip:** For complex medical information, consider asking me to present data in tables for better understanding!"
-        
-        # Format sources for the frontend
-        sources = []
-        for chunk in relevant_chunks:
-            source_info = {
-                "source": chunk.get("metadata", {}).get("source", "Unknown Source"),
-                "relevance_score": chunk.get("similarity_score", 0.0),
-                "content": chunk.get("content", "")[:200] + "..." if len(chunk.get("content", "")) > 200 else chunk.get("content", "")
-            }
-            sources.append(source_info)
+        response_text += table_tip(response_text)
         
         # Return the response
         return ChatResponse(
             response=response_text,
-            sources=sources,
-            status="success"
+            sources=format_sources(relevant_chunks),
+            status="success",
+            usage=usage.summary() if request.debug or DEBUG_MODE else None
         )
         
-    except HTTPException:
+    except (HTTPException, AdmissionRejected):
         raise
     except Exception as e:
         logger.error(f"Error in chat endpoint: {e}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+@app.post("/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest, http_request: Request):
+    """
+    Server-Sent Events version of /chat: a "sources" event as soon as
+    retrieval finishes, "token" events while the answer is generated, then
+    "done" (or "error"; with "retry_after" when the server is at LLM capacity).
+    """
+    user = request_user(request, http_request)
+    
+    async def stream():
+        response_text = ""
+        try:
+            # Set inside the generator: the body is streamed after the endpoint has returned
+            with llm_request_context(user, PRIORITY_INTERACTIVE), track_llm_usage("chat_stream") as usage:
+                async for event in rag_system.astream_azure_enhanced_response(
+                    question=request.user_question,
+                    chat_history=request.chat_history,
+                    conversation_id=request.conversation_id
+                ):
+                    if event["event"] == "sources":
+                        yield sse_event("sources", {"sources": format_sources(event["result"].get("relevant_chunks", []))})
+                    elif event["event"] == "token":
+                        response_text += event["text"]
+                        yield sse_event("token", {"text": event["text"]})
+                    elif event["event"] == "done":
+                        tip = table_tip(response_text)
+                        if tip:
+                            yield sse_event("token", {"text": tip})
+                        done = {"status": "success", "cache": event["result"].get("cache")}
+                        if request.debug or DEBUG_MODE:
+                            done["usage"] = usage.summary()
+                        yield sse_event("done", done)
+                    else:
+                        yield sse_event("error", {"detail": event["error"]})
+        except AdmissionRejected as e:
+            yield sse_event("error", {"detail": f"MedBot is busy, please retry shortly ({e})",
+                                      "retry_after": e.retry_after})
+        except Exception as e:
+            logger.error(f"Error in chat stream endpoint: {e}")
+            yield sse_event("error", {"detail": f"Internal server error: {str(e)}"})
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def format_sources(relevant_chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Format retrieved chunks as sources for the frontend."""
+    sources = []
+    for chunk in relevant_chunks:
+        content = chunk.get("content", "")
+        sources.append({
+            "source": chunk.get("metadata", {}).get("source", "Unknown Source"),
+            "relevance_score": chunk.get("similarity_score", 0.0),
+            "content": content[:200] + "..." if len(content) > 200 else content
+        })
+    return sources
+
+def table_tip(response_text: str) -> str:
+    """Note encouraging table usage for long answers without one."""
+    if "table" not in response_text.lower() and len(response_text) > 500:
+        return "\n\n💡 **Tip:** For complex medical information, consider asking me to present data in tables for better understanding!"
+    return ""
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
 @app.get("/test-rag")
 async def test_rag():
     """Test endpoint to verify RAG system is working."""
     try:
-        # Simple test query
-        test_response = rag_system.generate_azure_enhanced_response(
-            question="What is microbiology?",
-            chat_history=[]
-        )
+        # Simple test query (queued behind interactive chat traffic)
+        with llm_request_context("test-rag", PRIORITY_BATCH), track_llm_usage("test_rag"):
+            test_response = await rag_system.agenerate_azure_enhanced_response(
+                question="What is microbiology?",
+                chat_history=[]
+            )
         
         return {
             "status": "success",
@@ -168,6 +278,31 @@ async def test_rag():
             "rag_system_working": False
         }
 
+@app.post("/api/retrieve/batch")
+def retrieve_batch_endpoint(request: BatchRetrieveRequest):
+    """
+    Retrieve top-k chunks for many questions (no LLM call), streamed as
+    JSON lines: one object per question, in input order.
+    """
+    if not rag_system.knowledge_base_initialized:
+        raise HTTPException(status_code=400, detail="Knowledge base not initialized")
+    if not request.questions:
+        raise HTTPException(status_code=400, detail="No questions provided")
+    if len(request.questions) > BATCH_MAX_QUESTIONS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_QUESTIONS} questions per request")
+    if not 1 <= request.top_k <= BATCH_MAX_TOP_K:
+        raise HTTPException(status_code=400, detail=f"top_k must be between 1 and {BATCH_MAX_TOP_K}")
+    
+    def stream():
+        try:
+            for result in rag_system.batch_retrieve(request.questions, request.top_k, request.include_content):
+                yield json.dumps(result) + "\n"
+        except Exception as e:
+            logger.error(f"Error in batch retrieval: {e}")
+            yield json.dumps({"error": str(e)}) + "\n"
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
@@ -177,6 +312,14 @@ async def health_check():
         "knowledge_base_initialized": knowledge_base_initialized
     }
 
+@app.get("/metrics")
+async def get_metrics():
+    """LLM token, latency and cost accounting (per endpoint, model and user) plus pipeline metrics."""
+    return {
+        "llm_usage": usage_tracker.get_summary(),
+        "metrics": metrics.snapshot()
+    }
+
 @app.get("/status")
 async def get_status():
     """Get comprehensive system status."""
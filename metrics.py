@@ -0,0 +1,80 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List
+
+
+class MetricsRegistry:
+    """
+    Process-wide counters and latency summaries for the /status endpoint.
+
+    Every observed series keeps its total count and sum plus a window of the
+    most recent values, from which p50/p95/max are reported. Gauges hold
+    the latest value of a level such as a queue depth. Names are dotted
+    strings such as "chat.ttft_ms".
+    """
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self._counters: Dict[str, int] = {}
+        self._gauges: Dict[str, float] = {}
+        self._series: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def increment(self, name: str, amount: int = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def get(self, name: str) -> int:
+        """Current value of a counter (0 if never incremented)."""
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def set_gauge(self, name: str, value: float):
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, value: float):
+        with self._lock:
+            series = self._series.get(name)
+            if series is None:
+                series = self._series[name] = {"count": 0, "sum": 0.0, "recent": deque(maxlen=self.window)}
+            series["count"] += 1
+            series["sum"] += value
+            series["recent"].append(value)
+
+    @staticmethod
+    def _summary(count: int, total: float, recent: List[float]) -> Dict[str, Any]:
+        ordered = sorted(recent)
+        def pct(p):
+            return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 2) if ordered else None
+        return {
+            "count": count,
+            "mean": round(total / count, 2) if count else None,
+            "p50": pct(0.50),
+            "p95": pct(0.95),
+            "max": round(ordered[-1], 2) if ordered else None,
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            series = {name: (s["count"], s["sum"], list(s["recent"])) for name, s in self._series.items()}
+        return {
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "counters": counters,
+            "gauges": gauges,
+            "latencies": {name: self._summary(*values) for name, values in sorted(series.items())},
+        }
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._series.clear()
+
+
+# Shared registry used by the RAG pipeline and the API server
+metrics = MetricsRegistry()
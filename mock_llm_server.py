@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+MedBot Mock LLM Server
+Local stand-in for Azure OpenAI and OpenAI-compatible chat completion
+endpoints, so the pipeline can be benchmarked and load-tested without
+API keys or network access (CI, air-gapped staging).
+
+Serves /openai/deployments/<deployment>/chat/completions (Azure),
+/v1/chat/completions (OpenAI, local servers) and any other path ending in
+/chat/completions (e.g. Groq's /openai/v1/...), streaming and
+non-streaming. Time to first token, tokens per second, answer length and
+injected errors are configurable; with a fixed seed the same request
+sequence always gets the same errors.
+
+Point MedBot at it with:
+    ENDPOINT_URL=http://127.0.0.1:<port>  AZURE_OPENAI_API_KEY=mock
+    LOCAL_LLM_BASE_URL=http://127.0.0.1:<port>/v1   (hedge / local provider)
+"""
+
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+from token_utils import count_tokens
+
+ANSWER_WORDS = (
+    "Hypertension is a chronic condition in which the blood pressure in the arteries is persistently "
+    "elevated. It usually causes no symptoms but increases the risk of stroke, heart attack, heart "
+    "failure and kidney disease. Management combines lifestyle changes such as reducing salt intake, "
+    "regular exercise and weight loss with medication when needed."
+).split()
+
+
+class MockLLMConfig:
+    """
+    Behaviour of the mock server. A response takes ttft_ms before the
+    first token and then one token every 1 / tokens_per_second seconds
+    (0 = no generation delay). error_rate of the requests fail with
+    error_status, with a Retry-After header if retry_after is set.
+    """
+
+    def __init__(self,
+                 ttft_ms: float = 200.0,
+                 tokens_per_second: float = 50.0,
+                 completion_tokens: int = 120,
+                 error_rate: float = 0.0,
+                 error_status: int = 429,
+                 retry_after: Optional[float] = None,
+                 seed: Optional[int] = 0):
+        if not 0.0 <= error_rate <= 1.0:
+            raise ValueError("error_rate must be between 0 and 1")
+        self.ttft_ms = ttft_ms
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.seed = seed
+
+    def describe(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    """ThreadingHTTPServer with the mock config and request statistics."""
+
+    def __init__(self, address, config: MockLLMConfig):
+        super().__init__(address, _Handler)
+        self.config = config
+        self._random = random.Random(config.seed)
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "streamed": 0, "errors": 0, "in_flight": 0, "peak_in_flight": 0,
+                      "prompt_tokens": 0, "completion_tokens": 0}
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def begin_request(self) -> bool:
+        """Count a request; returns True if it should fail with an injected error."""
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["in_flight"] += 1
+            self.stats["peak_in_flight"] = max(self.stats["peak_in_flight"], self.stats["in_flight"])
+            fail = self.config.error_rate > 0 and self._random.random() < self.config.error_rate
+            if fail:
+                self.stats["errors"] += 1
+            return fail
+
+    def end_request(self, prompt_tokens: int = 0, completion_tokens: int = 0, streamed: bool = False):
+        with self._lock:
+            self.stats["in_flight"] -= 1
+            self.stats["prompt_tokens"] += prompt_tokens
+            self.stats["completion_tokens"] += completion_tokens
+            self.stats["streamed"] += int(streamed)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, "config": self.config.describe()}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep connections open between requests
+    disable_nagle_algorithm = True
+    server: MockLLMServer
+
+    def do_GET(self):
+        if self.path.split("?")[0] in ("/health", "/stats"):
+            self._send_json(200, self.server.get_stats())
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": {"message": "Invalid JSON body"}})
+            return
+        if not self.path.split("?")[0].endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+
+        config = self.server.config
+        if self.server.begin_request():
+            self.server.end_request()
+            headers = {"Retry-After": f"{config.retry_after:g}"} if config.retry_after is not None else {}
+            self._send_json(config.error_status,
+                            {"error": {"code": str(config.error_status), "message": "Injected error from mock server"}},
+                            headers)
+            return
+
+        prompt_tokens = sum(count_tokens(str(m.get("content", ""))) for m in request.get("messages", []))
+        max_tokens = request.get("max_tokens") or config.completion_tokens
+        words = [ANSWER_WORDS[i % len(ANSWER_WORDS)] for i in range(min(config.completion_tokens, max_tokens))]
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(words),
+                 "total_tokens": prompt_tokens + len(words)}
+        model = request.get("model") or "gpt-4o"
+        streamed = bool(request.get("stream"))
+        try:
+            if streamed:
+                include_usage = bool((request.get("stream_options") or {}).get("include_usage"))
+                self._stream(model, words, usage if include_usage else None)
+            else:
+                time.sleep(config.ttft_ms / 1000 + self._generation_seconds(len(words)))
+                self._send_json(200, self._completion(model, " ".join(words), usage))
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client went away (e.g. the losing side of a hedged request)
+        finally:
+            self.server.end_request(prompt_tokens, len(words), streamed)
+
+    def _generation_seconds(self, tokens: int) -> float:
+        rate = self.server.config.tokens_per_second
+        return tokens / rate if rate > 0 else 0.0
+
+    @staticmethod
+    def _completion(model: str, text: str, usage: Dict[str, int]) -> Dict[str, Any]:
+        return {
+            "id": "chatcmpl-mock",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": text}}],
+            "usage": usage,
+        }
+
+    @staticmethod
+    def _chunk(model: str, choices: List[Dict[str, Any]], usage: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+        chunk = {"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": int(time.time()),
+                 "model": model, "choices": choices}
+        if usage is not None:
+            chunk["usage"] = usage
+        return chunk
+
+    def _stream(self, model: str, words: List[str], usage: Optional[Dict[str, int]]):
+        """Server-Sent Events in chunked transfer encoding, one word per token."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        time.sleep(self.server.config.ttft_ms / 1000)
+        delay = self._generation_seconds(1)
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(delay)
+            delta = {"content": word if i == 0 else " " + word}
+            if i == 0:
+                delta["role"] = "assistant"
+            self._write_event(self._chunk(model, [{"index": 0, "delta": delta, "finish_reason": None}]))
+        self._write_event(self._chunk(model, [{"index": 0, "delta": {}, "finish_reason": "stop"}]))
+        if usage is not None:
+            # stream_options={"include_usage": true}: final chunk with usage and no choices
+            self._write_event(self._chunk(model, [], usage))
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+    def _write_event(self, data: Dict[str, Any]):
+        self._write_chunk(f"data: {json.dumps(data)}\n\n".encode("utf-8"))
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_json(self, status: int, data: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_mock_server(config: MockLLMConfig = None, host: str = "127.0.0.1", port: int = 0) -> MockLLMServer:
+    """Start the mock server in a background thread (port 0 picks a free port)."""
+    server = MockLLMServer((host, port), config or MockLLMConfig())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def use_mock_llm(config: MockLLMConfig = None) -> MockLLMServer:
+    """
+    Start the mock server and point LLMProvider at it (Azure and local
+    provider settings in os.environ). Call before creating RAGSystem.
+    """
+    server = start_mock_server(config)
+    os.environ["ENDPOINT_URL"] = server.url
+    os.environ["AZURE_OPENAI_API_KEY"] = "mock"
+    os.environ["LOCAL_LLM_BASE_URL"] = f"{server.url}/v1"
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI/Azure-compatible mock LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--ttft-ms", type=float, default=200.0, help="Delay before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0, help="Generation speed (0 = instant)")
+    parser.add_argument("--completion-tokens", type=int, default=120, help="Answer length in tokens")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=429, help="HTTP status of injected errors")
+    parser.add_argument("--retry-after", type=float, help="Retry-After seconds sent with injected errors")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for error injection")
+    args = parser.parse_args()
+
+    config = MockLLMConfig(
+        ttft_ms=args.ttft_ms,
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        retry_after=args.retry_after,
+        seed=args.seed
+    )
+    server = MockLLMServer((args.host, args.port), config)
+
+    print("MedBot - Mock LLM Server")
+    print("=" * 60)
+    for name, value in config.describe().items():
+        print(f"  {name}: {value}")
+    print("-" * 60)
+    print("Point MedBot at it with:")
+    print(f"  ENDPOINT_URL={server.url}")
+    print("  AZURE_OPENAI_API_KEY=mock")
+    print(f"  LOCAL_LLM_BASE_URL={server.url}/v1")
+    print(f"Request statistics: {server.url}/stats")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Offline Model Bundle
+Builds, verifies and resolves a local directory holding every model MedBot
+loads at startup, so air-gapped nodes can start without any hub lookups.
+
+Usage:
+    python model_bundle.py build            # download default models into the bundle
+    python model_bundle.py build <model>... # download specific models
+    python model_bundle.py verify           # check file integrity of the bundle (full SHA-256)
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, TypeVar
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Models resolved by hub name at startup across the application
+DEFAULT_MODELS = [
+    "sentence-transformers/all-MiniLM-L6-v2",
+    os.getenv("BIOBERT_MODEL", "pritamdeka/BioBERT-mnli-snli-scinli-scitail-mednli-stsb"),
+    os.getenv("MEDBOT_RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2"),
+]
+
+MANIFEST_NAME = "manifest.json"
+
+# Load times (seconds) of every model resolved through this module, by model name
+MODEL_LOAD_TIMES: Dict[str, float] = {}
+
+
+def bundle_dir() -> Path:
+    return Path(os.getenv("MEDBOT_MODEL_BUNDLE_DIR", "./model_bundle"))
+
+
+def offline_mode() -> bool:
+    return os.getenv("MEDBOT_OFFLINE", "").lower() in ("1", "true", "yes")
+
+
+def enable_offline_mode():
+    """Tell the Hugging Face libraries never to touch the network."""
+    os.environ["HF_HUB_OFFLINE"] = "1"
+    os.environ["TRANSFORMERS_OFFLINE"] = "1"
+    os.environ["HF_DATASETS_OFFLINE"] = "1"
+
+
+def apply_offline_mode() -> bool:
+    """
+    Enable offline mode if MEDBOT_OFFLINE is set (in the environment or .env).
+    The Hugging Face libraries read their offline flags once, when first
+    imported, so entry points call this before importing anything that
+    loads models.
+    """
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+    if offline_mode():
+        enable_offline_mode()
+        return True
+    return False
+
+
+def _model_dirname(model_name: str) -> str:
+    return model_name.replace("/", "__")
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_manifest(directory: Optional[Path] = None) -> Dict:
+    manifest_path = (directory or bundle_dir()) / MANIFEST_NAME
+    if not manifest_path.exists():
+        return {"models": {}}
+    return json.loads(manifest_path.read_text(encoding="utf-8"))
+
+
+def build_bundle(model_names: List[str], directory: Optional[Path] = None) -> Dict:
+    """Download models into the bundle directory and record file hashes (needs network)."""
+    from huggingface_hub import snapshot_download
+
+    directory = directory or bundle_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    manifest = load_manifest(directory)
+
+    for model_name in model_names:
+        model_dir = directory / _model_dirname(model_name)
+        logger.info(f"Downloading {model_name} into {model_dir}...")
+        snapshot_download(repo_id=model_name, local_dir=str(model_dir))
+
+        files = {}
+        for path in sorted(model_dir.rglob("*")):
+            if path.is_file() and ".cache" not in path.parts:
+                stat = path.stat()
+                files[str(path.relative_to(model_dir))] = {"sha256": _sha256(path), "size": stat.st_size,
+                                                           "mtime": stat.st_mtime}
+        manifest["models"][model_name] = {"path": model_dir.name, "files": files, "created": time.time()}
+        logger.info(f"Bundled {model_name}: {len(files)} files")
+
+    (directory / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    return manifest
+
+
+def verify_model(model_name: str, directory: Optional[Path] = None, full_hash: Optional[bool] = None) -> bool:
+    """
+    Check that every bundled file of a model exists with the recorded size.
+    By default a file whose mtime also matches the manifest is trusted and
+    only files with a changed mtime (e.g. a bundle copied without preserving
+    times) are hashed, so a cold start does not read every model file.
+    MEDBOT_BUNDLE_VERIFY=sha256 (or full_hash=True) hashes every file.
+    """
+    directory = directory or bundle_dir()
+    entry = load_manifest(directory)["models"].get(model_name)
+    if not entry:
+        return False
+    if full_hash is None:
+        full_hash = os.getenv("MEDBOT_BUNDLE_VERIFY", "stat") == "sha256"
+
+    model_dir = directory / entry["path"]
+    for relative_path, expected in entry["files"].items():
+        path = model_dir / relative_path
+        stat = path.stat() if path.is_file() else None
+        if stat is None or stat.st_size != expected["size"]:
+            logger.error(f"Bundle file missing or truncated: {path}")
+            return False
+        if (full_hash or stat.st_mtime != expected.get("mtime")) and _sha256(path) != expected["sha256"]:
+            logger.error(f"Bundle file checksum mismatch: {path}")
+            return False
+    return True
+
+
+def resolve_model_path(model_name: str) -> str:
+    """
+    Return a local bundle path for a model if it is bundled and intact,
+    otherwise the hub name. In offline mode a missing or corrupt bundle is
+    an error instead of a slow network lookup.
+    """
+    # Too late for libraries already imported; entry points call apply_offline_mode() first
+    if offline_mode():
+        enable_offline_mode()
+
+    directory = bundle_dir()
+    entry = load_manifest(directory)["models"].get(model_name)
+    if entry:
+        start = time.perf_counter()
+        intact = verify_model(model_name, directory)
+        logger.info(f"Verified bundled model {model_name} in {time.perf_counter() - start:.2f}s")
+        if intact:
+            return str(directory / entry["path"])
+        if offline_mode():
+            raise RuntimeError(f"Bundled model {model_name} failed integrity check")
+        logger.warning(f"Bundled model {model_name} failed integrity check, falling back to the hub")
+    elif offline_mode():
+        raise RuntimeError(f"Offline mode: {model_name} is not in the model bundle at {directory}")
+
+    return model_name
+
+
+def timed_load(model_name: str, loader: Callable[[], T]) -> T:
+    """Run a model loader and record how long it took."""
+    start = time.perf_counter()
+    model = loader()
+    MODEL_LOAD_TIMES[model_name] = time.perf_counter() - start
+    logger.info(f"Loaded {model_name} in {MODEL_LOAD_TIMES[model_name]:.2f}s")
+    return model
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else "verify"
+    models = sys.argv[2:] or DEFAULT_MODELS
+
+    print("MedBot - Offline Model Bundle")
+    print("=" * 60)
+    print(f"Bundle directory: {bundle_dir()}")
+
+    if command == "build":
+        build_bundle(models)
+        print(f"Bundled {len(models)} models")
+        print("Start air-gapped nodes with MEDBOT_OFFLINE=1 and MEDBOT_MODEL_BUNDLE_DIR pointing at this directory")
+        return True
+    if command == "verify":
+        bundled = load_manifest()["models"]
+        ok = True
+        for model_name in bundled:
+            start = time.perf_counter()
+            intact = verify_model(model_name, full_hash=True)
+            ok = ok and intact
+            print(f"   {'OK ' if intact else 'BAD'} {model_name} ({time.perf_counter() - start:.2f}s)")
+        if not bundled:
+            print("Bundle is empty; run: python model_bundle.py build")
+        return ok and bool(bundled)
+
+    print(f"Unknown command: {command}")
+    return False
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -7,6 +7,7 @@ from typing import Dict, List, Optional, Tuple
 import random
 import requests
 import os
+import uuid
 from dotenv import load_dotenv
 import markdown  # Add markdown library for proper conversion
 
@@ -730,6 +731,9 @@ class RAGIntegratedMedBotAI:
             
         if 'show_articles' not in st.session_state:
             st.session_state.show_articles = False
+        
+        if 'conversation_id' not in st.session_state:
+            st.session_state.conversation_id = uuid.uuid4().hex
     
     def extract_user_information(self, message: str) -> Optional[str]:
         """Advanced user name extraction with multiple patterns"""
@@ -754,7 +758,11 @@ class RAGIntegratedMedBotAI:
     def query_rag_backend(self, user_question: str) -> Optional[Dict]:
         """Query the RAG backend for medical information"""
         try:
-            payload = {"user_question": user_question, "chat_history": st.session_state.messages}
+            payload = {
+                "user_question": user_question,
+                "chat_history": st.session_state.messages,
+                "conversation_id": st.session_state.conversation_id
+            }
             response = requests.post(f"{self.backend_url}/chat", json=payload, timeout=60)
             if response.status_code == 200:
                 return response.json()
@@ -765,6 +773,49 @@ class RAGIntegratedMedBotAI:
             st.error(f"Connection error: {str(e)}")
             return None
 
+    def stream_rag_backend(self, user_question: str, placeholder) -> Optional[Dict]:
+        """Query /chat/stream and render the answer into placeholder as tokens arrive"""
+        payload = {
+            "user_question": user_question,
+            "chat_history": st.session_state.messages,
+            "conversation_id": st.session_state.conversation_id
+        }
+        start_time = time.time()
+        result = {"response": "", "sources": [], "first_token_time": None}
+        placeholder.markdown("<div class='bot-message'>🔍 Searching the medical knowledge base...</div>", unsafe_allow_html=True)
+        try:
+            # The read timeout applies between events, not to the whole answer
+            with requests.post(f"{self.backend_url}/chat/stream", json=payload, stream=True, timeout=(10, 60)) as response:
+                if response.status_code != 200:
+                    return None
+                event = None
+                for line in response.iter_lines(decode_unicode=True):
+                    if line.startswith("event:"):
+                        event = line[len("event:"):].strip()
+                        continue
+                    if not line.startswith("data:"):
+                        continue
+                    data = json.loads(line[len("data:"):])
+                    if event == "sources":
+                        result["sources"] = data.get("sources", [])
+                        placeholder.markdown(
+                            f"<div class='bot-message'>📚 Found {len(result['sources'])} relevant sources, writing the answer...</div>",
+                            unsafe_allow_html=True
+                        )
+                    elif event == "token":
+                        if result["first_token_time"] is None:
+                            result["first_token_time"] = time.time() - start_time
+                        result["response"] += data.get("text", "")
+                        html_content = markdown.markdown(self.clean_response(result["response"]) + " ▌")
+                        placeholder.markdown(f"<div class='bot-message'>{html_content}</div>", unsafe_allow_html=True)
+                    elif event == "error":
+                        st.error(f"Backend error: {data.get('detail', 'Unknown error')}")
+                        return None
+            return result if result["response"] else None
+        except (requests.exceptions.RequestException, ValueError):
+            # Older backends without /chat/stream, or a dropped connection
+            return None
+
     def clean_response(self, response: str) -> str:
         """Clean response by removing unwanted HTML tags and fixing markdown pitfalls"""
         # Remove HTML tags
@@ -928,7 +979,7 @@ class RAGIntegratedMedBotAI:
 
 
     # -------------------- PIPELINE -------------------- #
-    def process_user_input(self, user_input: str) -> str:
+    def process_user_input(self, user_input: str, placeholder=None) -> str:
         start_time = time.time()
         
         # Extract user name if provided
@@ -939,7 +990,11 @@ class RAGIntegratedMedBotAI:
         st.session_state.user_profile['interaction_count'] += 1
         st.session_state.messages.append({"role": "user", "content": user_input})
         
-        rag_response = self.query_rag_backend(user_input)
+        rag_response = self.stream_rag_backend(user_input, placeholder) if placeholder is not None else None
+        if rag_response and rag_response.get('first_token_time') is not None:
+            st.session_state.response_metrics.setdefault('first_token_times', []).append(rag_response['first_token_time'])
+        if rag_response is None:
+            rag_response = self.query_rag_backend(user_input)
         if rag_response and 'response' in rag_response:
             response = rag_response['response']
             response = self.clean_response(response)
@@ -1043,9 +1098,10 @@ def render_chat_interface(ai_system):
          
          # Process the form submission
          if submitted and user_input.strip():
-             with st.spinner("🤔 Analyzing your medical question with the RAG system..."):
-                 ai_system.process_user_input(user_input.strip())
-                 st.rerun()
+             st.markdown(f"<div class='user-message'>{user_input.strip()}</div>", unsafe_allow_html=True)
+             # The answer is rendered here token by token while it streams in
+             ai_system.process_user_input(user_input.strip(), placeholder=st.empty())
+             st.rerun()
          
          # Process the Articles button click
          if articles_clicked:
@@ -1,9 +1,11 @@
 import PyPDF2
 import re
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Union
 from pathlib import Path
 import logging
 
+from chunk_records import ChunkStore, as_chunk_store
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -62,12 +64,12 @@ class PDFProcessor:
         
         return text.strip()
     
-    def create_intelligent_chunks(self, text: str, pdf_name: str) -> List[Dict[str, str]]:
+    def create_intelligent_chunks(self, text: str, pdf_name: str) -> ChunkStore:
         """
         Create intelligent chunks using advanced text splitting techniques.
         This implements the "Chunking Process" from the RAG workflow.
         """
-        chunks = []
+        chunks = ChunkStore()
         
         # Split by sentences first (better for medical content)
         sentences = self._split_by_sentences(text)
@@ -80,12 +82,7 @@ class PDFProcessor:
             if len(current_chunk) + len(sentence) > self.chunk_size:
                 if current_chunk.strip():
                     # Save current chunk
-                    chunks.append({
-                        'id': f"{pdf_name}_chunk_{chunk_id}",
-                        'content': current_chunk.strip(),
-                        'source': pdf_name,
-                        'chunk_size': len(current_chunk.strip())
-                    })
+                    chunks.add(pdf_name, current_chunk.strip(), chunk_id)
                     chunk_id += 1
                     
                     # Start new chunk with overlap
@@ -98,12 +95,7 @@ class PDFProcessor:
         
         # Add the last chunk
         if current_chunk.strip():
-            chunks.append({
-                'id': f"{pdf_name}_chunk_{chunk_id}",
-                'content': current_chunk.strip(),
-                'source': pdf_name,
-                'chunk_size': len(current_chunk.strip())
-            })
+            chunks.add(pdf_name, current_chunk.strip(), chunk_id)
         
         logger.info(f"Created {len(chunks)} chunks from {pdf_name}")
         return chunks
@@ -143,12 +135,12 @@ class PDFProcessor:
         overlap_words = words[-(self.chunk_overlap // 10):]
         return " ".join(overlap_words)
     
-    def process_pdf_directory(self, directory_path: str) -> List[Dict[str, str]]:
+    def process_pdf_directory(self, directory_path: str) -> ChunkStore:
         """
         Process all PDFs in a directory and return all chunks.
         """
         pdf_dir = Path(directory_path)
-        all_chunks = []
+        all_chunks = ChunkStore()
         
         if not pdf_dir.exists():
             logger.error(f"Directory {directory_path} does not exist")
@@ -176,15 +168,16 @@ class PDFProcessor:
         logger.info(f"Total chunks created: {len(all_chunks)}")
         return all_chunks
     
-    def get_chunk_statistics(self, chunks: List[Dict[str, str]]) -> Dict[str, any]:
+    def get_chunk_statistics(self, chunks: Union[ChunkStore, List[Dict[str, str]]]) -> Dict[str, any]:
         """
         Get statistics about the created chunks.
         """
         if not chunks:
             return {}
         
-        chunk_sizes = [chunk['chunk_size'] for chunk in chunks]
-        sources = list(set(chunk['source'] for chunk in chunks))
+        chunks = as_chunk_store(chunks)
+        chunk_sizes = chunks.chunk_sizes
+        sources = [chunks.sources[source_id] for source_id in sorted(set(chunks.source_ids))]
         
         return {
             'total_chunks': len(chunks),
@@ -72,9 +72,9 @@ class EuropePMCClient:
             from urllib.parse import quote
             url = f"{EUROPE_PMC_BASE}/search?query={quote(query)}&format=json&pageSize={retmax}"
             r = requests.get(url, headers=HEADERS, timeout=30)
-        r.raise_for_status()
-        _sleep()
-        return r.json()
+            r.raise_for_status()
+            _sleep()
+            return r.json()
         except requests.exceptions.RequestException as e:
             print(f"Error in Europe PMC search: {e}")
             return {"resultList": {"result": []}}
@@ -84,9 +84,9 @@ class EuropePMCClient:
         try:
             url = f"{EUROPE_PMC_BASE}/search?query=EXT_ID:{pmid}&format=json"
             r = requests.get(url, headers=HEADERS, timeout=30)
-        r.raise_for_status()
-        _sleep()
-            
+            r.raise_for_status()
+            _sleep()
+
             data = r.json()
             if data.get("resultList", {}).get("result"):
                 return data["resultList"]["result"][0]
@@ -142,7 +142,7 @@ def parse_pubmed_article(article_data: Dict) -> Dict:
         # Extract year
         out["year"] = article_data.get("pubYear")
         
-    return out
+        return out
         
     except Exception as e:
         print(f"Error parsing article: {e}")
@@ -195,8 +195,12 @@ def _get_chroma_collection():
         return _chroma_collection
     import chromadb
     from chromadb.utils import embedding_functions
+    from model_bundle import resolve_model_path, timed_load
     _chroma_client = chromadb.Client()
-    emb = embedding_functions.SentenceTransformerEmbeddingFunction(model_name=BIOBERT_MODEL)
+    # Load BioBERT from the local model bundle when available (no hub lookup offline)
+    emb = timed_load(BIOBERT_MODEL, lambda: embedding_functions.SentenceTransformerEmbeddingFunction(
+        model_name=resolve_model_path(BIOBERT_MODEL)
+    ))
     _chroma_collection = _chroma_client.get_or_create_collection(
         name=CHROMA_COLLECTION,
         embedding_function=emb,
@@ -433,33 +437,33 @@ def build_markdown_report(
     try:
         client = EuropePMCClient()
 
-    # 1) Dynamic MeSH fetch + Chroma cache
+        # 1) Dynamic MeSH fetch + Chroma cache
         try:
-    mesh_uids = mesh_search_descriptors(client, query or "")
-    mesh_records = mesh_fetch_descriptors(client, mesh_uids)
-    cache_mesh_records_in_chroma(mesh_records)
+            mesh_uids = mesh_search_descriptors(client, query or "")
+            mesh_records = mesh_fetch_descriptors(client, mesh_uids)
+            cache_mesh_records_in_chroma(mesh_records)
         except Exception as e:
             print(f"Warning: MeSH processing failed: {e}")
             mesh_records = []
 
-    # 2) LLM/context expansions + semantic MeSH lookup
+        # 2) LLM/context expansions + semantic MeSH lookup
         try:
-    llm_terms = llm_expand_query(query or "", context_hint="biomedical literature search; PubMed/MeSH")
+            llm_terms = llm_expand_query(query or "", context_hint="biomedical literature search; PubMed/MeSH")
             print(f"🧠 LLM Enhanced Terms: {llm_terms}")
-    mesh_hits = chroma_semantic_mesh_lookup(query or "", k=min(8, max(3, len(mesh_records) or 5)))
+            mesh_hits = chroma_semantic_mesh_lookup(query or "", k=min(8, max(3, len(mesh_records) or 5)))
         except Exception as e:
             print(f"Warning: LLM expansion failed: {e}")
             llm_terms = []
             mesh_hits = []
 
-    # 3) Build enhanced PubMed query
-    enhanced_query = build_pubmed_boolean_query(
-        user_query=query or "", mesh_hits=mesh_hits, llm_terms=llm_terms
-    )
+        # 3) Build enhanced PubMed query
+        enhanced_query = build_pubmed_boolean_query(
+            user_query=query or "", mesh_hits=mesh_hits, llm_terms=llm_terms
+        )
 
-    # 4) PubMed search with enhanced query
-    pmids = seed_pmids or []
-    if enhanced_query:
+        # 4) PubMed search with enhanced query
+        pmids = seed_pmids or []
+        if enhanced_query:
             try:
                 # Use Europe PMC search with proper query syntax
                 # For Europe PMC, we need to use different query format than NCBI
@@ -498,7 +502,7 @@ def build_markdown_report(
                 print(f"Warning: PubMed search failed: {e}")
                 pmids = []
         
-    if not pmids:
+        if not pmids:
             print(f"⚠️  No PMIDs found for any search query. Using fallback approach.")
             # Try a simple search as last resort
             try:
@@ -529,7 +533,7 @@ def build_markdown_report(
                 "total_count": 0
             }
 
-    # 5) Fetch seed articles
+        # 5) Fetch seed articles
         try:
             
             pubmed_xml = client.fetch_articles_by_pmids(pmids)
@@ -538,9 +542,9 @@ def build_markdown_report(
             print(f"Warning: Failed to fetch articles: {e}")
             seed_articles = []
 
-    # 6) Relateds
-    related_articles = []
-    if include_related and pmids:
+        # 6) Relateds
+        related_articles = []
+        if include_related and pmids:
             try:
                 
                 related_xml = client.fetch_articles_by_pmids(pmids)
@@ -548,54 +552,54 @@ def build_markdown_report(
             except Exception as e:
                 print(f"Warning: Failed to fetch related articles: {e}")
 
-    # 7) Map to PMC
+        # 7) Map to PMC
         try:
-    pmcid_map = pmids_to_pmcids(client, pmids)
+            pmcid_map = pmids_to_pmcids(client, pmids)
         except Exception as e:
             print(f"Warning: PMC mapping failed: {e}")
             pmcid_map = {}
 
-    # 8) Summary
-    corpus_texts = [a["title"] + "\n" + (a["abstract"] or "") for a in seed_articles + related_articles if a.get("title")]
-    summary = simple_corpus_summary("\n".join(corpus_texts), max_sentences=7) if corpus_texts else "No summary available."
+        # 8) Summary
+        corpus_texts = [a["title"] + "\n" + (a["abstract"] or "") for a in seed_articles + related_articles if a.get("title")]
+        summary = simple_corpus_summary("\n".join(corpus_texts), max_sentences=7) if corpus_texts else "No summary available."
 
-    # 9) Markdown
-    md = [
-        "# 🧠 PubMed/PMC Research Report",
-        f"- **Original query:** `{query}`",
-        f"- **Enhanced PubMed query:** `{enhanced_query}`",
-        f"- **Seed articles:** {len(seed_articles)} | **Related articles:** {len(related_articles)}",
-        "",
-        "## 📌 Executive Summary",
-        summary,
-        "",
-        "## 🔎 Query Expansion Details",
-        f"- **LLM terms:** {', '.join(llm_terms) if llm_terms else '—'}",
-        f"- **Top MeSH hits:** {', '.join(_dedup_preserve([m.get('descriptor_name') for m in mesh_hits if m.get('descriptor_name')])) or '—'}",
-        "",
-        "## 📄 Articles"
-    ]
-        
-    for idx, a in enumerate(seed_articles + related_articles, 1):
-        authors = ", ".join(a["authors"]) if a["authors"] else "Unknown"
-        md.append(
-            f"### {idx}. {a['title']}\n"
-            f"**Authors:** {authors}\n\n"
-            f"**Abstract:** {a['abstract'] or 'No abstract available.'}\n\n"
-            f"*Citation:* {a['title']} ({a['journal']}, {a['year']}). PMID: {a['pmid']}"
-        )
-        if a["pmid"] in pmcid_map:
-            md.append(f"✅ **Full Text Available:** [PMC Link](https://www.ncbi.nlm.nih.gov/pmc/articles/{pmcid_map[a['pmid']]}/)")
-        md.append("\n---")
-
-    if len(related_articles) == 0:
-        md += [
-            "\n## ❗ No related articles found.\n",
-            "### 🔍 Suggested Queries:",
-            "- `coronary artery bypass grafting outcomes randomized`",
-            "- `CABG vs PCI long-term survival`",
-            "- `off-pump CABG complications`",
+        # 9) Markdown
+        md = [
+            "# 🧠 PubMed/PMC Research Report",
+            f"- **Original query:** `{query}`",
+            f"- **Enhanced PubMed query:** `{enhanced_query}`",
+            f"- **Seed articles:** {len(seed_articles)} | **Related articles:** {len(related_articles)}",
+            "",
+            "## 📌 Executive Summary",
+            summary,
+            "",
+            "## 🔎 Query Expansion Details",
+            f"- **LLM terms:** {', '.join(llm_terms) if llm_terms else '—'}",
+            f"- **Top MeSH hits:** {', '.join(_dedup_preserve([m.get('descriptor_name') for m in mesh_hits if m.get('descriptor_name')])) or '—'}",
+            "",
+            "## 📄 Articles"
         ]
+        
+        for idx, a in enumerate(seed_articles + related_articles, 1):
+            authors = ", ".join(a["authors"]) if a["authors"] else "Unknown"
+            md.append(
+                f"### {idx}. {a['title']}\n"
+                f"**Authors:** {authors}\n\n"
+                f"**Abstract:** {a['abstract'] or 'No abstract available.'}\n\n"
+                f"*Citation:* {a['title']} ({a['journal']}, {a['year']}). PMID: {a['pmid']}"
+            )
+            if a["pmid"] in pmcid_map:
+                md.append(f"✅ **Full Text Available:** [PMC Link](https://www.ncbi.nlm.nih.gov/pmc/articles/{pmcid_map[a['pmid']]}/)")
+            md.append("\n---")
+
+        if len(related_articles) == 0:
+            md += [
+                "\n## ❗ No related articles found.\n",
+                "### 🔍 Suggested Queries:",
+                "- `coronary artery bypass grafting outcomes randomized`",
+                "- `CABG vs PCI long-term survival`",
+                "- `off-pump CABG complications`",
+            ]
 
         markdown_content = "\n".join(md)
         
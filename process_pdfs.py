@@ -21,6 +21,10 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# The RAG modules imported in main() load Hugging Face models; go offline first if configured
+from model_bundle import apply_offline_mode
+apply_offline_mode()
+
 def main():
     """Main function to process PDFs and create embeddings."""
     print("MedBot - PDF Processing and Embedding Creation")
@@ -0,0 +1,146 @@
+import re
+from typing import Dict, List, Optional
+
+# Common clinical abbreviations and the terms they stand for
+ABBREVIATIONS: Dict[str, str] = {
+    "htn": "hypertension",
+    "bp": "blood pressure",
+    "dm": "diabetes mellitus",
+    "t1dm": "type 1 diabetes mellitus",
+    "t2dm": "type 2 diabetes mellitus",
+    "mi": "myocardial infarction",
+    "cad": "coronary artery disease",
+    "chf": "congestive heart failure",
+    "hf": "heart failure",
+    "afib": "atrial fibrillation",
+    "af": "atrial fibrillation",
+    "copd": "chronic obstructive pulmonary disease",
+    "ckd": "chronic kidney disease",
+    "aki": "acute kidney injury",
+    "uti": "urinary tract infection",
+    "tb": "tuberculosis",
+    "hiv": "human immunodeficiency virus",
+    "aids": "acquired immunodeficiency syndrome",
+    "gerd": "gastroesophageal reflux disease",
+    "ibd": "inflammatory bowel disease",
+    "ibs": "irritable bowel syndrome",
+    "dvt": "deep vein thrombosis",
+    "pe": "pulmonary embolism",
+    "ra": "rheumatoid arthritis",
+    "ms": "multiple sclerosis",
+    "adhd": "attention deficit hyperactivity disorder",
+    "ptsd": "post-traumatic stress disorder",
+    "ocd": "obsessive compulsive disorder",
+    "cpr": "cardiopulmonary resuscitation",
+    "ecg": "electrocardiogram",
+    "ekg": "electrocardiogram",
+    "mri": "magnetic resonance imaging",
+    "ct": "computed tomography",
+    "nsaid": "non-steroidal anti-inflammatory drug",
+    "nsaids": "non-steroidal anti-inflammatory drugs",
+    "ssri": "selective serotonin reuptake inhibitor",
+    "ssris": "selective serotonin reuptake inhibitors",
+    "ace": "angiotensin converting enzyme",
+    "std": "sexually transmitted disease",
+    "sti": "sexually transmitted infection",
+    "bmi": "body mass index",
+    "ards": "acute respiratory distress syndrome",
+    "ami": "acute myocardial infarction",
+    "cva": "cerebrovascular accident",
+    "tia": "transient ischemic attack",
+}
+
+# Lay terms and their clinical equivalents (substituted in both directions)
+SYNONYMS: Dict[str, str] = {
+    "heart attack": "myocardial infarction",
+    "high blood pressure": "hypertension",
+    "low blood pressure": "hypotension",
+    "high blood sugar": "hyperglycemia",
+    "low blood sugar": "hypoglycemia",
+    "sugar disease": "diabetes mellitus",
+    "stroke": "cerebrovascular accident",
+    "kidney": "renal",
+    "liver": "hepatic",
+    "lung": "pulmonary",
+    "heart": "cardiac",
+    "skin rash": "dermatitis",
+    "belly pain": "abdominal pain",
+    "stomach ache": "abdominal pain",
+    "heartburn": "gastroesophageal reflux",
+    "shortness of breath": "dyspnea",
+    "short of breath": "dyspnea",
+    "chest pain": "angina",
+    "fainting": "syncope",
+    "nosebleed": "epistaxis",
+    "blood clot": "thrombosis",
+    "cancer": "malignancy",
+    "tumour": "neoplasm",
+    "tumor": "neoplasm",
+    "painkiller": "analgesic",
+    "painkillers": "analgesics",
+    "fever": "pyrexia",
+    "itching": "pruritus",
+    "hair loss": "alopecia",
+    "bedwetting": "enuresis",
+    "pink eye": "conjunctivitis",
+    "flu": "influenza",
+    "water pills": "diuretics",
+    "blood thinner": "anticoagulant",
+    "blood thinners": "anticoagulants",
+}
+
+_WORD = re.compile(r"[A-Za-z0-9]+")
+
+
+def _expand_abbreviations(question: str) -> Optional[str]:
+    expanded, changed = [], False
+    for token in re.split(r"(\W+)", question):
+        full = ABBREVIATIONS.get(token.lower())
+        if full and _WORD.fullmatch(token):
+            expanded.append(full)
+            changed = True
+        else:
+            expanded.append(token)
+    return "".join(expanded) if changed else None
+
+
+# Both directions of the lexicon, matched in one pass (longest phrase first)
+_SYNONYM_MAP: Dict[str, str] = {}
+for _lay, _clinical in SYNONYMS.items():
+    _SYNONYM_MAP.setdefault(_lay, _clinical)
+    _SYNONYM_MAP.setdefault(_clinical, _lay)
+_SYNONYM_PATTERN = re.compile(
+    r"\b(" + "|".join(re.escape(term) for term in sorted(_SYNONYM_MAP, key=len, reverse=True)) + r")\b"
+)
+
+
+def _substitute_synonyms(question: str) -> Optional[str]:
+    text = question.lower()
+    substituted = _SYNONYM_PATTERN.sub(lambda match: _SYNONYM_MAP[match.group(1)], text)
+    return substituted if substituted != text else None
+
+
+def generate_query_variants(question: str, previous_topic: Optional[str] = None, max_variants: int = 4) -> List[str]:
+    """
+    Rewrite a question into a few retrieval variants without an LLM:
+    the original, abbreviations expanded, lay/clinical synonyms swapped and,
+    for short questions, the question anchored to the previous turn's topic.
+    The original question is always first; duplicates are dropped.
+    """
+    variants = [question]
+    for variant in (_expand_abbreviations(question), _substitute_synonyms(question)):
+        if variant:
+            variants.append(variant)
+
+    # Clients may send the current question as the last history message
+    if (previous_topic and len(_WORD.findall(question)) <= 8
+            and previous_topic.strip().lower() not in question.lower()):
+        variants.append(f"{previous_topic.strip()} {question}")
+
+    unique, seen = [], set()
+    for variant in variants:
+        key = " ".join(variant.lower().split())
+        if key and key not in seen:
+            seen.add(key)
+            unique.append(variant)
+    return unique[:max_variants]
@@ -1,13 +1,31 @@
 import os
+import asyncio
+import hashlib
 import logging
-from typing import List, Dict, Optional, Any
+import time
+from contextlib import AsyncExitStack
+from typing import List, Dict, Optional, Any, Tuple, Iterator, AsyncIterator
 from pathlib import Path
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
 from pdf_processor import PDFProcessor
 from embedding_system import EmbeddingSystem
+from llm_clients import LLMClientPool, HUGGINGFACE_MODEL_URL
+from reranker import CrossEncoderReranker
+from diversity import mmr_select, redundant_tokens
+from context_packer import pack_context
+from semantic_cache import SemanticAnswerCache
+from exact_cache import ExactResponseCache, normalize_question
+from conversation_context import ConversationContextStore
+from metrics import metrics
+from token_utils import count_tokens
+from prompt_templates import SYSTEM_PROMPT, get_prompt_template
+from resilience import CircuitBreaker, ProviderHTTPError, RetryPolicy, acall_with_retry, call_with_retry
+from admission import AdmissionController, AdmissionRejected
+from llm_usage import track_llm_usage, usage_tracker
 
 # Load environment variables
 load_dotenv()
@@ -17,7 +35,14 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class LLMProvider:
-    """Handles different LLM providers (Groq, Gemini, HuggingFace, Azure OpenAI)."""
+    """Handles different LLM providers (Groq, Gemini, HuggingFace, Azure OpenAI, local OpenAI-compatible)."""
+    
+    PROVIDERS = ('azure', 'groq', 'gemini', 'huggingface', 'local')
+    # Providers that can back up a slow primary in a hedged request
+    HEDGE_PROVIDERS = ('groq', 'gemini', 'local')
+    # Providers asked to report token usage at the end of a stream (stream_options);
+    # the Azure API version in use predates it, so streamed Azure usage is estimated
+    STREAM_USAGE_PROVIDERS = ('local',)
     
     def __init__(self):
         self.groq_api_key = os.getenv('GROQ_API_KEY')
@@ -25,6 +50,35 @@ class LLMProvider:
         self.azure_openai_key = os.getenv('AZURE_OPENAI_API_KEY')
         self.hf_token = os.getenv('HF_TOKEN')
         self.endpoint_url = os.getenv('ENDPOINT_URL')
+        self.local_base_url = os.getenv('LOCAL_LLM_BASE_URL')
+        self.local_model = os.getenv('LOCAL_LLM_MODEL', 'llama3.1')
+        # Long-lived keep-alive clients, created on first use and shared across threads
+        self.clients = LLMClientPool()
+        
+        # Per-provider retry policy and circuit breaker (the SDKs' own retries are disabled in LLMClientPool)
+        self.retry_policies = {name: RetryPolicy.from_env(name) for name in self.PROVIDERS}
+        self.breakers = {
+            name: CircuitBreaker(
+                name,
+                failure_threshold=int(os.getenv('MEDBOT_BREAKER_FAILURES', '5')),
+                reset_seconds=float(os.getenv('MEDBOT_BREAKER_RESET_SECONDS', '30'))
+            )
+            for name in self.PROVIDERS
+        }
+        
+        # Process-wide concurrency cap and token budget for LLM calls; each call is
+        # admitted with its prompt tokens plus the completion tokens it is expected to use
+        self.admission = AdmissionController()
+        self.expected_completion_tokens = int(os.getenv('MEDBOT_LLM_EXPECTED_COMPLETION_TOKENS', '1000'))
+        self.system_prompt_tokens = count_tokens(self._get_system_prompt())
+        
+        # Hedging: if the primary has produced no first token after hedge_after_ms
+        # (set it near the primary's p95 TTFT), race the secondary provider against it
+        self.hedge_provider = os.getenv('MEDBOT_HEDGE_PROVIDER') or None
+        self.hedge_after_ms = float(os.getenv('MEDBOT_HEDGE_AFTER_MS', '4000'))
+        if self.hedge_provider and self.hedge_provider not in self.HEDGE_PROVIDERS:
+            raise ValueError(f"Unknown hedge provider '{self.hedge_provider}'. "
+                             f"Use one of: {', '.join(self.HEDGE_PROVIDERS)}")
         
         # Debug: Print available API keys
         logger.info(f"Available API keys:")
@@ -33,6 +87,7 @@ class LLMProvider:
         logger.info(f"  Azure OpenAI: {'✅' if self.azure_openai_key else '❌'}")
         logger.info(f"  HuggingFace: {'✅' if self.hf_token else '❌'}")
         logger.info(f"  Azure Endpoint: {'✅' if self.endpoint_url else '❌'}")
+        logger.info(f"  Local LLM: {'✅' if self.local_base_url else '❌'}")
         
         # Default to Azure OpenAI if available, then Groq, then Gemini, then HuggingFace
         if self.azure_openai_key and self.endpoint_url:
@@ -49,6 +104,8 @@ class LLMProvider:
             logger.info("Using Azure OpenAI with GPT-4o model")
         elif self.default_provider == 'groq':
             logger.info("Using Groq with GPT OSS model")
+        if self.hedge_provider:
+            logger.info(f"Hedging slow first tokens with {self.hedge_provider} after {self.hedge_after_ms:.0f} ms")
     
     def generate_response(self, prompt: str, provider: str = None) -> str:
         """Generate response using the specified LLM provider."""
@@ -64,109 +121,588 @@ class LLMProvider:
                 return self._call_azure_openai(prompt)
             elif provider == 'huggingface' and self.hf_token:
                 return self._call_huggingface(prompt)
+            elif provider == 'local' and self.local_base_url:
+                return self._call_local(prompt)
             else:
                 logger.warning(f"Provider {provider} not available, using fallback response")
-                return self._fallback_response(prompt)
+                return self._fallback_response()
                 
+        except AdmissionRejected:
+            raise
         except Exception as e:
             logger.error(f"Error calling {provider}: {e}")
-            return self._fallback_response(prompt)
+            return self._fallback_response()
     
     def _call_groq(self, prompt: str) -> str:
         """Call Groq API with openai/gpt-oss-20b model."""
         try:
-            import groq
+            client = self.clients.groq()
             
-            # Use the correct environment variable name
-            api_key = os.getenv('GROQ_API_KEY')
-            if not api_key:
-                raise ValueError("GROQ_API_KEY not found in environment variables")
-            
-            client = groq.Groq(api_key=api_key)
-            
-            response = client.chat.completions.create(
-                messages=[
-                    {"role": "system", "content": self._get_system_prompt()},
-                    {"role": "user", "content": prompt}
-                ],
-                model="openai/gpt-oss-20b",
-                temperature=0,
-                max_tokens=4000
-            )
+            response = self._call('groq', prompt, lambda: client.chat.completions.create(**self._groq_request(prompt)))
             
             return response.choices[0].message.content
             
         except ImportError:
             logger.error("Groq package not installed. Install with: uv add groq")
-            return self._fallback_response(prompt)
+            return self._fallback_response()
+        except AdmissionRejected:
+            raise
         except Exception as e:
             logger.error(f"Groq API error: {e}")
-            return self._fallback_response(prompt)
+            return self._fallback_response()
     
     def _call_gemini(self, prompt: str) -> str:
         """Call Google Gemini API."""
         try:
-            import google.generativeai as genai
-            genai.configure(api_key=self.gemini_api_key)
-            model = genai.GenerativeModel('gemini-pro')
+            model = self.clients.gemini(self.gemini_api_key)
             
-            response = model.generate_content(
+            response = self._call('gemini', prompt, lambda: model.generate_content(
                 f"{self._get_system_prompt()}\n\n{prompt}"
-            )
+            ))
             
             return response.text
             
         except ImportError:
             logger.error("Google Generative AI package not installed. Install with: uv add google-generativeai")
-            return self._fallback_response(prompt)
+            return self._fallback_response()
     
     def _call_azure_openai(self, prompt: str) -> str:
         """Call Azure OpenAI API with GPT-4o model."""
         try:
-            from openai import AzureOpenAI
-            
-            api_key = os.getenv('AZURE_OPENAI_API_KEY')
-            endpoint = os.getenv('ENDPOINT_URL')
+            # Shared Azure OpenAI client (keep-alive connection pool)
+            client = self.clients.azure()
             
-            if not api_key:
-                raise ValueError("AZURE_OPENAI_API_KEY not found in environment variables")
-            if not endpoint:
-                raise ValueError("ENDPOINT_URL not found in environment variables")
-            
-            # Use Azure OpenAI client
-            client = AzureOpenAI(
-                api_key=api_key,
-                azure_endpoint=endpoint,
-                api_version="2024-02-15-preview"  # Latest version for GPT-4o
-            )
-            
-            # Use GPT-4o model as requested
-            response = client.chat.completions.create(
-                model="gpt-4o",  # GPT-4o model
-                messages=[
-                    {"role": "system", "content": self._get_system_prompt()},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0,  
-                max_tokens=6000
-            )
+            response = self._call('azure', prompt, lambda: client.chat.completions.create(**self._azure_request(prompt)))
             
             return response.choices[0].message.content
             
         except ImportError:
             logger.error("OpenAI package not installed. Install with: uv add openai")
-            return self._fallback_response(prompt)
+            return self._fallback_response()
+        except AdmissionRejected:
+            raise
         except Exception as e:
             logger.error(f"Azure OpenAI API error: {e}")
-            return self._fallback_response(prompt)
+            return self._fallback_response()
     
     def _call_huggingface(self, prompt: str) -> str:
         """Call HuggingFace Inference API."""
         try:
-            import requests
+            session = self.clients.huggingface()
+            
+            def post():
+                response = session.post(
+                    HUGGINGFACE_MODEL_URL,
+                    **self._huggingface_request(prompt),
+                    timeout=self.clients.timeout_seconds
+                )
+                if response.status_code != 200:
+                    raise ProviderHTTPError('huggingface', response.status_code, response.headers)
+                return response
+            
+            return self._call('huggingface', prompt, post).json()[0]["generated_text"]
+                
+        except ImportError:
+            logger.error("Requests package not installed. Install with: uv add requests")
+            return self._fallback_response()
+        except AdmissionRejected:
+            raise
+        except Exception as e:
+            logger.error(f"HuggingFace API error: {e}")
+            return self._fallback_response()
+    
+    def _call_local(self, prompt: str) -> str:
+        """Call a local OpenAI-compatible server (llama.cpp, vLLM, Ollama)."""
+        try:
+            client = self.clients.local()
             
-            headers = {"Authorization": f"Bearer {self.hf_token}"}
-            payload = {
+            response = self._call('local', prompt, lambda: client.chat.completions.create(**self._local_request(prompt)))
+            
+            return response.choices[0].message.content
+            
+        except ImportError:
+            logger.error("OpenAI package not installed. Install with: uv add openai")
+            return self._fallback_response()
+        except AdmissionRejected:
+            raise
+        except Exception as e:
+            logger.error(f"Local LLM error: {e}")
+            return self._fallback_response()
+    
+    async def agenerate_response(self, prompt: str, provider: str = None) -> str:
+        """Async version of generate_response; the event loop is free while the LLM works."""
+        if not provider:
+            provider = self.default_provider
+            
+        try:
+            if provider in ('groq', 'azure') and self.azure_openai_key and self._hedge_for('azure'):
+                # Hedging needs the first token, so the answer is streamed and joined
+                return "".join([text async for text in self.astream_response(prompt, provider)])
+            elif provider in ('groq', 'azure') and self.azure_openai_key:
+                return await self._acall_azure_openai(prompt)
+            elif provider == 'gemini' and self.gemini_api_key:
+                return await self._acall_gemini(prompt)
+            elif provider == 'huggingface' and self.hf_token:
+                return await self._acall_huggingface(prompt)
+            elif provider == 'local' and self.local_base_url:
+                return await self._acall_local(prompt)
+            else:
+                logger.warning(f"Provider {provider} not available, using fallback response")
+                return self._fallback_response()
+                
+        except AdmissionRejected:
+            raise
+        except Exception as e:
+            logger.error(f"Error calling {provider}: {e}")
+            return self._fallback_response()
+    
+    async def _acall_groq(self, prompt: str) -> str:
+        """Async Groq call."""
+        try:
+            client = self.clients.async_groq()
+            response = await self._acall('groq', prompt, lambda: client.chat.completions.create(**self._groq_request(prompt)))
+            return response.choices[0].message.content
+        except ImportError:
+            logger.error("Groq package not installed. Install with: uv add groq")
+            return self._fallback_response()
+        except AdmissionRejected:
+            raise
+        except Exception as e:
+            logger.error(f"Groq API error: {e}")
+            return self._fallback_response()
+    
+    async def _acall_gemini(self, prompt: str) -> str:
+        """Async Gemini call."""
+        try:
+            model = self.clients.gemini(self.gemini_api_key)
+            response = await self._acall('gemini', prompt, lambda: model.generate_content_async(f"{self._get_system_prompt()}\n\n{prompt}"))
+            return response.text
+        except ImportError:
+            logger.error("Google Generative AI package not installed. Install with: uv add google-generativeai")
+            return self._fallback_response()
+    
+    async def _acall_azure_openai(self, prompt: str) -> str:
+        """Async Azure OpenAI call (GPT-4o)."""
+        try:
+            client = self.clients.async_azure()
+            response = await self._acall('azure', prompt, lambda: client.chat.completions.create(**self._azure_request(prompt)))
+            return response.choices[0].message.content
+        except ImportError:
+            logger.error("OpenAI package not installed. Install with: uv add openai")
+            return self._fallback_response()
+        except AdmissionRejected:
+            raise
+        except Exception as e:
+            logger.error(f"Azure OpenAI API error: {e}")
+            return self._fallback_response()
+    
+    async def _acall_huggingface(self, prompt: str) -> str:
+        """Async HuggingFace Inference API call."""
+        client = self.clients.async_http()
+        
+        async def post():
+            response = await client.post(HUGGINGFACE_MODEL_URL, **self._huggingface_request(prompt))
+            if response.status_code != 200:
+                raise ProviderHTTPError('huggingface', response.status_code, response.headers)
+            return response
+        
+        try:
+            response = await self._acall('huggingface', prompt, post)
+            return response.json()[0]["generated_text"]
+        except AdmissionRejected:
+            raise
+        except Exception as e:
+            logger.error(f"HuggingFace API error: {e}")
+            return self._fallback_response()
+    
+    async def _acall_local(self, prompt: str) -> str:
+        """Async call to a local OpenAI-compatible server."""
+        try:
+            client = self.clients.async_local()
+            response = await self._acall('local', prompt, lambda: client.chat.completions.create(**self._local_request(prompt)))
+            return response.choices[0].message.content
+        except ImportError:
+            logger.error("OpenAI package not installed. Install with: uv add openai")
+            return self._fallback_response()
+        except AdmissionRejected:
+            raise
+        except Exception as e:
+            logger.error(f"Local LLM error: {e}")
+            return self._fallback_response()
+    
+    def _call(self, provider: str, prompt: str, fn):
+        """
+        Run one provider call for prompt under its retry policy and circuit
+        breaker, and record its tokens and latency. Each attempt is admitted
+        separately, so no admission slot is held during retry backoff.
+        """
+        tokens = self._admission_tokens(prompt)
+        
+        def attempt():
+            with self.admission.acquire(tokens):
+                return fn()
+        
+        started = time.perf_counter()
+        try:
+            result = call_with_retry(attempt, self.retry_policies[provider], self.breakers[provider])
+        except BaseException as e:
+            self._record_usage(provider, prompt, started, (0, 0), status=self._failure_status(e))
+            raise
+        self._record_usage(provider, prompt, started, self._reported_usage(result),
+                           self._response_text(provider, result))
+        return result
+    
+    async def _acall(self, provider: str, prompt: str, fn):
+        tokens = self._admission_tokens(prompt)
+        
+        async def attempt():
+            async with self.admission.aacquire(tokens):
+                return await fn()
+        
+        started = time.perf_counter()
+        try:
+            result = await acall_with_retry(attempt, self.retry_policies[provider], self.breakers[provider])
+        except BaseException as e:
+            self._record_usage(provider, prompt, started, (0, 0), status=self._failure_status(e))
+            raise
+        self._record_usage(provider, prompt, started, self._reported_usage(result),
+                           self._response_text(provider, result))
+        return result
+    
+    async def _aopen_admitted(self, held: AsyncExitStack, prompt: str, open_stream):
+        """
+        One attempt at opening a stream, admitted on its own. Once the stream
+        is open its admission slot moves to held and stays taken until the
+        stream ends; a failed attempt frees the slot before retry backoff.
+        """
+        async with AsyncExitStack() as slot:
+            await slot.enter_async_context(self.admission.aacquire(self._admission_tokens(prompt)))
+            stream = await open_stream()
+            held.push_async_exit(slot.pop_all())
+            return stream
+    
+    @staticmethod
+    def _failure_status(error: BaseException) -> str:
+        return "error" if isinstance(error, Exception) else "cancelled"
+    
+    def _model_name(self, provider: str) -> str:
+        return {
+            'azure': 'gpt-4o',
+            'groq': 'openai/gpt-oss-20b',
+            'gemini': 'gemini-pro',
+            'huggingface': HUGGINGFACE_MODEL_URL.rsplit('/models/', 1)[-1],
+            'local': self.local_model,
+        }[provider]
+    
+    @staticmethod
+    def _reported_usage(result: Any) -> Optional[Tuple[int, int]]:
+        """(prompt, completion) tokens reported by the provider, if it sent usage."""
+        usage = getattr(result, 'usage', None)
+        if usage is not None and getattr(usage, 'prompt_tokens', None) is not None:
+            return usage.prompt_tokens, usage.completion_tokens or 0
+        usage = getattr(result, 'usage_metadata', None)  # Gemini
+        if usage is not None and getattr(usage, 'prompt_token_count', None):
+            return usage.prompt_token_count, usage.candidates_token_count or 0
+        return None
+    
+    @staticmethod
+    def _response_text(provider: str, result: Any) -> str:
+        try:
+            if provider == 'gemini':
+                return result.text
+            if provider == 'huggingface':
+                return result.json()[0]["generated_text"]
+            return result.choices[0].message.content or ""
+        except Exception:
+            return ""
+    
+    def _record_usage(self, provider: str, prompt: str, started: float, reported: Optional[Tuple[int, int]],
+                      completion_text: str = "", ttft_ms: float = None, status: str = "ok"):
+        """Account one call; token counts the provider did not report are estimated locally."""
+        estimated = reported is None
+        if estimated:
+            reported = (self.system_prompt_tokens + count_tokens(prompt), count_tokens(completion_text))
+        usage_tracker.record(
+            provider, self._model_name(provider), reported[0], reported[1],
+            latency_ms=(time.perf_counter() - started) * 1000,
+            ttft_ms=ttft_ms,
+            estimated=estimated,
+            status=status
+        )
+    
+    def _admission_tokens(self, prompt: str) -> int:
+        """Tokens a call is charged against the admission budget (estimated before the call)."""
+        return self.system_prompt_tokens + count_tokens(prompt) + self.expected_completion_tokens
+    
+    def get_admission_status(self) -> Dict[str, Any]:
+        return {**self.admission.get_status(), "expected_completion_tokens": self.expected_completion_tokens}
+    
+    def get_breaker_status(self) -> Dict[str, Any]:
+        """Circuit state and retry policy of every configured provider."""
+        return {
+            name: {**self.breakers[name].get_status(), "retry": self.retry_policies[name].describe()}
+            for name in self.PROVIDERS
+            if self._provider_available(name)
+        }
+    
+    async def astream_response(self, prompt: str, provider: str = None) -> AsyncIterator[str]:
+        """
+        Stream the answer as text deltas. Providers without a streaming API
+        (huggingface) or without credentials yield the complete answer once
+        (or the fallback response); a failure before the first token
+        yields the fallback response instead. With a hedge provider configured
+        the request is hedged (see _ahedged_stream).
+        """
+        if not provider:
+            provider = self.default_provider
+        
+        if provider in ('groq', 'azure') and self.azure_openai_key:
+            provider = 'azure'
+        elif provider not in ('gemini', 'local') or not self._provider_available(provider):
+            yield await self.agenerate_response(prompt, provider)
+            return
+        
+        hedge = self._hedge_for(provider)
+        if hedge:
+            stream, label = self._ahedged_stream(prompt, provider, hedge), 'hedged'
+        else:
+            stream, label = self._astream_provider(provider, prompt), provider
+        
+        started = time.perf_counter()
+        streamed = False
+        try:
+            async for text in stream:
+                if not streamed:
+                    metrics.observe(f"llm.{label}.ttft_ms", (time.perf_counter() - started) * 1000)
+                    streamed = True
+                yield text
+        except ImportError:
+            logger.error(f"Client package for {provider} not installed")
+            if not streamed:
+                yield self._fallback_response()
+        except AdmissionRejected:
+            raise
+        except Exception as e:
+            logger.error(f"Error streaming from {provider}: {e}")
+            if not streamed:
+                yield self._fallback_response()
+        finally:
+            await stream.aclose()
+    
+    def _provider_available(self, provider: str) -> bool:
+        return {
+            'azure': bool(self.azure_openai_key and self.endpoint_url),
+            'groq': bool(self.groq_api_key),
+            'gemini': bool(self.gemini_api_key),
+            'huggingface': bool(self.hf_token),
+            'local': bool(self.local_base_url),
+        }.get(provider, False)
+    
+    def _hedge_for(self, primary: str) -> Optional[str]:
+        """Secondary provider to hedge primary with, if hedging is configured and usable."""
+        if self.hedge_provider and self.hedge_provider != primary and self._provider_available(self.hedge_provider):
+            return self.hedge_provider
+        return None
+    
+    def answer_identity(self, provider: str = None) -> str:
+        """
+        Provider/model that answers prompts sent to provider, plus the hedge
+        setup when a hedge can answer instead. Part of the response cache keys.
+        """
+        provider = provider or self.default_provider
+        if provider == 'groq' and self.azure_openai_key:
+            provider = 'azure'  # 'groq' requests are served by Azure (see generate_response)
+        identity = f"{provider}/{self._model_name(provider)}"
+        hedge = self._hedge_for(provider)
+        if hedge:
+            identity += f"+hedge:{hedge}/{self._model_name(hedge)}@{self.hedge_after_ms:g}ms"
+        return identity
+    
+    def _astream_provider(self, provider: str, prompt: str) -> AsyncIterator[str]:
+        if provider == 'azure':
+            return self._astream_chat(provider, prompt, self.clients.async_azure, self._azure_request(prompt))
+        if provider == 'groq':
+            return self._astream_chat(provider, prompt, self.clients.async_groq, self._groq_request(prompt))
+        if provider == 'local':
+            return self._astream_chat(provider, prompt, self.clients.async_local, self._local_request(prompt))
+        if provider == 'gemini':
+            return self._astream_gemini(prompt)
+        raise ValueError(f"Provider {provider} does not support streaming")
+    
+    async def _ahedged_stream(self, prompt: str, primary: str, secondary: str) -> AsyncIterator[str]:
+        """
+        Hedged request: start the primary; if it has no first token after
+        hedge_after_ms (or fails first), start the secondary in parallel.
+        Whichever delivers a first token first wins and streams the answer;
+        the other call is cancelled and its connection closed.
+        """
+        metrics.increment("llm.hedge.requests")
+        streams = {primary: self._astream_provider(primary, prompt)}
+        pending = {asyncio.ensure_future(streams[primary].__anext__()): primary}
+        winner, first_text, errors, rejected = None, None, {}, None
+        try:
+            while winner is None:
+                hedge_pending = secondary not in streams
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=self.hedge_after_ms / 1000 if hedge_pending else None,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    name = pending.pop(task)
+                    try:
+                        first_text, winner = task.result(), name
+                        break
+                    except StopAsyncIteration:
+                        errors[name] = "empty response"
+                    except AdmissionRejected as e:
+                        errors[name], rejected = str(e), e
+                    except Exception as e:
+                        errors[name] = str(e)
+                        logger.warning(f"{name} failed in hedged request: {e}")
+                if winner:
+                    break
+                if hedge_pending:
+                    # Primary is slow (timeout) or already failed
+                    logger.info(f"No first token from {primary}; hedging with {secondary}")
+                    metrics.increment("llm.hedge.fired")
+                    streams[secondary] = self._astream_provider(secondary, prompt)
+                    pending[asyncio.ensure_future(streams[secondary].__anext__())] = secondary
+                elif not pending:
+                    if rejected:
+                        raise rejected
+                    raise RuntimeError(f"All hedged providers failed: {errors}")
+        finally:
+            # Cancel the loser (or everything, if the caller went away mid-race)
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+            for name, stream in streams.items():
+                if name != winner:
+                    await stream.aclose()
+        
+        metrics.increment(f"llm.hedge.won.{winner}")
+        stream = streams[winner]
+        try:
+            yield first_text
+            async for text in stream:
+                yield text
+        finally:
+            await stream.aclose()
+    
+    def get_hedging_status(self) -> Optional[Dict[str, Any]]:
+        """Hedge configuration plus fire and win rates, for tuning hedge_after_ms."""
+        if not self.hedge_provider:
+            return None
+        requests = metrics.get("llm.hedge.requests")
+        fired = metrics.get("llm.hedge.fired")
+        wins = {name: metrics.get(f"llm.hedge.won.{name}") for name in ('azure', *self.HEDGE_PROVIDERS)}
+        return {
+            "secondary": self.hedge_provider,
+            "secondary_available": self._provider_available(self.hedge_provider),
+            "hedge_after_ms": self.hedge_after_ms,
+            "requests": requests,
+            "fired": fired,
+            "fire_rate": fired / requests if requests else 0.0,
+            "wins": {name: count for name, count in wins.items() if count},
+            "secondary_win_rate": wins[self.hedge_provider] / fired if fired else 0.0,
+        }
+    
+    async def _astream_chat(self, provider: str, prompt: str, client_factory, request: Dict[str, Any]) -> AsyncIterator[str]:
+        """Stream an OpenAI-compatible chat completion (Azure, Groq, local servers)."""
+        client = client_factory()
+        if provider in self.STREAM_USAGE_PROVIDERS:
+            request = {**request, "stream_options": {"include_usage": True}}
+        # The admission slot is held until the stream ends, not just until it opens
+        async with AsyncExitStack() as held:
+            started = time.perf_counter()
+            ttft_ms, parts, reported, status = None, [], None, "cancelled"
+            try:
+                # Retries cover opening the stream; a stream that breaks midway is not replayed
+                stream = await acall_with_retry(
+                    lambda: self._aopen_admitted(held, prompt, lambda: client.chat.completions.create(**request, stream=True)),
+                    self.retry_policies[provider], self.breakers[provider]
+                )
+                try:
+                    async for chunk in stream:
+                        # The usage chunk (stream_options) has no choices
+                        reported = self._reported_usage(chunk) or reported
+                        # Azure sends content-filter results as chunks without choices
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            if ttft_ms is None:
+                                ttft_ms = (time.perf_counter() - started) * 1000
+                            parts.append(chunk.choices[0].delta.content)
+                            yield chunk.choices[0].delta.content
+                finally:
+                    await stream.close()
+                status = "ok"
+            except Exception:
+                status = "error"
+                raise
+            finally:
+                # Also accounts the partial output of a cancelled stream (e.g. a hedge loser)
+                self._record_usage(provider, prompt, started, reported, "".join(parts), ttft_ms, status)
+    
+    async def _astream_gemini(self, prompt: str) -> AsyncIterator[str]:
+        model = self.clients.gemini(self.gemini_api_key)
+        async with AsyncExitStack() as held:
+            started = time.perf_counter()
+            ttft_ms, parts, reported, status = None, [], None, "cancelled"
+            try:
+                response = await acall_with_retry(
+                    lambda: self._aopen_admitted(held, prompt, lambda: model.generate_content_async(
+                        f"{self._get_system_prompt()}\n\n{prompt}", stream=True)),
+                    self.retry_policies['gemini'], self.breakers['gemini']
+                )
+                async for chunk in response:
+                    reported = self._reported_usage(chunk) or reported
+                    if chunk.text:
+                        if ttft_ms is None:
+                            ttft_ms = (time.perf_counter() - started) * 1000
+                        parts.append(chunk.text)
+                        yield chunk.text
+                status = "ok"
+            except Exception:
+                status = "error"
+                raise
+            finally:
+                self._record_usage('gemini', prompt, started, reported, "".join(parts), ttft_ms, status)
+    
+    def _messages(self, prompt: str) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": self._get_system_prompt()},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def _azure_request(self, prompt: str) -> Dict[str, Any]:
+        return {
+            "model": self._model_name('azure'),  # GPT-4o model
+            "messages": self._messages(prompt),
+            "temperature": 0,
+            "max_tokens": 6000
+        }
+    
+    def _groq_request(self, prompt: str) -> Dict[str, Any]:
+        return {
+            "model": self._model_name('groq'),
+            "messages": self._messages(prompt),
+            "temperature": 0,
+            "max_tokens": 4000
+        }
+    
+    def _local_request(self, prompt: str) -> Dict[str, Any]:
+        return {
+            "model": self._model_name('local'),
+            "messages": self._messages(prompt),
+            "temperature": 0,
+            "max_tokens": 4000
+        }
+    
+    def _huggingface_request(self, prompt: str) -> Dict[str, Any]:
+        return {
+            "headers": {"Authorization": f"Bearer {self.hf_token}"},
+            "json": {
                 "inputs": f"{self._get_system_prompt()}\n\n{prompt}",
                 "parameters": {
                     "max_new_tokens": 2000,
@@ -174,46 +710,24 @@ class LLMProvider:
                     "do_sample": True
                 }
             }
-            
-            response = requests.post(
-                "https://api-inference.huggingface.co/models/meta-llama/Llama-2-7b-chat-hf",
-                headers=headers,
-                json=payload
-            )
-            
-            if response.status_code == 200:
-                return response.json()[0]["generated_text"]
-            else:
-                logger.error(f"HuggingFace API error: {response.status_code}")
-                return self._fallback_response(prompt)
-                
-        except ImportError:
-            logger.error("Requests package not installed. Install with: uv add requests")
-            return self._fallback_response(prompt)
+        }
     
-    def _fallback_response(self, prompt: str) -> str:
-        """Fallback response when LLM is not available."""
-        return f"""Based on the retrieved medical knowledge, here's what I can tell you:
-
-{prompt}
+    @staticmethod
+    def is_fallback_response(response: str) -> bool:
+        """True if a response came from _fallback_response rather than an LLM."""
+        return "Note: This is a fallback response." in (response or "")
+    
+    def _fallback_response(self) -> str:
+        """Fallback response when no LLM answer could be obtained (never echoes the prompt)."""
+        return """I'm sorry, I couldn't reach the medical language model to answer your question right now. Please try again in a moment.
 
-Note: This is a fallback response. For more detailed and accurate medical information, please ensure your LLM API keys are properly configured in the .env file.
+Note: This is a fallback response. If this keeps happening, check that your LLM API keys are properly configured in the .env file and that the provider is reachable.
 
 Remember: This information is for educational purposes only and should not replace professional medical advice."""
     
     def _get_system_prompt(self) -> str:
         """Get the system prompt for MedBot."""
-        return """You are MedBot, an AI-powered healthcare assistant. Your purpose is to assist users only with healthcare, mental health, psychiatry, medical conditions, symptoms, treatments, anatomy, and evidence-based medical knowledge.
-
-IMPORTANT RULES:
-1. Only answer healthcare-related questions
-2. If the query is non-medical, politely reject it
-3. Always maintain empathetic, professional, and easy-to-understand explanations
-4. Provide clear, structured answers with bullet points when appropriate
-5. Do not provide personal medical diagnosis or prescriptions
-6. Always add: "This is not a substitute for professional medical advice. Please consult a qualified healthcare provider."
-7. Keep responses factually correct and aligned with evidence-based medicine
-8. Use the retrieved medical knowledge to provide accurate, source-based information"""
+        return SYSTEM_PROMPT
 
 class RAGSystem:
     """
@@ -228,10 +742,25 @@ class RAGSystem:
     6. N-Relevant Chunks + User Question → Prompt → Generate Response (LLM)
     """
     
+    # How query_knowledge_base turns context into an answer:
+    #   single   - one LLM call with the comprehensive RAG prompt
+    #   local    - one LLM call with a prompt enriched locally from a fixed template
+    #   two_call - one LLM call rewrites the prompt, a second one answers it
+    GENERATION_STRATEGIES = ("single", "local", "two_call")
+    
     def __init__(self, 
                  chunk_size: int = 1000, 
                  chunk_overlap: int = 200,
-                 embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2"):
+                 embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2",
+                 projection_dim: Optional[int] = None,
+                 rerank: Optional[bool] = None,
+                 rerank_candidates: Optional[int] = None,
+                 mmr_lambda: Optional[float] = None,
+                 max_chunks_per_source: Optional[int] = None,
+                 context_token_budget: Optional[int] = None,
+                 semantic_cache: Optional[bool] = None,
+                 exact_cache: Optional[bool] = None,
+                 generation_strategy: Optional[str] = None):
         
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
@@ -239,9 +768,63 @@ class RAGSystem:
         
         # Initialize components
         self.pdf_processor = PDFProcessor(chunk_size, chunk_overlap)
-        self.embedding_system = EmbeddingSystem(embedding_model)
+        self.embedding_system = EmbeddingSystem(embedding_model, projection_dim=projection_dim)
         self.llm_provider = LLMProvider()
         
+        # Optional cross-encoder stage: retrieve rerank_candidates chunks, keep the best top_k
+        if rerank is None:
+            rerank = os.getenv('MEDBOT_RERANK', '').lower() in ('1', 'true', 'yes')
+        self.rerank_candidates = rerank_candidates or int(os.getenv('MEDBOT_RERANK_CANDIDATES', '20'))
+        self.reranker = CrossEncoderReranker() if rerank else None
+        
+        # Optional MMR diversification of retrieved chunks (1.0 = relevance only)
+        if mmr_lambda is None and os.getenv('MEDBOT_MMR_LAMBDA'):
+            mmr_lambda = float(os.getenv('MEDBOT_MMR_LAMBDA'))
+        if max_chunks_per_source is None and os.getenv('MEDBOT_MAX_CHUNKS_PER_SOURCE'):
+            max_chunks_per_source = int(os.getenv('MEDBOT_MAX_CHUNKS_PER_SOURCE'))
+        self.mmr_lambda = mmr_lambda
+        self.max_chunks_per_source = max_chunks_per_source
+        self.diversity_candidates = int(os.getenv('MEDBOT_MMR_CANDIDATES', '20'))
+        
+        # Upper bound on retrieved-context tokens per prompt
+        self.context_token_budget = context_token_budget or int(os.getenv('MEDBOT_CONTEXT_TOKEN_BUDGET', '1500'))
+        
+        # Optional cache of final answers for semantically equivalent questions
+        if semantic_cache is None:
+            semantic_cache = os.getenv('MEDBOT_SEMANTIC_CACHE', '').lower() in ('1', 'true', 'yes')
+        self.semantic_cache = SemanticAnswerCache(
+            str(Path(EmbeddingSystem.DATABASE_PATH) / "answer_cache"),
+            threshold=float(os.getenv('MEDBOT_SEMANTIC_CACHE_THRESHOLD', '0.97')),
+            ttl_seconds=float(os.getenv('MEDBOT_SEMANTIC_CACHE_TTL', str(24 * 3600))),
+            max_entries=int(os.getenv('MEDBOT_SEMANTIC_CACHE_SIZE', '5000')),
+            save_interval=float(os.getenv('MEDBOT_SEMANTIC_CACHE_SAVE_SECONDS', '30'))
+        ) if semantic_cache else None
+        
+        # Exact-match cache with single-flight for identical requests (on by default)
+        if exact_cache is None:
+            exact_cache = os.getenv('MEDBOT_EXACT_CACHE', '1').lower() not in ('0', 'false', 'no')
+        self.exact_cache = ExactResponseCache(
+            max_entries=int(os.getenv('MEDBOT_EXACT_CACHE_SIZE', '1000')),
+            ttl_seconds=float(os.getenv('MEDBOT_EXACT_CACHE_TTL', '3600'))
+        ) if exact_cache else None
+        
+        self.generation_strategy = generation_strategy or os.getenv('MEDBOT_GENERATION_STRATEGY', 'single')
+        if self.generation_strategy not in self.GENERATION_STRATEGIES:
+            raise ValueError(f"Unknown generation strategy '{self.generation_strategy}'. "
+                             f"Use one of: {', '.join(self.GENERATION_STRATEGIES)}")
+        
+        # Versioned answer prompt; its static prefix is compiled and token-counted once
+        self.prompt_template = get_prompt_template("comprehensive")
+        
+        # Chunks retrieved for recent turns, reused to ground follow-up questions
+        self.conversation_context = ConversationContextStore()
+        
+        # Threads for the CPU-bound part of async requests (retrieval, reranking, prompt building)
+        self.retrieval_executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv('MEDBOT_RETRIEVAL_WORKERS', '4')),
+            thread_name_prefix="retrieval"
+        )
+        
         # Knowledge base status
         self.knowledge_base_initialized = False
         self.total_chunks = 0
@@ -365,7 +948,9 @@ class RAGSystem:
             
             # Step 3: Perform semantic similarity search
             logger.info("Step 3: Performing semantic similarity search...")
-            relevant_chunks = self.embedding_system.search_similar_chunks(user_question, top_k)
+            relevant_chunks, retrieval_stats = self._retrieve_chunks(
+                user_question, top_k, previous_topic=self._previous_user_question(chat_history)
+            )
             
             if not relevant_chunks:
                 return {
@@ -377,11 +962,13 @@ class RAGSystem:
             
             # Step 4: Prepare context for LLM
             logger.info("Step 4: Preparing context for LLM...")
-            context = self._prepare_context(relevant_chunks)
+            context, retrieval_stats["context"] = self._pack_context(relevant_chunks)
             
             # Step 5: Generate response using LLM
             logger.info("Step 5: Generating response using LLM...")
-            response = self._generate_llm_response(user_question, context, relevant_chunks, llm_provider)
+            response, generation_stats = self._generate_llm_response(
+                user_question, context, relevant_chunks, llm_provider, chat_history
+            )
             
             return {
                 "success": True,
@@ -391,7 +978,11 @@ class RAGSystem:
                 "context_length": len(context),
                 "chunks_used": len(relevant_chunks),
                 "llm_provider": llm_provider or self.llm_provider.default_provider,
-                "follow_up_type": follow_up_validation["type"]
+                "follow_up_type": follow_up_validation["type"],
+                "retrieval_stats": retrieval_stats,
+                # Search timings under their earlier key, for existing clients
+                "search_stats": retrieval_stats["search"],
+                "generation": generation_stats
             }
             
         except Exception as e:
@@ -402,24 +993,79 @@ class RAGSystem:
                 "question": user_question
             }
     
+    def _retrieve_chunks(self, question: str, top_k: int = 5, previous_topic: str = None) -> Tuple[List[Dict], Dict[str, Any]]:
+        """
+        Retrieve the chunks to put in the prompt. With reranking enabled this
+        fetches rerank_candidates chunks and keeps the top_k the cross-encoder
+        scores highest. With diversification enabled the final top_k is
+        picked from the candidates by MMR; otherwise it is a plain top_k search.
+        """
+        diversify = self.mmr_lambda is not None or bool(self.max_chunks_per_source)
+        fetch_k = top_k
+        if self.reranker:
+            fetch_k = max(fetch_k, self.rerank_candidates)
+        if diversify:
+            fetch_k = max(fetch_k, self.diversity_candidates)
+        
+        chunks = self.embedding_system.search_similar_chunks(question, fetch_k, previous_topic=previous_topic)
+        stats = {"search": self.embedding_system.last_search_stats}
+        
+        if self.reranker and chunks:
+            # Keep the whole reranked pool when MMR picks the final set
+            chunks, stats["rerank"] = self.reranker.rerank(question, chunks, len(chunks) if diversify else top_k)
+        if diversify and len(chunks) > top_k:
+            try:
+                chunks, stats["diversity"] = self._diversify(chunks, top_k)
+            except Exception as e:
+                logger.error(f"Error diversifying chunks, keeping relevance order: {e}")
+        return chunks[:top_k], stats
+    
+    def _diversify(self, chunks: List[Dict], top_k: int) -> Tuple[List[Dict], Dict[str, Any]]:
+        """
+        Pick top_k chunks by maximal marginal relevance using the stored
+        embeddings of the candidates, and report the near-duplicate prompt
+        tokens this avoids compared with the plain top_k.
+        """
+        vectors = self.embedding_system.get_chunk_embeddings([chunk['id'] for chunk in chunks])
+        relevance = [chunk.get('rerank_score', chunk['similarity_score']) for chunk in chunks]
+        sources = [chunk['metadata'].get('source', '') for chunk in chunks]
+        lambda_ = self.mmr_lambda if self.mmr_lambda is not None else 1.0
+        
+        picked = mmr_select(relevance, vectors, top_k, lambda_, sources, self.max_chunks_per_source)
+        baseline = list(range(min(top_k, len(chunks))))
+        baseline_dupes, baseline_tokens = redundant_tokens([chunks[i]['content'] for i in baseline], vectors[baseline])
+        picked_dupes, picked_tokens = redundant_tokens([chunks[i]['content'] for i in picked], vectors[picked])
+        
+        stats = {
+            "lambda": lambda_,
+            "max_per_source": self.max_chunks_per_source,
+            "candidates": len(chunks),
+            "near_duplicates_before": baseline_dupes,
+            "near_duplicates_after": picked_dupes,
+            "prompt_tokens_saved": baseline_tokens - picked_tokens
+        }
+        logger.info(f"MMR selection: {baseline_dupes} -> {picked_dupes} near-duplicate chunks, "
+                    f"{stats['prompt_tokens_saved']} prompt tokens saved")
+        return [chunks[i] for i in picked], stats
+    
     def _prepare_context(self, relevant_chunks: List[Dict]) -> str:
         """
         Prepare context from relevant chunks for the LLM.
         This implements the "Prompt Construction" part of the workflow.
         """
-        context_parts = []
-        
-        for i, chunk in enumerate(relevant_chunks):
-            source = chunk['metadata']['source']
-            similarity = chunk['similarity_score']
-            
-            context_part = f"""
---- Source {i+1}: {source} (Relevance: {similarity:.2f}) ---
-{chunk['content']}
-"""
-            context_parts.append(context_part)
-        
-        return "\n".join(context_parts)
+        return self._pack_context(relevant_chunks)[0]
+    
+    def _pack_context(self, relevant_chunks: List[Dict]) -> Tuple[str, Dict[str, Any]]:
+        """
+        Pack ranked chunks into at most context_token_budget tokens, merging
+        overlapping or adjacent chunks of the same source into one span.
+        Returns (context, packing stats).
+        """
+        context, stats = pack_context(relevant_chunks, self.context_token_budget)
+        logger.info(f"Packed {stats['chunks']} chunks into {stats['spans_used']} spans, "
+                    f"{stats['context_tokens']}/{stats['token_budget']} tokens "
+                    f"(from {stats['input_tokens']})")
+        return context, stats
     
     def _is_healthcare_query(self, query: str, chat_history: List[Dict] = None) -> bool:
         """Check if the query is healthcare-related with context awareness."""
@@ -588,27 +1234,32 @@ class RAGSystem:
         logger.info("❌ No healthcare indicators found - treating as non-medical query")
         return False
     
-    def _generate_llm_response(self, question: str, context: str, relevant_chunks: List[Dict], llm_provider: str = None) -> str:
+    def _generate_llm_response(self, question: str, context: str, relevant_chunks: List[Dict], llm_provider: str = None,
+                               chat_history: List[Dict] = None) -> Tuple[str, Dict[str, Any]]:
         """
-        Generate response using Azure OpenAI API for both prompt enrichment and final response generation.
+        Generate response using the configured generation strategy (see GENERATION_STRATEGIES).
         This implements the "Generate Response (LLM)" part of the workflow.
+        Returns the response and generation stats (strategy, LLM calls, estimated tokens, latency).
         """
-        
-        # Prepare the rich prompt for the LLM
+        started = time.perf_counter()
+        strategy = self.generation_strategy
+        stats = {"strategy": strategy, "llm_calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0}
         sources = list(set(chunk['metadata']['source'] for chunk in relevant_chunks))
         
-        # Step 1: Use Azure OpenAI API to enrich the prompt with retrieved information
-        enriched_prompt = self._enrich_prompt_with_azure(question, context, relevant_chunks)
-        
-        # Log the enhanced prompt for debugging
-        logger.info(f"Enhanced prompt created by Azure OpenAI:")
-        logger.info(f"Length: {len(enriched_prompt)} characters")
-        logger.info(f"Preview: {enriched_prompt[:200]}...")
-        
-        # Step 2: Use Azure OpenAI API with enriched prompt for final response
         try:
-            logger.info("Calling Azure OpenAI API with enhanced prompt...")
-            response = self.llm_provider.generate_response(enriched_prompt, "azure")
+            if strategy == "two_call":
+                # An extra, serial LLM round-trip that rewrites the prompt
+                prompt = self._enrich_prompt_with_azure(question, context, relevant_chunks, stats)
+            elif strategy == "local":
+                prompt = self._create_fallback_enriched_prompt(question, context, relevant_chunks)
+            else:
+                prompt, stats["prompt"] = self._render_comprehensive_prompt(question, context, chat_history=chat_history)
+            
+            logger.info(f"Calling LLM ({strategy} strategy, prompt {len(prompt)} characters)...")
+            response = self._counted_llm_call(prompt, stats, llm_provider)
+            if self.llm_provider.is_fallback_response(response):
+                # No LLM answer; show what was retrieved instead
+                return self._finish_generation(self._generate_fallback_response(question, context, relevant_chunks), stats, started)
             
             # Add source citations if not already included
             if not any(source in response for source in sources):
@@ -622,25 +1273,38 @@ class RAGSystem:
             if disclaimer not in response:
                 response += disclaimer
             
-            # Add the enhanced prompt to the response for transparency
-            full_response = f"""**ENHANCED PROMPT (Generated by Azure OpenAI):**
-{enriched_prompt}
-
-**FINAL RESPONSE (Generated by Azure OpenAI):**
-{response}"""
-            
-            return full_response
-            
+        except AdmissionRejected:
+            raise
         except Exception as e:
             logger.error(f"Error generating LLM response: {e}")
             # Fallback to structured response
-            return self._generate_fallback_response(question, context, relevant_chunks)
+            response = self._generate_fallback_response(question, context, relevant_chunks)
+        
+        return self._finish_generation(response, stats, started)
+    
+    def _finish_generation(self, response: str, stats: Dict[str, Any], started: float) -> Tuple[str, Dict[str, Any]]:
+        strategy = stats["strategy"]
+        stats["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        stats["cost_usd"] = round(stats["cost_usd"], 6)
+        metrics.increment(f"generation.{strategy}.requests")
+        for key in ("llm_calls", "prompt_tokens", "completion_tokens"):
+            metrics.increment(f"generation.{strategy}.{key}", stats[key])
+        metrics.observe(f"generation.{strategy}.latency_ms", stats["latency_ms"])
+        return response, stats
+    
+    def _counted_llm_call(self, prompt: str, stats: Dict[str, Any], provider: str = None) -> str:
+        """LLM call that adds its provider calls, token usage and cost to stats."""
+        with track_llm_usage() as usage:
+            response = self.llm_provider.generate_response(prompt, provider or "azure")
+        summary = usage.summary()
+        for key in ("llm_calls", "prompt_tokens", "completion_tokens", "cost_usd"):
+            stats[key] = stats.get(key, 0) + summary[key]
+        return response
     
-    def _enrich_prompt_with_azure(self, question: str, context: str, relevant_chunks: List[Dict]) -> str:
+    def _enrich_prompt_with_azure(self, question: str, context: str, relevant_chunks: List[Dict],
+                                  stats: Dict[str, Any] = None) -> str:
         """Use Azure OpenAI API to enrich the prompt with retrieved medical knowledge."""
         try:
-            sources = list(set(chunk['metadata']['source'] for chunk in relevant_chunks))
-            
             # Create the enrichment prompt for Azure OpenAI
             enrichment_prompt = f"""You are a medical knowledge enrichment specialist. Your task is to enhance a user's medical question with relevant information from medical sources.
 
@@ -660,15 +1324,21 @@ Your task: Analyze the retrieved medical knowledge and create an enriched, compr
 Create a comprehensive, enriched prompt that combines the user's question with the retrieved medical knowledge in a way that will help generate the most accurate and helpful medical response."""
 
             # Use Azure OpenAI API to enrich the prompt
-            enriched_prompt = self.llm_provider._call_azure_openai(enrichment_prompt)
+            enriched_prompt = self._counted_llm_call(
+                enrichment_prompt,
+                stats if stats is not None else {"llm_calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+            )
             
             # If Azure OpenAI fails, return the original enriched prompt
-            if not enriched_prompt or "error" in enriched_prompt.lower():
+            if (not enriched_prompt or "error" in enriched_prompt.lower()
+                    or self.llm_provider.is_fallback_response(enriched_prompt)):
                 logger.warning("Azure OpenAI API enrichment failed, using fallback enrichment")
                 return self._create_fallback_enriched_prompt(question, context, relevant_chunks)
             
             return enriched_prompt
             
+        except AdmissionRejected:
+            raise
         except Exception as e:
             logger.error(f"Error enriching prompt with Azure OpenAI: {e}")
             return self._create_fallback_enriched_prompt(question, context, relevant_chunks)
@@ -742,7 +1412,23 @@ I've found relevant information from {len(relevant_chunks)} medical sources that
             "vector_store": vector_info,
             "chunk_size": self.chunk_size,
             "chunk_overlap": self.chunk_overlap,
-            "embedding_model": self.embedding_model
+            "embedding_model": self.embedding_model,
+            "generation_strategy": self.generation_strategy,
+            "hedging": self.llm_provider.get_hedging_status(),
+            "llm_providers": self.llm_provider.get_breaker_status(),
+            "admission": self.llm_provider.get_admission_status(),
+            "prompt_template": self.prompt_template.describe(),
+            "semantic_cache": self.semantic_cache.get_stats() if self.semantic_cache else None,
+            "exact_cache": self.exact_cache.get_stats() if self.exact_cache else None,
+            "conversation_context": self.conversation_context.get_stats(),
+            "metrics": metrics.snapshot(),
+            "reranker": {
+                "model": self.reranker.model_name,
+                "available": self.reranker.available,
+                "candidates": self.rerank_candidates,
+                "time_budget_ms": self.reranker.time_budget_ms,
+                "cache": self.reranker.cache_info()
+            } if self.reranker else None
         }
     
     def reset_system(self) -> bool:
@@ -753,6 +1439,15 @@ I've found relevant information from {len(relevant_chunks)} medical sources that
                 self.knowledge_base_initialized = False
                 self.total_chunks = 0
                 self.total_embeddings = 0
+                if self.reranker:
+                    # Cached scores are keyed by chunk id, which a new corpus reuses
+                    self.reranker.clear_cache()
+                if self.semantic_cache:
+                    # Entries are scoped to the old knowledge base generation
+                    self.semantic_cache.clear()
+                if self.exact_cache:
+                    self.exact_cache.clear()
+                self.conversation_context.clear()
                 logger.info("RAG system reset successfully")
                 return True
             else:
@@ -805,7 +1500,7 @@ I've found relevant information from {len(relevant_chunks)} medical sources that
                 }
             
             # Get relevant chunks
-            relevant_chunks = self.embedding_system.search_similar_chunks(question, top_k=5)
+            relevant_chunks, retrieval_stats = self._retrieve_chunks(question, top_k=5)
             
             if not relevant_chunks:
                 return {
@@ -816,7 +1511,9 @@ I've found relevant information from {len(relevant_chunks)} medical sources that
             return {
                 "success": True,
                 "relevant_chunks": relevant_chunks,
-                "total_chunks_found": len(relevant_chunks)
+                "total_chunks_found": len(relevant_chunks),
+                "retrieval_stats": retrieval_stats,
+                "search_stats": retrieval_stats["search"]
             }
             
         except Exception as e:
@@ -826,58 +1523,231 @@ I've found relevant information from {len(relevant_chunks)} medical sources that
                 "error": str(e)
             }
     
-    def generate_azure_enhanced_response(self, question: str, user_name: str = None, chat_history: List[Dict] = None) -> Dict[str, Any]:
-        """Generate comprehensive response using Azure OpenAI with RAG context, user personalization, and chat history."""
+    def batch_retrieve(self, questions: List[str], top_k: int = 5, include_content: bool = True) -> Iterator[Dict[str, Any]]:
+        """
+        Retrieve top_k chunks for many questions without calling an LLM, for
+        offline evaluation. Questions are encoded and searched in batches;
+        one result dict is yielded per question, in input order.
+        """
+        if not self.knowledge_base_initialized:
+            raise RuntimeError("Knowledge base not initialized")
+        
+        for index, chunks in self.embedding_system.iter_batch_search(questions, top_k, include_content=include_content):
+            yield {
+                "index": index,
+                "question": questions[index],
+                "results": [
+                    {
+                        "id": chunk["id"],
+                        "source": chunk["metadata"].get("source", "Unknown Source"),
+                        "score": chunk["similarity_score"],
+                        **({"content": chunk["content"]} if "content" in chunk else {})
+                    }
+                    for chunk in chunks
+                ]
+            }
+    
+    def generate_azure_enhanced_response(self, question: str, user_name: str = None, chat_history: List[Dict] = None,
+                                         conversation_id: str = None) -> Dict[str, Any]:
+        """
+        Generate comprehensive response using Azure OpenAI with RAG context, user personalization, and chat history.
+        Identical requests (same normalised question, user, recent history and
+        knowledge base generation) are answered from the exact-match cache, and
+        concurrent identical requests share one computation.
+        """
+        if not self.exact_cache:
+            return self._generate_azure_enhanced_response(question, user_name, chat_history, conversation_id)
+        
+        key, generation = self._exact_cache_key(question, user_name, chat_history)
+        result, status = self.exact_cache.get_or_compute(
+            key,
+            generation,
+            lambda: self._generate_azure_enhanced_response(question, user_name, chat_history, conversation_id),
+            self._is_cacheable_response
+        )
+        return self._tag_exact_cache(result, status, question)
+    
+    async def agenerate_azure_enhanced_response(self, question: str, user_name: str = None, chat_history: List[Dict] = None,
+                                                conversation_id: str = None) -> Dict[str, Any]:
+        """
+        Async version of generate_azure_enhanced_response for the API server.
+        Retrieval and prompt building run on the retrieval thread pool and the
+        LLM call is awaited, so one slow answer no longer holds up the event
+        loop or a threadpool worker while the model is generating.
+        """
+        if not self.exact_cache:
+            return await self._agenerate_azure_enhanced_response(question, user_name, chat_history, conversation_id)
+        
+        key, generation = self._exact_cache_key(question, user_name, chat_history)
+        result, status = await self.exact_cache.aget_or_compute(
+            key,
+            generation,
+            lambda: self._agenerate_azure_enhanced_response(question, user_name, chat_history, conversation_id),
+            self._is_cacheable_response
+        )
+        return self._tag_exact_cache(result, status, question)
+    
+    async def astream_azure_enhanced_response(self, question: str, user_name: str = None, chat_history: List[Dict] = None,
+                                              conversation_id: str = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming version of agenerate_azure_enhanced_response. Yields
+        {"event": "sources"} with the retrieval result as soon as the context
+        is ready, then {"event": "token", "text": ...} for every generated
+        delta and finally {"event": "done"} with the complete result (or
+        {"event": "error"}). Cached answers arrive as a single token.
+        Concurrent identical streams share one LLM call: the first streams
+        it, the others wait for the finished answer.
+        """
+        started = time.perf_counter()
+        metrics.increment("chat.stream.requests")
+        leader = None
+        if self.exact_cache:
+            key, generation = self._exact_cache_key(question, user_name, chat_history)
+            status, value = self.exact_cache.begin(key, generation)
+            if status == "miss":
+                leader = value
+            else:
+                try:
+                    cached = value if status == "hit" else await asyncio.shield(asyncio.wrap_future(value))
+                except Exception as e:
+                    # The identical stream failed or its client went away; answer this one separately
+                    logger.warning(f"Identical streamed request failed: {e}")
+                else:
+                    async for event in self._astream_finished_result(self._tag_exact_cache(cached, status, question), started):
+                        yield event
+                    return
+        
+        result = None
         try:
-            if not self.knowledge_base_initialized:
-                return {
-                    "success": False,
-                    "error": "Knowledge base not initialized"
-                }
-            
-            # Get relevant chunks
-            relevant_chunks = self.embedding_system.search_similar_chunks(question, top_k=5)
-            
-            if not relevant_chunks:
-                return {
-                    "success": False,
-                    "error": "No relevant context found"
-                }
-            
-            # Create context from chunks
-            context = self._prepare_context(relevant_chunks)
-            
-            # Generate comprehensive response using Azure with user personalization and chat history
-            comprehensive_prompt = self._create_comprehensive_prompt(question, context, user_name, chat_history)
+            async for event in self._astream_azure_uncached(question, user_name, chat_history, conversation_id, started):
+                if event["event"] == "done":
+                    result = event["result"]
+                yield event
+        except BaseException as e:
+            if leader is not None:
+                self.exact_cache.fail(key, leader, e)
+            raise
+        if leader is not None:
+            if result is None:
+                self.exact_cache.fail(key, leader, RuntimeError("Streamed request produced no answer"))
+            else:
+                self.exact_cache.finish(key, generation, leader, result, self._is_cacheable_response)
+    
+    async def _astream_azure_uncached(self, question: str, user_name: str, chat_history: List[Dict],
+                                      conversation_id: str, started: float) -> AsyncIterator[Dict[str, Any]]:
+        """Uncached body of astream_azure_enhanced_response."""
+        loop = asyncio.get_running_loop()
+        try:
+            early_result, request = await loop.run_in_executor(
+                self.retrieval_executor, self._prepare_azure_request, question, user_name, chat_history, conversation_id
+            )
+        except Exception as e:
+            logger.error(f"Error preparing streamed response: {e}")
+            yield {"event": "error", "error": str(e)}
+            return
+        
+        if early_result is not None:
+            async for event in self._astream_finished_result(early_result, started):
+                yield event
+            return
+        
+        sources = self._azure_result(request, "")
+        del sources["response"]
+        yield {"event": "sources", "result": sources}
+        
+        parts = []
+        async for text in self.llm_provider.astream_response(request["prompt"], 'azure'):
+            if not parts:
+                metrics.observe("chat.ttft_ms", (time.perf_counter() - started) * 1000)
+            parts.append(text)
+            yield {"event": "token", "text": text}
+        
+        result = await loop.run_in_executor(self.retrieval_executor, self._finish_azure_response, request, "".join(parts))
+        metrics.observe("chat.stream.total_ms", (time.perf_counter() - started) * 1000)
+        yield {"event": "done", "result": result}
+    
+    @staticmethod
+    async def _astream_finished_result(result: Dict[str, Any], started: float) -> AsyncIterator[Dict[str, Any]]:
+        """Stream events for an answer that is already complete (cached or early result)."""
+        if not result.get("success", False):
+            yield {"event": "error", "error": result.get("error", "Unknown error occurred")}
+            return
+        yield {"event": "sources", "result": {k: v for k, v in result.items() if k != "response"}}
+        metrics.observe("chat.ttft_ms", (time.perf_counter() - started) * 1000)
+        yield {"event": "token", "text": result.get("response", "")}
+        yield {"event": "done", "result": result}
+    
+    def _exact_cache_key(self, question: str, user_name: str = None, chat_history: List[Dict] = None) -> Tuple[str, str]:
+        settings = self._answer_settings(user_name, chat_history)
+        key = ExactResponseCache.make_key(normalize_question(question), json.dumps(settings, sort_keys=True))
+        return key, settings["kb_generation"]
+    
+    @staticmethod
+    def _tag_exact_cache(result: Dict[str, Any], status: str, question: str) -> Dict[str, Any]:
+        if status != "miss":
+            logger.info(f"Exact cache {status} for question: {question[:60]}")
+            result = dict(result, cache={"type": "exact", "status": status})
+        return result
+    
+    def _is_cacheable_response(self, result: Dict[str, Any]) -> bool:
+        """Only successful LLM answers are worth caching, never fallbacks or errors."""
+        return (result.get("success", False)
+                and "note" not in result
+                and not self.llm_provider.is_fallback_response(result.get("response", "")))
+    
+    def _generate_azure_enhanced_response(self, question: str, user_name: str = None, chat_history: List[Dict] = None,
+                                          conversation_id: str = None) -> Dict[str, Any]:
+        """Uncached body of generate_azure_enhanced_response."""
+        try:
+            early_result, request = self._prepare_azure_request(question, user_name, chat_history, conversation_id)
+            if early_result:
+                return early_result
             
             try:
-                azure_response = self.llm_provider._call_azure_openai(comprehensive_prompt)
-                
-                return {
-                    "success": True,
-                    "response": azure_response,
-                    "relevant_chunks": relevant_chunks,
-                    "chunks_used": len(relevant_chunks),
-                    "context_used": context[:500] + "..." if len(context) > 500 else context,
-                    "user_name": user_name,
-                    "chat_history_used": len(chat_history) if chat_history else 0
-                }
+                azure_response = self.llm_provider._call_azure_openai(request["prompt"])
+            except AdmissionRejected:
+                raise
+            except Exception as e:
+                logger.error(f"Azure OpenAI error: {e}")
+                return self._azure_fallback_result(request)
+            if self.llm_provider.is_fallback_response(azure_response):
+                return self._azure_fallback_result(request)
+            return self._finish_azure_response(request, azure_response)
                 
+        except AdmissionRejected:
+            raise
+        except Exception as e:
+            logger.error(f"Error generating Azure enhanced response: {e}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
+    
+    async def _agenerate_azure_enhanced_response(self, question: str, user_name: str = None, chat_history: List[Dict] = None,
+                                                 conversation_id: str = None) -> Dict[str, Any]:
+        """Uncached body of agenerate_azure_enhanced_response."""
+        try:
+            loop = asyncio.get_running_loop()
+            early_result, request = await loop.run_in_executor(
+                self.retrieval_executor, self._prepare_azure_request, question, user_name, chat_history, conversation_id
+            )
+            if early_result:
+                return early_result
+            
+            try:
+                azure_response = await self.llm_provider.agenerate_response(request["prompt"], 'azure')
+            except AdmissionRejected:
+                raise
             except Exception as e:
                 logger.error(f"Azure OpenAI error: {e}")
-                # Fallback to regular response
-                fallback_response = self._generate_fallback_response(question, context, relevant_chunks, user_name)
-                return {
-                    "success": True,
-                    "response": fallback_response,
-                    "relevant_chunks": relevant_chunks,
-                    "chunks_used": len(relevant_chunks),
-                    "context_used": context[:500] + "..." if len(context) > 500 else context,
-                    "note": "Azure OpenAI unavailable, using fallback response",
-                    "user_name": user_name,
-                    "chat_history_used": len(chat_history) if chat_history else 0
-                }
+                return self._azure_fallback_result(request)
+            if self.llm_provider.is_fallback_response(azure_response):
+                return self._azure_fallback_result(request)
+            # Storing in the semantic cache embeds the question and writes to disk
+            return await loop.run_in_executor(self.retrieval_executor, self._finish_azure_response, request, azure_response)
                 
+        except AdmissionRejected:
+            raise
         except Exception as e:
             logger.error(f"Error generating Azure enhanced response: {e}")
             return {
@@ -885,6 +1755,192 @@ I've found relevant information from {len(relevant_chunks)} medical sources that
                 "error": str(e)
             }
     
+    def _prepare_azure_request(self, question: str, user_name: str = None, chat_history: List[Dict] = None,
+                               conversation_id: str = None) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """
+        Everything before the LLM call: cache lookup, retrieval, context
+        packing and prompt building. Returns (result, None) when the request
+        is answered without the LLM, otherwise (None, request).
+        """
+        if not self.knowledge_base_initialized:
+            return {
+                "success": False,
+                "error": "Knowledge base not initialized"
+            }, None
+        
+        # Reuse the answer to an equivalent earlier question if one is cached
+        scope = self._answer_scope(user_name, chat_history)
+        cached = self._semantic_cache_lookup(question, scope)
+        if cached:
+            return dict(cached, user_name=user_name, chat_history_used=len(chat_history) if chat_history else 0), None
+        
+        # Get relevant chunks (follow-ups reuse the previous turn's context)
+        follow_up = self._validate_follow_up_context(question, chat_history) if chat_history else None
+        if follow_up and follow_up.get("type") == "follow_up":
+            relevant_chunks, retrieval_stats = self._follow_up_chunks(question, follow_up["context"], conversation_id)
+        else:
+            relevant_chunks, retrieval_stats = self._retrieve_chunks(
+                question, top_k=5, previous_topic=self._previous_user_question(chat_history)
+            )
+            self.conversation_context.remember(
+                [self._conversation_key(conversation_id), self._question_key(question)],
+                self.embedding_system.kb_generation,
+                relevant_chunks
+            )
+        
+        if not relevant_chunks:
+            return {
+                "success": False,
+                "error": "No relevant context found"
+            }, None
+        
+        # Create context from chunks
+        context, retrieval_stats["context"] = self._pack_context(relevant_chunks)
+        
+        # Generate comprehensive response using Azure with user personalization and chat history
+        prompt, retrieval_stats["prompt"] = self._render_comprehensive_prompt(question, context, user_name, chat_history)
+        return None, {
+            "question": question,
+            "user_name": user_name,
+            "chat_history": chat_history,
+            "scope": scope,
+            "relevant_chunks": relevant_chunks,
+            "context": context,
+            "retrieval_stats": retrieval_stats,
+            "prompt": prompt,
+        }
+    
+    def _azure_result(self, request: Dict[str, Any], response: str) -> Dict[str, Any]:
+        context = request["context"]
+        chat_history = request["chat_history"]
+        return {
+            "success": True,
+            "response": response,
+            "relevant_chunks": request["relevant_chunks"],
+            "chunks_used": len(request["relevant_chunks"]),
+            "context_used": context[:500] + "..." if len(context) > 500 else context,
+            "user_name": request["user_name"],
+            "chat_history_used": len(chat_history) if chat_history else 0,
+            "retrieval_stats": request["retrieval_stats"]
+        }
+    
+    def _finish_azure_response(self, request: Dict[str, Any], azure_response: str) -> Dict[str, Any]:
+        result = self._azure_result(request, azure_response)
+        if self._is_cacheable_response(result):
+            self._semantic_cache_store(request["question"], request["scope"], result)
+        return result
+    
+    def _azure_fallback_result(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Fallback to regular response when the Azure call fails outright."""
+        fallback_response = self._generate_fallback_response(
+            request["question"], request["context"], request["relevant_chunks"], request["user_name"]
+        )
+        result = self._azure_result(request, fallback_response)
+        result["note"] = "Azure OpenAI unavailable, using fallback response"
+        return result
+    
+    @staticmethod
+    def _previous_user_question(chat_history: List[Dict] = None) -> Optional[str]:
+        """Most recent user message in the history (topic hint for multi-query retrieval)."""
+        for message in reversed(chat_history or []):
+            if message.get('role') == 'user' and message.get('content'):
+                return message['content']
+        return None
+    
+    @staticmethod
+    def _conversation_key(conversation_id: str = None) -> Optional[str]:
+        return f"conversation:{conversation_id}" if conversation_id else None
+    
+    @staticmethod
+    def _question_key(question: str) -> str:
+        return f"question:{normalize_question(question)}"
+    
+    def _follow_up_chunks(self, question: str, previous_question: str, conversation_id: str = None) -> Tuple[List[Dict], Dict[str, Any]]:
+        """
+        Context for a follow-up ("explain in detail", "give me examples"):
+        the chunks of the previous turn, extended with their neighbouring
+        chunks in the source document, without a new search. If the previous
+        turn is not remembered (e.g. after a restart), search for the previous
+        medical question rather than the content-free follow-up text.
+        """
+        generation = self.embedding_system.kb_generation
+        chunks = self.conversation_context.recall(
+            [self._conversation_key(conversation_id), self._question_key(previous_question)], generation
+        )
+        if chunks is None:
+            logger.info("Follow-up without remembered context; searching for the previous question")
+            chunks, stats = self._retrieve_chunks(previous_question, top_k=5)
+            stats["follow_up"] = {"reused_previous_turn": False, "query": previous_question}
+        else:
+            try:
+                neighbours = self.embedding_system.get_neighbour_chunks(chunks)
+            except Exception as e:
+                logger.error(f"Error fetching neighbouring chunks: {e}")
+                neighbours = []
+            stats = {"follow_up": {"reused_previous_turn": True, "extended_with": len(neighbours)}}
+            chunks = chunks + neighbours
+            logger.info(f"Follow-up reused {len(chunks) - len(neighbours)} chunks from the previous turn "
+                        f"(+{len(neighbours)} neighbouring chunks)")
+        
+        # Later follow-ups in the same conversation build on this context
+        self.conversation_context.remember([self._conversation_key(conversation_id)], generation, chunks)
+        return chunks, stats
+    
+    @staticmethod
+    def _history_hash(chat_history: List[Dict] = None, turns: int = 6) -> str:
+        """Stable hash of the most recent chat turns."""
+        recent = (chat_history or [])[-turns:]
+        return hashlib.sha256(json.dumps(recent, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+    
+    def _answer_settings(self, user_name: str = None, chat_history: List[Dict] = None) -> Dict[str, Any]:
+        """
+        Everything besides the question that shapes an answer: knowledge base
+        generation, answering model and retrieval/prompt settings, user and
+        recent history. Shared by the exact and semantic cache keys.
+        """
+        return {
+            "kb_generation": self.embedding_system.kb_generation,
+            "collection": self.embedding_system.collection_name,
+            "search_mode": self.embedding_system.default_search_mode,
+            "model": self.llm_provider.answer_identity('azure'),
+            "prompt_template": self.prompt_template.template_id,
+            "context_token_budget": self.context_token_budget,
+            "rerank": self.reranker.model_name if self.reranker else None,
+            "rerank_candidates": self.rerank_candidates if self.reranker else None,
+            "mmr_lambda": self.mmr_lambda,
+            "max_chunks_per_source": self.max_chunks_per_source,
+            "user_name": user_name,
+            "history": self._history_hash(chat_history),
+        }
+    
+    def _answer_scope(self, user_name: str = None, chat_history: List[Dict] = None) -> str:
+        """Semantic cache scope: cached answers are only reused within the same settings."""
+        settings = self._answer_settings(user_name, chat_history)
+        return hashlib.sha256(json.dumps(settings, sort_keys=True).encode("utf-8")).hexdigest()[:24]
+    
+    def _semantic_cache_lookup(self, question: str, scope: str) -> Optional[Dict[str, Any]]:
+        if not self.semantic_cache:
+            return None
+        try:
+            hit = self.semantic_cache.lookup(self.embedding_system.embed_query(question), scope)
+        except Exception as e:
+            logger.error(f"Semantic cache lookup failed: {e}")
+            return None
+        if not hit:
+            return None
+        payload, similarity = hit
+        logger.info(f"Semantic cache hit (similarity {similarity:.3f})")
+        return dict(payload, success=True, cache={"type": "semantic", "similarity": similarity})
+    
+    def _semantic_cache_store(self, question: str, scope: str, result: Dict[str, Any]):
+        if not self.semantic_cache:
+            return
+        try:
+            payload = {key: result[key] for key in ("response", "relevant_chunks", "chunks_used", "context_used")}
+            self.semantic_cache.store(self.embedding_system.embed_query(question), scope, payload)
+        except Exception as e:
+            logger.error(f"Semantic cache store failed: {e}")
+    
     def extract_user_name(self, question: str) -> str:
         """Extract user name from the question if present."""
         import re
@@ -946,10 +2002,15 @@ I've found relevant information from {len(relevant_chunks)} medical sources that
     
     def _create_comprehensive_prompt(self, question: str, context: str, user_name: str = None, chat_history: List[Dict] = None) -> str:
         """Create a comprehensive prompt for Azure OpenAI with user personalization and context awareness."""
-        
-        # Personalize the prompt if user name is available
-        personalization = f"Hello {user_name}! " if user_name else ""
-        
+        return self._render_comprehensive_prompt(question, context, user_name, chat_history)[0]
+    
+    def _render_comprehensive_prompt(self, question: str, context: str, user_name: str = None,
+                                     chat_history: List[Dict] = None) -> Tuple[str, Dict[str, Any]]:
+        """
+        Fill the comprehensive prompt template (static instructions first, then
+        context, chat history, question and user name). Returns the prompt and
+        its per-section token breakdown.
+        """
         # Analyze if this is a medical query that needs medical help sections
         is_medical_query = self._is_healthcare_query(question, chat_history)
         
@@ -960,7 +2021,7 @@ I've found relevant information from {len(relevant_chunks)} medical sources that
         if chat_history and len(chat_history) > 0:
             # Get the last few messages for context
             recent_messages = chat_history[-3:]  # Last 3 messages
-            chat_context = "\n\n**CHAT HISTORY CONTEXT:**\n"
+            chat_context = "**CHAT HISTORY CONTEXT:**\n"
             
             # Find the last medical question to combine with follow-up
             last_medical_question = ""
@@ -995,185 +2056,16 @@ I've found relevant information from {len(relevant_chunks)} medical sources that
                 chat_context += f"{i}. {role}: {content}\n"
         
         # Determine which sections to include based on query type and detail level
-        if is_medical_query:
-            # Check if this is a "explain in detail" request
-            is_detail_request = any(pattern in question.lower() for pattern in ['explain in detail', 'explain further', 'tell me more', 'please explain'])
-            
-            if is_detail_request:
-                # Provide extremely detailed and comprehensive response
-                sections = """
-1. **Definition and Overview** - Comprehensive explanation with multiple perspectives, historical context, and fundamental principles
-2. **Detailed Classification and Taxonomy** - Complete breakdown of categories, subtypes, and classification systems
-3. **Causes and Risk Factors** - Extensive analysis of contributing factors, epidemiology, environmental influences, and genetic predispositions
-4. **Symptoms and Clinical Presentation** - Comprehensive symptom description with severity levels, progression patterns, and atypical presentations
-5. **Diagnosis and Testing** - Complete diagnostic methods, procedures, laboratory tests, imaging studies, and what to expect at each step
-6. **Treatment Options** - Exhaustive treatment approaches, medications, therapies, surgical procedures, alternative treatments, and emerging therapies
-7. **Prevention and Management** - Comprehensive preventive measures, lifestyle changes, ongoing care, monitoring protocols, and long-term strategies
-8. **Prognosis and Outlook** - Detailed expected outcomes, recovery timelines, long-term considerations, and quality of life implications
-9. **Research and Latest Developments** - Current research findings, clinical trials, breakthrough discoveries, and future directions
-10. **Additional Resources** - Extensive list of information sources, support groups, specialists, educational materials, and community resources
-11. **When to Seek Medical Help** - Comprehensive red flags, emergency symptoms, urgency indicators, and escalation protocols
-12. **Patient Education and Self-Care** - Detailed self-care tips, monitoring strategies, follow-up recommendations, and empowerment strategies
-13. **Case Studies and Examples** - Real-world examples, case scenarios, and practical applications
-14. **Common Misconceptions** - Addressing myths, clarifying misunderstandings, and providing evidence-based corrections
-15. **Global and Public Health Perspectives** - Worldwide impact, public health implications, and global health considerations"""
-            else:
-                # Standard detailed response
-                sections = """
-1. **Definition and Overview** - Clear explanation of the medical concept with layman's terms
-2. **Causes and Risk Factors** - Detailed analysis of contributing factors and epidemiology
-3. **Symptoms and Clinical Presentation** - Comprehensive symptom description with severity levels
-4. **Diagnosis and Testing** - Available diagnostic methods, procedures, and what to expect
-5. **Treatment Options** - Current treatment approaches, medications, therapies, and alternatives
-6. **Prevention and Management** - Preventive measures, lifestyle changes, and ongoing care
-7. **Prognosis and Outlook** - Expected outcomes, recovery time, and long-term considerations
-8. **Additional Resources** - Where to find more information, support groups, and specialists
-9. **When to Seek Medical Help** - Red flags, emergency symptoms, and urgency indicators
-10. **Patient Education** - Self-care tips, monitoring, and follow-up recommendations"""
-        else:
+        if not is_medical_query:
             # For non-medical or follow-up queries, use a more flexible structure
-            sections = """
-1. **Direct Answer** - Provide a comprehensive, detailed response to the user's question
-2. **Context Integration** - Connect this response with previous conversation context
-3. **Detailed Explanation** - Break down complex concepts with examples and clarifications
-4. **Practical Applications** - Show real-world relevance and usage
-5. **Additional Insights** - Provide extra information that might be helpful
-6. **Follow-up Suggestions** - Suggest related questions or areas to explore"""
-        
-        # Enhanced response requirements for detail requests
-        detail_requirements = ""
-        if is_medical_query and any(pattern in question.lower() for pattern in ['explain in detail', 'explain further', 'tell me more', 'please explain']):
-            detail_requirements = """
-**EXTREME DETAIL REQUIREMENTS (for "explain in detail" requests):**
-- Provide the MOST comprehensive response possible
-- Use detailed PARAGRAPHS, not bullet points or summaries
-- Include extensive examples, case studies, and real-world applications
-- Break down every concept into multiple detailed explanations
-- Use detailed tables, lists, and structured information where appropriate
-- Include historical context and evolution of knowledge
-- Provide multiple perspectives and approaches
-- Include technical details while maintaining accessibility
-- Use extensive markdown formatting for optimal structure
-- Provide actionable insights and practical recommendations
-- Include cross-references to related topics and concepts
-- Address edge cases and exceptions
-- Provide step-by-step explanations for complex processes
-- Include statistical data and research findings when relevant
-- Use analogies and metaphors to enhance understanding
-- Provide both beginner and advanced level information
-- Include troubleshooting guides and common problems
-- Provide comprehensive resource lists and references
-- Write in a conversational, educational tone that feels like talking to a knowledgeable healthcare professional"""
-        
-        return f"""{personalization}You are a medical AI specialist. Use the following medical context to provide a comprehensive, well-structured response to the user's question.
-
-**USER QUESTION:** {combined_question}
-
-**MEDICAL CONTEXT (RAG System):**
-{context}{chat_context}
-
-**CRITICAL INSTRUCTION - READ CAREFULLY:**
-You MUST write detailed, comprehensive PARAGRAPHS for each section. DO NOT use bullet points for explanations. DO NOT write one-line summaries. Each section must contain 3-5 substantial paragraphs that thoroughly explain the concepts.
-
-**EXAMPLE OF WHAT TO DO:**
-❌ WRONG (DO NOT DO THIS):
-```
-1. **Definition**: Microbiology is the study of microorganisms
-2. **Importance**: It's important for healthcare
-```
-
-✅ CORRECT (DO THIS):
-```
-1. **Definition and Overview**
-
-Microbiology represents one of the most fundamental and fascinating branches of biological science, dedicated to the comprehensive study of microorganisms - those incredibly diverse, often invisible life forms that exist all around us and within us. These microscopic organisms include bacteria, viruses, fungi, protozoa, and algae, each representing distinct domains of life with unique characteristics and behaviors.
-
-The field of microbiology encompasses not just the identification and classification of these organisms, but also delves deep into understanding their structure, function, metabolism, genetics, and ecological roles. What makes microbiology particularly fascinating is that these tiny organisms, despite their microscopic size, have an enormous impact on virtually every aspect of life on Earth, from human health and disease to environmental processes and industrial applications.
-
-Historically, microbiology emerged as a formal scientific discipline in the late 19th century, largely through the pioneering work of scientists like Louis Pasteur and Robert Koch, who established the germ theory of disease. This revolutionary concept fundamentally changed our understanding of health and illness, leading to the development of vaccines, antibiotics, and modern sanitation practices that have saved countless lives over the past century and continue to do so today.
-
-2. **Importance and Significance**
-
-The importance of microbiology extends far beyond the laboratory and research institutions - it touches every aspect of human life and the natural world around us. From the moment we wake up in the morning until we go to sleep at night, we interact with microorganisms in countless ways, often without even realizing it. Understanding these interactions is crucial for maintaining our health, advancing medical science, and preserving the environment we depend on.
-
-In the realm of human health, microbiology serves as the foundation for modern medicine and disease prevention. Every infectious disease that has ever affected humanity - from the common cold to devastating pandemics like COVID-19 - involves microorganisms as the causative agents. By studying these pathogens, microbiologists can identify their weaknesses, develop targeted treatments, and create vaccines that prevent illness before it even begins. This knowledge has saved millions of lives and continues to protect populations worldwide from both common and emerging infectious threats.
-
-Beyond infectious diseases, microbiology has revolutionized our understanding of the human body itself through the study of the microbiome. The trillions of microorganisms that live in and on our bodies form complex ecosystems that influence everything from digestion and nutrient absorption to immune system function and even mental health. Research into the microbiome has revealed that these microbial communities are not just passive inhabitants but active participants in our biological processes, opening new avenues for treating conditions ranging from inflammatory bowel disease to depression and anxiety.
-```
-
-**SECTION-BY-SECTION REQUIREMENTS:**
-For EVERY section in your response, you MUST follow this exact format:
-
-1. **Section Title** (e.g., "Definition and Overview", "Importance and Significance", "Classification and Taxonomy")
-
-2. **First Paragraph**: Introduce the main concept with broad context and fundamental principles
-
-3. **Second Paragraph**: Provide detailed explanations, examples, and deeper insights
-
-4. **Third Paragraph**: Include practical applications, real-world implications, and additional context
-
-5. **Fourth Paragraph (if needed)**: Add historical perspective, current research, or future implications
-
-**DO NOT USE BULLET POINTS FOR EXPLANATIONS. ONLY USE BULLET POINTS FOR LISTS OF ITEMS (e.g., types of bacteria, symptoms, medications).**
-
-**INSTRUCTIONS:**
-Create a MASSIVE, extremely detailed, and well-structured response that covers:
-
-{sections}
-
-**RESPONSE REQUIREMENTS:**
-- Use the provided medical context as your foundation and expand SIGNIFICANTLY
-- If this is a follow-up question, reference the previous conversation context
-- Include relevant medical terminology with clear explanations
-- Provide actionable insights and evidence-based recommendations
-- Cite the sources appropriately and mention their reliability
-- Structure the response with clear headings, subheadings, and detailed paragraphs
-- Make the response comprehensive, educational, and easy to understand
-- Include practical examples and real-world applications
-- Address common misconceptions and concerns
-- Provide both immediate and long-term perspectives
-- Format using markdown for optimal readability
-{detail_requirements}
-
-**FORMATTING RULES - YOU MUST FOLLOW THESE:**
-1. **EACH SECTION MUST HAVE 3-5 DETAILED PARAGRAPHS** - No exceptions
-2. **USE BULLET POINTS ONLY FOR LISTS** (e.g., types of bacteria, symptoms, medications)
-3. **WRITE COMPREHENSIVE EXPLANATIONS** in flowing paragraphs
-4. **INCLUDE EXAMPLES, CASE STUDIES, AND REAL-WORLD APPLICATIONS**
-5. **USE CONVERSATIONAL, EDUCATIONAL TONE** like a knowledgeable healthcare professional
-6. **AVOID SUMMARY-STYLE RESPONSES** - this is NOT a summarizer
-7. **PROVIDE SUBSTANTIAL, HELPFUL INFORMATION** in every section
-
-**CONTEXT AWARENESS:**
-- If this is a follow-up question, build upon the previous conversation
-- Maintain conversation continuity and reference earlier points
-- If the user asks for "more detail" or "explain further", expand on the most relevant aspects
-- Ensure the response directly addresses what the user is asking for
-- Combine the follow-up request with the original medical question context
-
-**PERSONALIZATION:**
-- If the user provided their name, address them personally
-- Make the response feel conversational and caring
-- Consider the user's level of medical knowledge
-- Provide encouragement and positive reinforcement
-
-**FINAL REMINDER:**
-This is a DETAILED HEALTHCARE CHATBOT, not a summarizer. Write comprehensive, educational explanations with substantial paragraphs. Each section should feel like a knowledgeable healthcare professional explaining a complex topic to a patient who wants to understand it thoroughly.
-
-**CRITICAL ENFORCEMENT:**
-- **EVERY SINGLE SECTION** must have 3-5 detailed paragraphs
-- **NO EXCEPTIONS** - this applies to ALL sections (Definition, Importance, Classification, Applications, Research, etc.)
-- **DO NOT** write bullet points for explanations
-- **DO NOT** write one-line summaries
-- **DO NOT** skip the detailed paragraph format for any section
-- **EACH SECTION** must be as detailed as the Definition section example above
-
-**IF YOU FAIL TO FOLLOW THIS FORMAT:**
-- The response will be rejected and regenerated
-- You must write detailed paragraphs for EVERY section
-- This is not optional - it's a strict requirement
-
-Ensure the response is EXTREMELY comprehensive, accurate, and provides immense value to the user while maintaining a warm, professional tone. For "explain in detail" requests, make this the most thorough and detailed response possible with substantial paragraphs, not summaries."""
+            kind = "general"
+        elif any(pattern in question.lower() for pattern in ['explain in detail', 'explain further', 'tell me more', 'please explain']):
+            # Provide extremely detailed and comprehensive response
+            kind = "detail"
+        else:
+            kind = "standard"
+        
+        return self.prompt_template.render(kind, context, combined_question, chat_context, user_name)
 
     def _validate_follow_up_context(self, question: str, chat_history: List[Dict] = None) -> Dict[str, Any]:
         """Validate if a follow-up question has proper medical context to work with."""
@@ -0,0 +1,168 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from model_bundle import resolve_model_path, timed_load
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+
+class CrossEncoderReranker:
+    """
+    Second-stage reranker: scores (question, chunk) pairs with a small local
+    cross-encoder and keeps the best ones.
+
+    Scoring runs in batches against a hard per-request time budget: each
+    batch is sized to what the remaining budget fits at the observed
+    per-pair latency, so a batch never starts that would overrun it. If the
+    budget runs out before every candidate is scored, the candidates are
+    returned in their original (first-stage) order. Scores are cached per
+    (question, chunk id) pair, so repeated questions skip the model.
+    """
+
+    def __init__(self,
+                 model_name: Optional[str] = None,
+                 batch_size: int = 16,
+                 time_budget_ms: Optional[float] = None,
+                 cache_size: int = 20000):
+        self.model_name = model_name or os.getenv('MEDBOT_RERANK_MODEL', DEFAULT_RERANK_MODEL)
+        self.batch_size = batch_size
+        self.time_budget_ms = time_budget_ms if time_budget_ms is not None else float(
+            os.getenv('MEDBOT_RERANK_BUDGET_MS', '200'))
+        self.cache_size = cache_size
+        self.model = None
+        # Moving average of the scoring time per (question, chunk) pair; None until measured
+        self._pair_ms: Optional[float] = None
+        self._cache: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_model()
+
+    def _load_model(self):
+        try:
+            from sentence_transformers import CrossEncoder
+
+            model_path = resolve_model_path(self.model_name)
+            self.model = timed_load(self.model_name, lambda: CrossEncoder(model_path, device='cpu'))
+        except ImportError:
+            logger.error("sentence-transformers not available; reranking disabled")
+        except Exception as e:
+            logger.error(f"Error loading reranker model: {e}")
+
+    @property
+    def available(self) -> bool:
+        return self.model is not None
+
+    @staticmethod
+    def _normalize_question(question: str) -> str:
+        return " ".join(question.lower().split())
+
+    def _cached(self, key: Tuple[str, str]) -> Optional[float]:
+        with self._lock:
+            score = self._cache.get(key)
+            if score is not None:
+                self._cache.move_to_end(key)
+            return score
+
+    def _store(self, keys: List[Tuple[str, str]], scores: List[float]):
+        with self._lock:
+            for key, score in zip(keys, scores):
+                self._cache[key] = score
+                self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _fitting_batch_size(self, remaining_ms: float) -> int:
+        """Largest batch (up to batch_size) expected to finish within remaining_ms."""
+        if remaining_ms <= 0:
+            return 0
+        with self._lock:
+            pair_ms = self._pair_ms
+        if not pair_ms:
+            return self.batch_size
+        return min(self.batch_size, int(remaining_ms / pair_ms))
+
+    def _observe_batch(self, pairs: int, elapsed_ms: float):
+        pair_ms = elapsed_ms / pairs
+        with self._lock:
+            self._pair_ms = pair_ms if self._pair_ms is None else 0.8 * self._pair_ms + 0.2 * pair_ms
+
+    def rerank(self, question: str, chunks: List[Dict], top_k: int) -> Tuple[List[Dict], Dict]:
+        """
+        Rerank retrieved chunks for a question and return (top_k chunks, stats).
+        Reranked chunks get a 'rerank_score' key.
+        """
+        stats = {
+            'candidates': len(chunks),
+            'cache_hits': 0,
+            'scored': 0,
+            'reranked': False,
+            'budget_exhausted': False,
+        }
+        if not self.available or len(chunks) <= 1:
+            return chunks[:top_k], stats
+
+        start = time.perf_counter()
+        deadline = start + self.time_budget_ms / 1000
+        question_key = self._normalize_question(question)
+        scores: Dict[str, float] = {}
+        pending = []
+
+        for chunk in chunks:
+            score = self._cached((question_key, chunk['id']))
+            if score is None:
+                pending.append(chunk)
+            else:
+                scores[chunk['id']] = score
+        stats['cache_hits'] = len(scores)
+
+        offset = 0
+        while offset < len(pending):
+            size = self._fitting_batch_size((deadline - time.perf_counter()) * 1000)
+            if size < 1:
+                stats['budget_exhausted'] = True
+                break
+            batch = pending[offset:offset + size]
+            offset += len(batch)
+            batch_start = time.perf_counter()
+            try:
+                batch_scores = self.model.predict(
+                    [(question, chunk.get('content', '')) for chunk in batch],
+                    batch_size=self.batch_size
+                )
+            except Exception as e:
+                logger.error(f"Error reranking chunks: {e}")
+                stats['budget_exhausted'] = True
+                break
+            self._observe_batch(len(batch), (time.perf_counter() - batch_start) * 1000)
+            batch_scores = [float(score) for score in batch_scores]
+            self._store([(question_key, chunk['id']) for chunk in batch], batch_scores)
+            scores.update(zip((chunk['id'] for chunk in batch), batch_scores))
+            stats['scored'] += len(batch)
+
+        stats['rerank_ms'] = (time.perf_counter() - start) * 1000
+        if len(scores) < len(chunks):
+            # Out of budget: scores computed so far are cached for next time,
+            # this request keeps the first-stage order
+            logger.warning(f"Rerank budget of {self.time_budget_ms:.0f}ms exhausted "
+                           f"({len(scores)}/{len(chunks)} scored); using retrieval order")
+            stats['budget_exhausted'] = True
+            return chunks[:top_k], stats
+
+        ranked = sorted(chunks, key=lambda chunk: scores[chunk['id']], reverse=True)[:top_k]
+        stats['reranked'] = True
+        return [dict(chunk, rerank_score=scores[chunk['id']]) for chunk in ranked], stats
+
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
+
+    def cache_info(self) -> Dict:
+        with self._lock:
+            return {"entries": len(self._cache), "max_entries": self.cache_size}
@@ -0,0 +1,244 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# HTTP statuses worth retrying: timeouts, conflicts, rate limits and server errors
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a provider whose circuit breaker is open."""
+
+
+class ProviderHTTPError(RuntimeError):
+    """Non-2xx response from a provider called without an SDK (e.g. HuggingFace)."""
+
+    def __init__(self, provider: str, status_code: int, headers: Optional[Dict[str, str]] = None):
+        super().__init__(f"{provider} returned HTTP {status_code}")
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    if status is None and isinstance(getattr(error, "code", None), int):
+        status = error.code  # google.api_core exceptions
+    return status
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Transient failures: retryable HTTP statuses, timeouts and connection errors."""
+    if isinstance(error, CircuitOpenError):
+        return False
+    status = _status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    return isinstance(error, (TimeoutError, ConnectionError)) or any(
+        marker in type(error).__name__ for marker in ("Timeout", "Connection", "ServiceUnavailable")
+    )
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """Delay requested by the provider (retry-after-ms / Retry-After headers), if any."""
+    headers = getattr(error, "headers", None) or getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """
+    Retries with exponential backoff and full jitter. A Retry-After from the
+    provider replaces the computed delay; if it asks for longer than
+    max_retry_after the call fails immediately rather than holding the request.
+
+    Settings come from MEDBOT_<PROVIDER>_MAX_RETRIES etc., falling back to
+    MEDBOT_LLM_MAX_RETRIES, MEDBOT_LLM_RETRY_BASE_DELAY, MEDBOT_LLM_RETRY_MAX_DELAY
+    and MEDBOT_LLM_MAX_RETRY_AFTER.
+    """
+
+    def __init__(self, max_retries: int = 2, base_delay: float = 0.5, max_delay: float = 8.0,
+                 max_retry_after: float = 20.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+
+    @classmethod
+    def from_env(cls, provider: str) -> "RetryPolicy":
+        def setting(name: str, default: str) -> str:
+            return os.getenv(f"MEDBOT_{provider.upper()}_{name}", os.getenv(f"MEDBOT_LLM_{name}", default))
+        return cls(
+            max_retries=int(setting("MAX_RETRIES", "2")),
+            base_delay=float(setting("RETRY_BASE_DELAY", "0.5")),
+            max_delay=float(setting("RETRY_MAX_DELAY", "8")),
+            max_retry_after=float(setting("MAX_RETRY_AFTER", "20")),
+        )
+
+    def next_delay(self, attempt: int, error: BaseException) -> Optional[float]:
+        """Seconds to wait before retry number attempt + 1, or None to give up."""
+        if attempt >= self.max_retries or not is_retryable(error):
+            return None
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_retry_after else None
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def describe(self) -> Dict[str, Any]:
+        return {"max_retries": self.max_retries, "base_delay": self.base_delay,
+                "max_delay": self.max_delay, "max_retry_after": self.max_retry_after}
+
+
+class CircuitBreaker:
+    """
+    Per-provider circuit breaker. After failure_threshold consecutive
+    transient failures the circuit opens and calls fail fast with
+    CircuitOpenError; after reset_seconds one probe call is let through
+    (half-open). A successful probe closes the circuit, a failed one
+    re-opens it.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self.stats = {"failures": 0, "successes": 0, "rejected": 0, "opened": 0}
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "open" and time.time() - self.opened_at >= self.reset_seconds:
+                self.state = "half_open"
+                self._probe_in_flight = False
+            if self.state == "closed":
+                return True
+            if self.state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.stats["rejected"] += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.stats["successes"] += 1
+            self.consecutive_failures = 0
+            if self.state != "closed":
+                logger.info(f"Circuit for {self.name} closed")
+            self.state = "closed"
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.stats["failures"] += 1
+            self.consecutive_failures += 1
+            if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.stats["opened"] += 1
+                    logger.warning(f"Circuit for {self.name} opened after {self.consecutive_failures} failures")
+                self.state = "open"
+                self.opened_at = time.time()
+                self._probe_in_flight = False
+
+    def release(self):
+        """End a call that neither succeeded nor failed transiently (e.g. HTTP 400)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def get_status(self) -> Dict[str, Any]:
+        with self._lock:
+            status = {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "reset_seconds": self.reset_seconds,
+                **self.stats,
+            }
+            if self.state == "open":
+                status["retry_in_seconds"] = round(max(0.0, self.reset_seconds - (time.time() - self.opened_at)), 1)
+            return status
+
+
+def _before_call(breaker: CircuitBreaker):
+    if not breaker.allow():
+        raise CircuitOpenError(f"Circuit for {breaker.name} is open; skipping the call")
+
+
+def _after_failure(breaker: CircuitBreaker, policy: RetryPolicy, attempt: int, error: BaseException) -> Optional[float]:
+    if is_retryable(error):
+        breaker.record_failure()
+    else:
+        breaker.release()
+    delay = policy.next_delay(attempt, error)
+    if delay is not None:
+        logger.warning(f"{breaker.name} call failed ({error}); retry {attempt + 1}/{policy.max_retries} in {delay:.2f}s")
+    return delay
+
+
+def call_with_retry(fn: Callable[[], Any], policy: RetryPolicy, breaker: CircuitBreaker) -> Any:
+    """Call fn under breaker, retrying transient failures according to policy."""
+    attempt = 0
+    while True:
+        _before_call(breaker)
+        try:
+            result = fn()
+        except BaseException as e:
+            if not isinstance(e, Exception):
+                # Cancelled (e.g. the losing side of a hedged request)
+                breaker.release()
+                raise
+            delay = _after_failure(breaker, policy, attempt, e)
+            if delay is None:
+                raise
+            time.sleep(delay)
+            attempt += 1
+            continue
+        breaker.record_success()
+        return result
+
+
+async def acall_with_retry(fn: Callable[[], Awaitable[Any]], policy: RetryPolicy, breaker: CircuitBreaker) -> Any:
+    """Async version of call_with_retry (fn returns a fresh awaitable per attempt)."""
+    attempt = 0
+    while True:
+        _before_call(breaker)
+        try:
+            result = await fn()
+        except BaseException as e:
+            if not isinstance(e, Exception):
+                # Cancelled (e.g. the losing side of a hedged request)
+                breaker.release()
+                raise
+            delay = _after_failure(breaker, policy, attempt, e)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+            attempt += 1
+            continue
+        breaker.record_success()
+        return result
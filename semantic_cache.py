@@ -0,0 +1,197 @@
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class SemanticAnswerCache:
+    """
+    Cache of final answers keyed by question embedding.
+
+    A lookup hits when a stored question within the same scope (knowledge
+    base generation + prompt settings) has cosine similarity at or above
+    the threshold. Entries expire after a TTL and the least recently used
+    ones are evicted above max_entries. The cache is persisted to disk so
+    it survives restarts, including each entry's last use: changes are
+    written at most every save_interval seconds (0 = on every change),
+    outside the lock so lookups never wait on disk, and flush() writes
+    pending changes on shutdown.
+    """
+
+    def __init__(self,
+                 directory: str,
+                 threshold: float = 0.97,
+                 ttl_seconds: float = 24 * 3600,
+                 max_entries: int = 5000,
+                 save_interval: float = 30.0):
+        self.directory = Path(directory)
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.save_interval = save_interval
+        self._lock = threading.Lock()
+        # Serialises writers; never held together with self._lock while writing
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        self.vectors: Optional[np.ndarray] = None
+        # One entry per row of vectors: scope, created, last_used, payload
+        self.entries: List[Dict[str, Any]] = []
+        self.stats = {"lookups": 0, "hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expired": 0}
+        self._load()
+
+    @property
+    def _vectors_path(self) -> Path:
+        return self.directory / "vectors.npy"
+
+    @property
+    def _entries_path(self) -> Path:
+        return self.directory / "entries.json"
+
+    def _load(self):
+        if not self._entries_path.exists():
+            return
+        try:
+            entries = json.loads(self._entries_path.read_text(encoding="utf-8"))
+            vectors = np.load(self._vectors_path)
+            if len(entries) != len(vectors):
+                raise ValueError("entries and vectors are out of sync")
+            self.entries, self.vectors = entries, vectors
+            logger.info(f"Loaded semantic answer cache with {len(self.entries)} entries")
+        except Exception as e:
+            logger.error(f"Error loading semantic answer cache, starting empty: {e}")
+            self.entries, self.vectors = [], None
+
+    def _save(self, force: bool = False):
+        """
+        Write the cache atomically (temp files, then rename) if it changed and
+        save_interval has passed. Called without self._lock held: the state is
+        snapshotted under the lock and written after releasing it.
+        """
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty or (not force and time.monotonic() - self._saved_at < self.save_interval):
+                    return
+                # vectors is replaced, never modified in place; entries are copied
+                # because lookups update last_used
+                vectors = self.vectors if self.vectors is not None else np.zeros((0, 0), dtype=np.float32)
+                entries = [dict(entry) for entry in self.entries]
+                self._dirty = False
+                self._saved_at = time.monotonic()
+            try:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                with open(self.directory / "vectors.tmp.npy", "wb") as f:
+                    np.save(f, vectors)
+                tmp_entries = self.directory / "entries.tmp.json"
+                tmp_entries.write_text(json.dumps(entries, default=float), encoding="utf-8")
+                os.replace(self.directory / "vectors.tmp.npy", self._vectors_path)
+                os.replace(tmp_entries, self._entries_path)
+            except Exception as e:
+                logger.error(f"Error saving semantic answer cache: {e}")
+                with self._lock:
+                    self._dirty = True
+
+    def flush(self):
+        """Write pending changes now (call on shutdown)."""
+        self._save(force=True)
+
+    @staticmethod
+    def _normalize(vector: np.ndarray) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def _keep(self, mask: np.ndarray):
+        rows = np.flatnonzero(mask)
+        self.entries = [self.entries[i] for i in rows]
+        self.vectors = self.vectors[rows] if len(rows) else None
+
+    def _purge_expired(self, now: float) -> bool:
+        if not self.entries:
+            return False
+        alive = np.array([now - entry["created"] < self.ttl_seconds for entry in self.entries])
+        if alive.all():
+            return False
+        self.stats["expired"] += int((~alive).sum())
+        self._keep(alive)
+        return True
+
+    def lookup(self, vector: np.ndarray, scope: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        """Return (payload, similarity) of the closest cached question in scope, or None."""
+        query = self._normalize(vector)
+        now = time.time()
+        with self._lock:
+            result = self._lookup(query, scope, now)
+        self._save()
+        return result
+
+    def _lookup(self, query: np.ndarray, scope: str, now: float) -> Optional[Tuple[Dict[str, Any], float]]:
+        # Caller holds self._lock
+        self.stats["lookups"] += 1
+        if self._purge_expired(now):
+            self._dirty = True
+        if self.vectors is None or self.vectors.shape[1] != query.shape[0]:
+            self.stats["misses"] += 1
+            return None
+
+        similarities = self.vectors @ query
+        in_scope = np.array([entry["scope"] == scope for entry in self.entries])
+        similarities[~in_scope] = -1.0
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.threshold:
+            self.stats["misses"] += 1
+            return None
+
+        self.stats["hits"] += 1
+        self.entries[best]["last_used"] = now
+        self._dirty = True
+        return self.entries[best]["payload"], float(similarities[best])
+
+    def store(self, vector: np.ndarray, scope: str, payload: Dict[str, Any]):
+        """Cache an answer payload (must be JSON-serialisable)."""
+        row = self._normalize(vector)[None, :]
+        now = time.time()
+        with self._lock:
+            if self.vectors is not None and self.vectors.shape[1] != row.shape[1]:
+                # Embedding dimension changed (new model or projection)
+                self.entries, self.vectors = [], None
+            self.entries.append({"scope": scope, "created": now, "last_used": now, "payload": payload})
+            self.vectors = row if self.vectors is None else np.vstack([self.vectors, row])
+            self.stats["stores"] += 1
+
+            self._purge_expired(now)
+            overflow = len(self.entries) - self.max_entries
+            if overflow > 0:
+                last_used = np.array([entry["last_used"] for entry in self.entries])
+                mask = np.ones(len(self.entries), dtype=bool)
+                mask[np.argsort(last_used)[:overflow]] = False
+                self._keep(mask)
+                self.stats["evictions"] += overflow
+            self._dirty = True
+        self._save()
+
+    def clear(self):
+        with self._lock:
+            self.entries, self.vectors = [], None
+            self._dirty = True
+        self._save(force=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.stats["lookups"]
+            return {
+                **self.stats,
+                "entries": len(self.entries),
+                "hit_rate": self.stats["hits"] / lookups if lookups else 0.0,
+                "threshold": self.threshold,
+                "ttl_seconds": self.ttl_seconds,
+                "max_entries": self.max_entries,
+            }
@@ -0,0 +1,143 @@
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, List, Set
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class SourceCentroids:
+    """
+    Mean embedding of every source document, for two-stage routed search:
+    score the query against the centroids first, then search only the
+    chunks of the best matching sources.
+
+    Centroids are accumulated as running sums during ingestion, so adding
+    a book never requires re-reading the rest of the library. The ids of
+    the counted chunks are kept so re-ingesting a chunk does not count it
+    twice.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.sources: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self.sums = None
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.ids: List[str] = []
+        self._id_set: Set[str] = set()
+        self._centroids = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self.sources)
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        if not self.path.exists():
+            return
+        try:
+            with np.load(self.path) as arrays:
+                if "ids" not in arrays:
+                    # Written before chunk ids were tracked; rebuilt from the collection
+                    logger.info("Source centroids have no chunk ids, they will be rebuilt")
+                    self.clear(remove_file=False)
+                    return
+                self.sums = arrays["sums"]
+                self.counts = arrays["counts"]
+                self.sources = json.loads(str(arrays["sources"]))
+                self.ids = json.loads(str(arrays["ids"]))
+            self._id_set = set(self.ids)
+            self._rows = {source: row for row, source in enumerate(self.sources)}
+            logger.info(f"Loaded centroids for {len(self.sources)} sources")
+        except Exception as e:
+            logger.error(f"Error loading source centroids: {e}")
+            self.clear(remove_file=False)
+
+    def add(self, ids: List[str], sources: List[str], vectors: np.ndarray):
+        """Accumulate chunk vectors into their sources' centroids (ids already counted are skipped)."""
+        self._ensure_loaded()
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self._lock:
+            keep = []
+            for row, chunk_id in enumerate(ids):
+                if chunk_id not in self._id_set:
+                    self._id_set.add(chunk_id)
+                    keep.append(row)
+            if len(keep) < len(ids):
+                logger.info(f"Source centroids: skipped {len(ids) - len(keep)} already counted ids")
+            if not keep:
+                return
+            self.ids.extend(ids[row] for row in keep)
+            sources = [sources[row] for row in keep]
+            vectors = vectors[keep]
+            for source in sources:
+                if source not in self._rows:
+                    self._rows[source] = len(self.sources)
+                    self.sources.append(source)
+            rows = np.array([self._rows[source] for source in sources], dtype=np.int64)
+            if self.sums is None:
+                self.sums = np.zeros((0, vectors.shape[1]), dtype=np.float64)
+            grow = len(self.sources) - len(self.sums)
+            if grow > 0:
+                self.sums = np.vstack([self.sums, np.zeros((grow, self.sums.shape[1]))])
+                self.counts = np.concatenate([self.counts, np.zeros(grow, dtype=np.int64)])
+            np.add.at(self.sums, rows, vectors)
+            np.add.at(self.counts, rows, 1)
+            self._centroids = None
+
+    def save(self):
+        self._ensure_loaded()
+        if self.sums is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            np.savez(self.path, sums=self.sums, counts=self.counts, sources=json.dumps(self.sources),
+                     ids=json.dumps(self.ids))
+
+    def clear(self, remove_file: bool = True):
+        with self._lock:
+            self.sources, self._rows = [], {}
+            self.sums, self.counts, self._centroids = None, np.zeros(0, dtype=np.int64), None
+            self.ids, self._id_set = [], set()
+            self._loaded = True
+        if remove_file:
+            self.path.unlink(missing_ok=True)
+
+    def rebuild_from_collection(self, collection, page_size: int = 5000):
+        """Recompute centroids from the vectors and metadata stored in ChromaDB."""
+        self.clear()
+        total = collection.count()
+        for offset in range(0, total, page_size):
+            page = collection.get(include=["embeddings", "metadatas"], limit=page_size, offset=offset)
+            if page["ids"]:
+                self.add(page["ids"], [meta.get("source", "") for meta in page["metadatas"]], np.asarray(page["embeddings"]))
+        self.save()
+
+    @property
+    def centroids(self) -> np.ndarray:
+        """Unit-length centroid per source (rows follow self.sources)."""
+        self._ensure_loaded()
+        with self._lock:
+            if self._centroids is None and self.sums is not None:
+                means = self.sums / np.maximum(self.counts, 1)[:, None]
+                self._centroids = (means / np.maximum(np.linalg.norm(means, axis=1, keepdims=True), 1e-12)).astype(np.float32)
+            return self._centroids
+
+    def route(self, query_vector: np.ndarray, top_m: int) -> List[str]:
+        """Sources whose centroids are most similar to the query."""
+        centroids = self.centroids
+        if centroids is None or not len(centroids):
+            return []
+        scores = centroids @ np.asarray(query_vector, dtype=np.float32)
+        best = np.argsort(-scores)[:top_m]
+        return [self.sources[i] for i in best]
@@ -4,6 +4,8 @@ Test script for the Azure + Groq pipeline workflow.
 This tests the new system where Azure enriches prompts and Groq generates final responses.
 """
 
+import os
+
 from rag_system import RAGSystem
 
 def test_azure_groq_pipeline():
@@ -81,4 +83,8 @@ def test_azure_groq_pipeline():
         return False
 
 if __name__ == "__main__":
+    if os.getenv("MEDBOT_MOCK_LLM"):
+        # Run offline against the bundled mock LLM server instead of live keys
+        from mock_llm_server import use_mock_llm
+        use_mock_llm()
     test_azure_groq_pipeline()
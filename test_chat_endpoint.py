@@ -3,12 +3,12 @@
 Test script to directly test the chat endpoint
 """
 
+import os
 import requests
 import json
 
-def test_chat_endpoint():
-    """Test the chat endpoint directly"""
-    url = "http://localhost:8000/chat"
+def test_chat_endpoint(client=requests, url="http://localhost:8000/chat"):
+    """Test the chat endpoint directly (client: requests or a FastAPI TestClient)"""
     
     # Test payload
     payload = {
@@ -23,7 +23,7 @@ def test_chat_endpoint():
     
     try:
         # Make the request
-        response = requests.post(url, json=payload, timeout=30)
+        response = client.post(url, json=payload, timeout=30)
         
         print(f"📊 Status Code: {response.status_code}")
         print(f"📋 Response Headers: {dict(response.headers)}")
@@ -64,4 +64,13 @@ def test_chat_endpoint():
         print(f"❌ Unexpected error: {e}")
 
 if __name__ == "__main__":
-    test_chat_endpoint()
+    if os.getenv("MEDBOT_MOCK_LLM"):
+        # Serve the API in-process against the bundled mock LLM server instead of live keys
+        from fastapi.testclient import TestClient
+        from mock_llm_server import use_mock_llm
+        use_mock_llm()
+        from main import app
+        with TestClient(app) as client:
+            test_chat_endpoint(client, "/chat")
+    else:
+        test_chat_endpoint()
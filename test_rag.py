@@ -191,5 +191,9 @@ def main():
         return False
 
 if __name__ == "__main__":
+    if os.getenv("MEDBOT_MOCK_LLM"):
+        # Run offline against the bundled mock LLM server instead of live keys
+        from mock_llm_server import use_mock_llm
+        use_mock_llm()
     success = main()
     sys.exit(0 if success else 1)
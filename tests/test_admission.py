@@ -0,0 +1,149 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from admission import (
+    PRIORITY_BATCH,
+    PRIORITY_INTERACTIVE,
+    AdmissionController,
+    AdmissionRejected,
+    current_request_identity,
+    llm_request_context,
+)
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.005)
+
+
+def queue_in_order(controller, requests):
+    """
+    Queue one call per (user, priority) behind a held slot, in the given
+    order, and return the order in which they were admitted.
+    """
+    admitted, threads = [], []
+
+    def call(user, priority):
+        with llm_request_context(user, priority):
+            with controller.acquire():
+                admitted.append(user)
+
+    for user, priority in requests:
+        thread = threading.Thread(target=call, args=(user, priority))
+        queued = controller.get_status()["queued"]
+        thread.start()
+        threads.append(thread)
+        wait_until(lambda: controller.get_status()["queued"] == queued + 1)
+    return admitted, threads
+
+
+def test_request_context_sets_identity():
+    assert current_request_identity() == ("anonymous", PRIORITY_INTERACTIVE)
+    with llm_request_context("alice", PRIORITY_BATCH):
+        assert current_request_identity() == ("alice", PRIORITY_BATCH)
+    assert current_request_identity() == ("anonymous", PRIORITY_INTERACTIVE)
+
+
+def test_users_are_served_round_robin():
+    controller = AdmissionController(max_concurrency=1, max_queue=10, queue_timeout=5)
+
+    with controller.acquire():
+        admitted, threads = queue_in_order(controller, [
+            ("alice", PRIORITY_INTERACTIVE), ("alice", PRIORITY_INTERACTIVE), ("alice", PRIORITY_INTERACTIVE),
+            ("bob", PRIORITY_INTERACTIVE), ("carol", PRIORITY_INTERACTIVE),
+        ])
+    for thread in threads:
+        thread.join(5)
+
+    assert admitted == ["alice", "bob", "carol", "alice", "alice"]
+
+
+def test_interactive_calls_go_before_batch_calls():
+    controller = AdmissionController(max_concurrency=1, max_queue=10, queue_timeout=5)
+
+    with controller.acquire():
+        admitted, threads = queue_in_order(controller, [
+            ("eval", PRIORITY_BATCH), ("eval", PRIORITY_BATCH), ("alice", PRIORITY_INTERACTIVE),
+        ])
+        assert controller.get_status()["queued_by_priority"] == {PRIORITY_INTERACTIVE: 1, PRIORITY_BATCH: 2}
+    for thread in threads:
+        thread.join(5)
+
+    assert admitted == ["alice", "eval", "eval"]
+
+
+def test_full_queue_rejects_immediately():
+    controller = AdmissionController(max_concurrency=1, max_queue=1, queue_timeout=5)
+
+    with controller.acquire():
+        _, threads = queue_in_order(controller, [("alice", PRIORITY_INTERACTIVE)])
+        with pytest.raises(AdmissionRejected) as rejected:
+            with controller.acquire():
+                pass
+        assert rejected.value.retry_after > 0
+    for thread in threads:
+        thread.join(5)
+
+    assert controller.get_status()["in_flight"] == 0
+
+
+def test_queue_timeout_rejects_and_dequeues():
+    controller = AdmissionController(max_concurrency=1, max_queue=10, queue_timeout=0.05)
+
+    with controller.acquire():
+        with pytest.raises(AdmissionRejected, match="Waited more than"):
+            with controller.acquire():
+                pass
+        assert controller.get_status()["queued"] == 0
+
+    with controller.acquire():
+        assert controller.get_status()["in_flight"] == 1
+
+
+def test_slot_is_released_when_the_call_fails():
+    controller = AdmissionController(max_concurrency=1)
+
+    with pytest.raises(ValueError):
+        with controller.acquire():
+            raise ValueError("provider error")
+
+    assert controller.get_status()["in_flight"] == 0
+
+
+def test_async_acquire_caps_concurrency():
+    controller = AdmissionController(max_concurrency=2, max_queue=10, queue_timeout=5)
+    running, peak = [0], [0]
+
+    async def call():
+        async with controller.aacquire():
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+            await asyncio.sleep(0.02)
+            running[0] -= 1
+
+    async def run():
+        await asyncio.gather(*[call() for _ in range(6)])
+
+    asyncio.run(run())
+
+    assert peak[0] == 2
+    assert controller.get_status()["in_flight"] == 0
+
+
+def test_token_budget_delays_calls():
+    controller = AdmissionController(max_concurrency=10, tokens_per_minute=600, max_queue=10, queue_timeout=5)
+
+    started = time.monotonic()
+    with controller.acquire(tokens=600):
+        pass
+    # The bucket refills at 10 tokens per second
+    with controller.acquire(tokens=3):
+        waited = time.monotonic() - started
+
+    assert 0.2 <= waited < 2
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from binary_index import BinaryIndex, binarize, hamming_distances
+
+
+@pytest.fixture
+def vectors():
+    return np.random.default_rng(0).normal(size=(50, 64)).astype(np.float32)
+
+
+def make_index(tmp_path, vectors):
+    index = BinaryIndex(str(tmp_path / "binary"))
+    index.add([f"chunk_{i}" for i in range(len(vectors))], vectors)
+    return index
+
+
+def test_hamming_distances_count_differing_bits():
+    codes = binarize(np.array([[1, 1, 1, 1, -1, -1, -1, -1], [1, -1, 1, -1, 1, -1, 1, -1]]))
+    query = binarize(np.array([1, 1, 1, 1, -1, -1, -1, -1]))
+
+    assert hamming_distances(codes, query).tolist() == [0, 4]
+
+
+def test_search_finds_the_query_vector_with_cosine_score(tmp_path, vectors):
+    index = make_index(tmp_path, vectors)
+
+    results = index.search(vectors[7], top_k=3)
+
+    assert len(results) == 3
+    assert results[0][0] == "chunk_7"
+    assert results[0][1] == pytest.approx(1.0, abs=1e-5)
+    scores = [score for _, score in results]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_search_matches_exact_cosine_when_every_row_is_a_candidate(tmp_path, vectors):
+    index = make_index(tmp_path, vectors)
+    query = np.random.default_rng(1).normal(size=64)
+
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = np.argsort(-(normalized @ (query / np.linalg.norm(query))))[:5]
+
+    results = index.search(query, top_k=5, candidates=len(vectors))
+    assert [chunk_id for chunk_id, _ in results] == [f"chunk_{i}" for i in expected]
+
+
+def test_empty_index_returns_nothing(tmp_path):
+    assert BinaryIndex(str(tmp_path / "binary")).search(np.ones(64)) == []
+
+
+def test_re_adding_ids_is_ignored(tmp_path, vectors):
+    index = make_index(tmp_path, vectors[:6])
+    index.add([f"chunk_{i}" for i in range(4, 8)], vectors[4:8])
+
+    assert len(index) == 8
+    ids = [chunk_id for chunk_id, _ in index.search(vectors[5], top_k=8, candidates=8)]
+    assert sorted(ids) == sorted(f"chunk_{i}" for i in range(8))
+
+
+def test_duplicates_within_a_batch_are_indexed_once(tmp_path, vectors):
+    index = BinaryIndex(str(tmp_path / "binary"))
+    index.add(["a", "b", "a"], vectors[:3])
+
+    assert len(index) == 2
+    assert index.search(vectors[0], top_k=1)[0] == ("a", pytest.approx(1.0, abs=1e-5))
+
+
+def test_save_and_reload_keeps_ids_and_deduplication(tmp_path, vectors):
+    make_index(tmp_path, vectors).save()
+
+    reloaded = BinaryIndex(str(tmp_path / "binary"))
+    assert len(reloaded) == len(vectors)
+    assert reloaded.search(vectors[3], top_k=1)[0][0] == "chunk_3"
+
+    reloaded.add(["chunk_3", "new"], vectors[3:5])
+    assert len(reloaded) == len(vectors) + 1
+
+
+def test_clear_removes_files(tmp_path, vectors):
+    index = make_index(tmp_path, vectors)
+    index.save()
+    index.clear()
+
+    assert len(index) == 0
+    assert not (tmp_path / "binary").exists()
@@ -0,0 +1,101 @@
+import math
+
+import pytest
+
+from bm25_index import BM25Index, tokenize
+
+DOCS = {
+    "cardio_0": "Metformin is first-line therapy for type 2 diabetes.",
+    "cardio_1": "Hypertension is treated with ACE inhibitors and lifestyle changes.",
+    "onco_0": "HER2-positive breast cancer responds to trastuzumab.",
+    "onco_1": "Staging of breast cancer guides treatment and prognosis.",
+}
+
+
+def make_index(tmp_path):
+    index = BM25Index(str(tmp_path / "bm25"))
+    index.add(list(DOCS), list(DOCS.values()))
+    return index
+
+
+def test_tokenize_drops_stopwords_and_splits_compounds():
+    assert tokenize("What is HER2-positive cancer?") == ["her2-positive", "her2", "positive", "cancer"]
+
+
+def test_search_ranks_exact_term_matches(tmp_path):
+    index = make_index(tmp_path)
+
+    assert index.search("metformin")[0][0] == "cardio_0"
+    assert index.search("HER2")[0][0] == "onco_0"
+    assert index.search("unrelated zebra") == []
+
+
+def test_scores_follow_bm25(tmp_path):
+    index = BM25Index(str(tmp_path / "bm25"), k1=1.5, b=0.0)
+    index.add(["a", "b"], ["insulin insulin", "aspirin"])
+
+    # b=0 removes length normalisation: idf * tf * (k1 + 1) / (tf + k1)
+    idf = math.log(1 + (2 - 1 + 0.5) / (1 + 0.5))
+    [(chunk_id, score)] = index.search("insulin")
+    assert chunk_id == "a"
+    assert score == pytest.approx(idf * 2 * 2.5 / (2 + 1.5), rel=1e-5)
+
+
+def test_top_k_limits_results_best_first(tmp_path):
+    index = make_index(tmp_path)
+
+    results = index.search("breast cancer treatment", top_k=2)
+
+    assert len(results) == 2
+    assert results[0][1] >= results[1][1]
+    assert {chunk_id for chunk_id, _ in results} <= {"onco_0", "onco_1", "cardio_1"}
+
+
+def test_re_adding_ids_does_not_change_scores(tmp_path):
+    index = make_index(tmp_path)
+    before = index.search("breast cancer")
+
+    index.add(list(DOCS), list(DOCS.values()))
+
+    assert len(index) == len(DOCS)
+    assert index.search("breast cancer") == before
+
+
+def test_duplicates_within_a_batch_are_indexed_once(tmp_path):
+    index = BM25Index(str(tmp_path / "bm25"))
+    index.add(["a", "a", "b"], ["insulin", "insulin", "aspirin"])
+
+    assert len(index) == 2
+    assert [chunk_id for chunk_id, _ in index.search("insulin", top_k=5)] == ["a"]
+
+
+def test_search_sees_documents_added_after_a_search(tmp_path):
+    index = make_index(tmp_path)
+    index.search("metformin")
+
+    index.add(["neuro_0"], ["Migraine is treated with triptans."])
+
+    assert index.search("triptans")[0][0] == "neuro_0"
+
+
+def test_save_and_reload(tmp_path):
+    index = make_index(tmp_path)
+    expected = index.search("breast cancer")
+    index.save()
+
+    reloaded = BM25Index(str(tmp_path / "bm25"))
+    assert len(reloaded) == len(DOCS)
+    assert reloaded.search("breast cancer") == expected
+
+    reloaded.add(["onco_0"], [DOCS["onco_0"]])
+    assert len(reloaded) == len(DOCS)
+
+
+def test_clear_removes_files(tmp_path):
+    index = make_index(tmp_path)
+    index.save()
+    index.clear()
+
+    assert len(index) == 0
+    assert index.search("metformin") == []
+    assert not (tmp_path / "bm25").exists()
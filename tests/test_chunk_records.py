@@ -0,0 +1,101 @@
+import pytest
+
+from chunk_records import CHUNK_TYPE, ChunkStore, as_chunk_store, chunk_position
+
+
+def make_store():
+    store = ChunkStore()
+    store.add("cardiology.pdf", "Hypertension raises stroke risk.")
+    store.add("cardiology.pdf", "ACE inhibitors lower blood pressure.")
+    store.add("oncology.pdf", "Staging guides cancer treatment.")
+    return store
+
+
+def test_add_assigns_per_source_chunk_indices():
+    store = make_store()
+
+    assert len(store) == 3
+    assert store.ids() == ["cardiology.pdf_chunk_0", "cardiology.pdf_chunk_1", "oncology.pdf_chunk_0"]
+    assert store.sources == ["cardiology.pdf", "oncology.pdf"]
+    assert list(store.source_ids) == [0, 0, 1]
+    assert list(store.chunk_sizes) == [len(text) for text in store.contents]
+
+
+def test_explicit_chunk_index_advances_the_source_counter():
+    store = ChunkStore()
+    store.add("a.pdf", "first", chunk_index=5)
+    store.add("a.pdf", "second")
+
+    assert store.ids() == ["a.pdf_chunk_5", "a.pdf_chunk_6"]
+
+
+def test_metadatas_and_ids_respect_the_range():
+    store = make_store()
+
+    metadatas = store.metadatas(1, 10)
+    assert [m["chunk_id"] for m in metadatas] == store.ids(1)
+    assert metadatas[0] == {
+        "source": "cardiology.pdf",
+        "chunk_id": "cardiology.pdf_chunk_1",
+        "chunk_index": 1,
+        "chunk_size": len("ACE inhibitors lower blood pressure."),
+        "type": CHUNK_TYPE,
+    }
+
+
+def test_records_behave_like_the_legacy_dicts():
+    store = make_store()
+    record = store[-1]
+
+    assert record["source"] == "oncology.pdf"
+    assert record.get("content") == "Staging guides cancer treatment."
+    assert record.get("missing", "default") == "default"
+    with pytest.raises(KeyError):
+        record["missing"]
+    with pytest.raises(IndexError):
+        store[3]
+
+
+def test_slice_keeps_ids_and_owns_its_sources():
+    store = make_store()
+    sliced = store[1:]
+
+    assert len(sliced) == 2
+    assert sliced.ids() == store.ids(1)
+
+    sliced.add("neurology.pdf", "Migraine is a primary headache disorder.")
+    sliced.add("cardiology.pdf", "Statins lower cholesterol.")
+
+    assert store.sources == ["cardiology.pdf", "oncology.pdf"]
+    assert store.ids() == ["cardiology.pdf_chunk_0", "cardiology.pdf_chunk_1", "oncology.pdf_chunk_0"]
+    assert sliced.ids(2) == ["neurology.pdf_chunk_0", "cardiology.pdf_chunk_2"]
+    assert store.add("cardiology.pdf", "Beta blockers slow the heart.") == 3
+    assert store.ids(3) == ["cardiology.pdf_chunk_2"]
+
+
+def test_extend_remaps_source_ids():
+    first = make_store()
+    other = ChunkStore()
+    other.add("oncology.pdf", "Chemotherapy targets dividing cells.", chunk_index=1)
+    other.add("neurology.pdf", "Migraine is a primary headache disorder.")
+
+    first.extend(other)
+
+    assert first.sources == ["cardiology.pdf", "oncology.pdf", "neurology.pdf"]
+    assert first.ids(3) == ["oncology.pdf_chunk_1", "neurology.pdf_chunk_0"]
+    first.add("oncology.pdf", "Radiotherapy uses ionising radiation.")
+    assert first.ids(5) == ["oncology.pdf_chunk_2"]
+
+
+def test_dict_round_trip():
+    dicts = make_store().to_dicts()
+    store = as_chunk_store(dicts)
+
+    assert store.to_dicts() == dicts
+    assert as_chunk_store(store) is store
+
+
+def test_chunk_position_prefers_metadata_then_id():
+    assert chunk_position({"id": "x_chunk_3", "metadata": {"source": "x", "chunk_index": 7}}) == ("x", 7)
+    assert chunk_position({"id": "x_chunk_3", "metadata": {"source": "x"}}) == ("x", 3)
+    assert chunk_position({"id": "no-index", "metadata": {"source": "x"}}) == ("x", None)
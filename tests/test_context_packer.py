@@ -0,0 +1,96 @@
+from context_packer import MIN_TRUNCATED_TOKENS, merge_spans, pack_context
+from token_utils import count_tokens
+
+
+def chunk(source, index, content, score=0.5):
+    return {
+        "id": f"{source}_chunk_{index}",
+        "content": content,
+        "metadata": {"source": source, "chunk_index": index},
+        "similarity_score": score,
+    }
+
+
+SHARED = "blood pressure is measured in millimetres of mercury"
+
+
+def test_overlapping_chunks_merge_without_duplicate_text():
+    chunks = [
+        chunk("a.pdf", 0, "Hypertension means raised " + SHARED, 0.9),
+        chunk("a.pdf", 1, SHARED + " and read as two numbers.", 0.7),
+    ]
+
+    [span] = merge_spans(chunks)
+
+    assert span["content"] == "Hypertension means raised " + SHARED + " and read as two numbers."
+    assert span["ids"] == ["a.pdf_chunk_0", "a.pdf_chunk_1"]
+    assert span["relevance"] == 0.9
+
+
+def test_adjacent_chunks_merge_in_document_order():
+    chunks = [chunk("a.pdf", 3, "Second part.", 0.8), chunk("a.pdf", 2, "First part.", 0.6)]
+
+    [span] = merge_spans(chunks)
+
+    assert span["content"] == "First part. Second part."
+    assert span["rank"] == 0
+
+
+def test_distant_chunks_and_other_sources_stay_separate():
+    chunks = [
+        chunk("a.pdf", 0, "Alpha.", 0.9),
+        chunk("b.pdf", 1, "Beta.", 0.8),
+        chunk("a.pdf", 5, "Gamma.", 0.7),
+    ]
+
+    spans = merge_spans(chunks)
+
+    assert [span["content"] for span in spans] == ["Alpha.", "Beta.", "Gamma."]
+
+
+def test_everything_fits_within_budget():
+    chunks = [chunk("a.pdf", 0, "Alpha.", 0.9), chunk("b.pdf", 0, "Beta.", 0.8)]
+
+    context, stats = pack_context(chunks, token_budget=1000)
+
+    assert context.startswith("[Source 1: a.pdf | relevance 0.90]\nAlpha.")
+    assert "[Source 2: b.pdf | relevance 0.80]\nBeta." in context
+    assert stats["spans_used"] == 2
+    assert stats["spans_truncated"] == stats["spans_dropped"] == 0
+    assert 0 < stats["context_tokens"] <= 1000
+
+
+def test_context_never_exceeds_budget_and_truncates_last_span():
+    long_text = "Diabetes affects glucose metabolism. " * 200
+    chunks = [chunk("a.pdf", 0, "Short first span.", 0.9), chunk("b.pdf", 0, long_text, 0.8)]
+    budget = 300
+
+    context, stats = pack_context(chunks, token_budget=budget)
+
+    assert stats["context_tokens"] <= budget
+    assert stats["spans_used"] == 2
+    assert stats["spans_truncated"] == 1
+    assert context.endswith(" ...")
+    assert len(context) < len(long_text)
+
+
+def test_span_is_dropped_when_too_little_budget_remains():
+    first = "Cardiology overview. " * 40
+    chunks = [chunk("a.pdf", 0, first, 0.9), chunk("b.pdf", 0, "Oncology overview. " * 40, 0.8)]
+    budget = count_tokens(first) + 20 + MIN_TRUNCATED_TOKENS // 2
+
+    context, stats = pack_context(chunks, token_budget=budget)
+
+    assert stats["spans_used"] == 1
+    assert stats["spans_dropped"] == 1
+    assert "Oncology" not in context
+
+
+def test_merged_chunks_are_reported():
+    chunks = [chunk("a.pdf", 0, "One.", 0.9), chunk("a.pdf", 1, "Two.", 0.8), chunk("b.pdf", 0, "Three.", 0.7)]
+
+    _, stats = pack_context(chunks, token_budget=1000)
+
+    assert stats["chunks"] == 3
+    assert stats["spans"] == 2
+    assert stats["merged_chunks"] == 1
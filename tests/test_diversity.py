@@ -0,0 +1,62 @@
+import numpy as np
+
+from diversity import mmr_select, redundant_tokens
+
+# Candidates 0 and 1 are near-duplicates; 2 and 3 point elsewhere
+VECTORS = np.array([
+    [1.0, 0.0, 0.0],
+    [0.99, 0.05, 0.0],
+    [0.0, 1.0, 0.0],
+    [0.0, 0.0, 1.0],
+])
+RELEVANCE = np.array([0.9, 0.85, 0.6, 0.3])
+
+
+def test_lambda_one_keeps_relevance_order():
+    assert mmr_select(RELEVANCE, VECTORS, k=4, lambda_=1.0) == [0, 1, 2, 3]
+
+
+def test_near_duplicates_are_pushed_down():
+    assert mmr_select(RELEVANCE, VECTORS, k=2, lambda_=0.5) == [0, 2]
+
+
+def test_k_larger_than_candidates_returns_all():
+    assert sorted(mmr_select(RELEVANCE, VECTORS, k=10)) == [0, 1, 2, 3]
+
+
+def test_empty_selection():
+    assert mmr_select(RELEVANCE, VECTORS, k=0) == []
+    assert mmr_select(np.array([]), np.zeros((0, 3)), k=3) == []
+
+
+def test_equal_relevance_is_handled():
+    selected = mmr_select(np.ones(4), VECTORS, k=3, lambda_=0.5)
+
+    assert len(selected) == 3
+    assert not {0, 1} <= set(selected)
+
+
+def test_per_source_cap():
+    sources = ["a.pdf", "a.pdf", "a.pdf", "b.pdf"]
+
+    selected = mmr_select(RELEVANCE, VECTORS, k=3, lambda_=1.0, sources=sources, max_per_source=1)
+
+    assert selected == [0, 3]
+
+
+def test_per_source_cap_allows_up_to_the_limit():
+    sources = ["a.pdf", "a.pdf", "a.pdf", "b.pdf"]
+
+    selected = mmr_select(RELEVANCE, VECTORS, k=4, lambda_=1.0, sources=sources, max_per_source=2)
+
+    assert selected == [0, 1, 3]
+
+
+def test_redundant_tokens_counts_later_duplicates():
+    texts = ["first chunk text", "first chunk text again", "something else"]
+
+    duplicates, tokens = redundant_tokens(texts, VECTORS[:3])
+
+    assert duplicates == 1
+    assert tokens > 0
+    assert redundant_tokens([], np.zeros((0, 3))) == (0, 0)
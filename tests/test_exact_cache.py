@@ -0,0 +1,219 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from exact_cache import ExactResponseCache, normalize_question
+
+
+def always(result):
+    return True
+
+
+def test_normalize_question():
+    assert normalize_question("  What is   HYPERTENSION? ") == "what is hypertension?"
+    assert normalize_question(None) == ""
+
+
+def test_make_key_depends_on_every_part():
+    key = ExactResponseCache.make_key("q", "user", "gen-1")
+
+    assert key == ExactResponseCache.make_key("q", "user", "gen-1")
+    assert key != ExactResponseCache.make_key("q", "user", "gen-2")
+
+
+def test_second_request_is_a_hit():
+    cache = ExactResponseCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"response": "answer"}
+
+    assert cache.get_or_compute("k", "g", compute, always) == ({"response": "answer"}, "miss")
+    assert cache.get_or_compute("k", "g", compute, always) == ({"response": "answer"}, "hit")
+    assert len(calls) == 1
+
+
+def test_concurrent_identical_requests_compute_once():
+    cache = ExactResponseCache()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {"response": "answer"}
+
+    with ThreadPoolExecutor(4) as pool:
+        leader = pool.submit(cache.get_or_compute, "k", "g", compute, always)
+        started.wait(5)
+        followers = [pool.submit(cache.get_or_compute, "k", "g", compute, always) for _ in range(3)]
+        time.sleep(0.05)
+        release.set()
+        results = [leader.result(5)] + [f.result(5) for f in followers]
+
+    assert len(calls) == 1
+    assert [status for _, status in results] == ["miss", "collapsed", "collapsed", "collapsed"]
+    assert all(result == {"response": "answer"} for result, _ in results)
+    assert cache.get_stats()["in_flight"] == 0
+
+
+def test_async_followers_share_the_leader():
+    cache = ExactResponseCache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"response": "answer"}
+
+    async def run():
+        return await asyncio.gather(*[cache.aget_or_compute("k", "g", compute, always) for _ in range(5)])
+
+    results = asyncio.run(run())
+
+    assert len(calls) == 1
+    assert sorted(status for _, status in results) == ["collapsed"] * 4 + ["miss"]
+
+
+def test_leader_failure_reaches_followers_and_is_not_cached():
+    cache = ExactResponseCache()
+    started = threading.Event()
+
+    def failing():
+        started.set()
+        time.sleep(0.05)
+        raise RuntimeError("provider down")
+
+    with ThreadPoolExecutor(2) as pool:
+        leader = pool.submit(cache.get_or_compute, "k", "g", failing, always)
+        started.wait(5)
+        follower = pool.submit(cache.get_or_compute, "k", "g", failing, always)
+        for future in (leader, follower):
+            with pytest.raises(RuntimeError, match="provider down"):
+                future.result(5)
+
+    result, status = cache.get_or_compute("k", "g", lambda: {"response": "ok"}, always)
+    assert (result, status) == ({"response": "ok"}, "miss")
+
+
+def test_uncacheable_results_are_recomputed():
+    cache = ExactResponseCache()
+
+    def cacheable(result):
+        return result["success"]
+
+    cache.get_or_compute("k", "g", lambda: {"success": False}, cacheable)
+    result, status = cache.get_or_compute("k", "g", lambda: {"success": True}, cacheable)
+
+    assert status == "miss"
+    assert result == {"success": True}
+
+
+def test_new_generation_invalidates_everything():
+    cache = ExactResponseCache()
+    cache.get_or_compute("k1", "gen-1", lambda: {"response": "a"}, always)
+    cache.get_or_compute("k2", "gen-1", lambda: {"response": "b"}, always)
+
+    result, status = cache.get_or_compute("k1", "gen-2", lambda: {"response": "fresh"}, always)
+
+    assert (result, status) == ({"response": "fresh"}, "miss")
+    stats = cache.get_stats()
+    assert stats["invalidations"] == 1
+    assert stats["entries"] == 1
+
+
+def test_result_of_an_older_generation_is_not_stored():
+    cache = ExactResponseCache()
+    status, future = cache.begin("k", "gen-1")
+    assert status == "miss"
+
+    # Ingestion finished while the answer was being generated
+    cache.get_or_compute("other", "gen-2", lambda: {"response": "x"}, always)
+    cache.finish("k", "gen-1", future, {"response": "stale"}, always)
+
+    assert future.result() == {"response": "stale"}
+    assert cache.get_or_compute("k", "gen-2", lambda: {"response": "new"}, always)[1] == "miss"
+
+
+def test_entries_expire_and_lru_is_bounded():
+    cache = ExactResponseCache(max_entries=2, ttl_seconds=0.05)
+    for key in ("a", "b", "c"):
+        cache.get_or_compute(key, "g", lambda: {"response": key}, always)
+
+    assert cache.get_stats()["entries"] == 2
+    assert cache.get_or_compute("a", "g", lambda: {"response": "a2"}, always)[1] == "miss"
+
+    time.sleep(0.06)
+    assert cache.get_or_compute("c", "g", lambda: {"response": "c2"}, always) == ({"response": "c2"}, "miss")
+
+
+def test_cancelled_leader_lets_followers_recompute():
+    cache = ExactResponseCache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"response": "answer"}
+
+    async def run():
+        leader = asyncio.ensure_future(cache.aget_or_compute("k", "g", compute, always))
+        await asyncio.sleep(0.01)
+        follower = asyncio.ensure_future(cache.aget_or_compute("k", "g", compute, always))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    result, status = asyncio.run(run())
+
+    assert result == {"response": "answer"}
+    assert status == "miss"
+    assert len(calls) == 2
+    assert cache.get_stats()["in_flight"] == 0
+
+
+def test_cancelled_follower_does_not_affect_the_leader():
+    cache = ExactResponseCache()
+
+    async def compute():
+        await asyncio.sleep(0.05)
+        return {"response": "answer"}
+
+    async def run():
+        leader = asyncio.ensure_future(cache.aget_or_compute("k", "g", compute, always))
+        await asyncio.sleep(0.01)
+        follower = asyncio.ensure_future(cache.aget_or_compute("k", "g", compute, always))
+        await asyncio.sleep(0.01)
+        follower.cancel()
+        return await leader
+
+    assert asyncio.run(run()) == ({"response": "answer"}, "miss")
+
+
+def test_interrupted_sync_leader_lets_followers_recompute():
+    class Interrupted(BaseException):
+        pass
+
+    cache = ExactResponseCache()
+    started = threading.Event()
+
+    def interrupted():
+        started.set()
+        time.sleep(0.05)
+        raise Interrupted()
+
+    with ThreadPoolExecutor(2) as pool:
+        leader = pool.submit(cache.get_or_compute, "k", "g", interrupted, always)
+        started.wait(5)
+        follower = pool.submit(cache.get_or_compute, "k", "g", lambda: {"response": "ok"}, always)
+        with pytest.raises(Interrupted):
+            leader.result(5)
+        assert follower.result(5) == ({"response": "ok"}, "miss")
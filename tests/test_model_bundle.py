@@ -0,0 +1,93 @@
+import json
+import os
+
+import pytest
+
+import model_bundle
+from model_bundle import MANIFEST_NAME, _sha256, apply_offline_mode, verify_model
+
+
+@pytest.fixture
+def bundle(tmp_path):
+    model_dir = tmp_path / "org__model"
+    model_dir.mkdir()
+    weights = model_dir / "weights.bin"
+    weights.write_bytes(b"0123456789")
+    stat = weights.stat()
+    manifest = {"models": {"org/model": {"path": model_dir.name, "files": {
+        "weights.bin": {"sha256": _sha256(weights), "size": stat.st_size, "mtime": stat.st_mtime},
+    }}}}
+    (tmp_path / MANIFEST_NAME).write_text(json.dumps(manifest), encoding="utf-8")
+    return tmp_path, weights
+
+
+@pytest.fixture
+def hashed(monkeypatch):
+    paths = []
+    real = model_bundle._sha256
+
+    def counting(path):
+        paths.append(path)
+        return real(path)
+    monkeypatch.setattr(model_bundle, "_sha256", counting)
+    return paths
+
+
+def corrupt(weights):
+    """Same size, different content."""
+    stat = weights.stat()
+    weights.write_bytes(b"9876543210")
+    return stat
+
+
+def test_unchanged_files_are_not_hashed_by_default(bundle, hashed, monkeypatch):
+    monkeypatch.delenv("MEDBOT_BUNDLE_VERIFY", raising=False)
+    directory, _ = bundle
+
+    assert verify_model("org/model", directory)
+    assert hashed == []
+
+
+def test_files_with_a_new_mtime_are_hashed(bundle, hashed):
+    directory, weights = bundle
+    stat = weights.stat()
+    os.utime(weights, (stat.st_atime, stat.st_mtime + 10))
+
+    assert verify_model("org/model", directory)
+    assert hashed == [weights]
+
+    corrupt(weights)
+    assert not verify_model("org/model", directory)
+
+
+def test_full_hash_catches_corruption_with_the_recorded_mtime(bundle, hashed, monkeypatch):
+    directory, weights = bundle
+    stat = corrupt(weights)
+    os.utime(weights, (stat.st_atime, stat.st_mtime))
+
+    assert verify_model("org/model", directory)
+    monkeypatch.setenv("MEDBOT_BUNDLE_VERIFY", "sha256")
+    assert not verify_model("org/model", directory)
+
+
+def test_missing_or_truncated_files_fail(bundle):
+    directory, weights = bundle
+    weights.write_bytes(b"short")
+
+    assert not verify_model("org/model", directory)
+    weights.unlink()
+    assert not verify_model("org/model", directory)
+    assert not verify_model("org/other", directory)
+
+
+def test_apply_offline_mode(monkeypatch):
+    for name in ("HF_HUB_OFFLINE", "TRANSFORMERS_OFFLINE", "HF_DATASETS_OFFLINE"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("MEDBOT_OFFLINE", "0")
+    assert not apply_offline_mode()
+    assert "HF_HUB_OFFLINE" not in os.environ
+
+    monkeypatch.setenv("MEDBOT_OFFLINE", "1")
+    assert apply_offline_mode()
+    assert os.environ["HF_HUB_OFFLINE"] == "1"
+    assert os.environ["TRANSFORMERS_OFFLINE"] == "1"
@@ -0,0 +1,63 @@
+import pytest
+
+from prompt_templates import COMPREHENSIVE_PROMPT_VERSION, PromptTemplate, get_prompt_template
+from token_utils import count_tokens
+
+
+@pytest.fixture
+def template():
+    return PromptTemplate("test", "v1", "Static instructions.", {"standard": "1. Overview", "general": "1. Answer"})
+
+
+def test_render_orders_static_prefix_before_request_parts(template):
+    prompt, _ = template.render("standard", "CONTEXT", "What is asthma?", "Earlier: hello", "Sam")
+
+    assert prompt.startswith("Static instructions.\n**SECTIONS TO COVER:**\n1. Overview\n\n")
+    positions = [prompt.index(part) for part in ("CONTEXT", "Earlier: hello", "What is asthma?", "Sam")]
+    assert positions == sorted(positions)
+
+
+def test_prefix_is_identical_across_requests(template):
+    first, _ = template.render("standard", "context one", "question one", user_name="A")
+    second, _ = template.render("standard", "context two", "question two")
+    prefix = template.prefix + template.sections["standard"]
+
+    assert first.startswith(prefix)
+    assert second.startswith(prefix)
+
+
+def test_optional_parts_are_omitted(template):
+    prompt, stats = template.render("general", "ctx", "q")
+
+    assert "USER NAME" not in prompt
+    assert stats["tokens"]["history"] == 0
+    assert stats["tokens"]["user"] == 0
+
+
+def test_stats_break_down_tokens(template):
+    prompt, stats = template.render("standard", "some medical context", "What is asthma?", "history", "Sam")
+    tokens = stats["tokens"]
+
+    assert stats["template"] == "test@v1"
+    assert stats["sections"] == "standard"
+    assert tokens["instructions"] == count_tokens("Static instructions.")
+    assert tokens["total"] == sum(value for name, value in tokens.items() if name != "total")
+    assert stats["static_prefix_tokens"] == tokens["system"] + tokens["instructions"] + tokens["sections"]
+
+
+def test_unknown_section_set_is_rejected(template):
+    with pytest.raises(ValueError, match="Unknown section set"):
+        template.render("missing", "ctx", "q")
+
+
+def test_comprehensive_template_is_shared_and_versioned():
+    template = get_prompt_template("comprehensive")
+
+    assert get_prompt_template("comprehensive") is template
+    assert template.template_id == f"comprehensive@{COMPREHENSIVE_PROMPT_VERSION}"
+    assert {"standard", "detail", "general"} <= set(template.sections)
+
+
+def test_unknown_template_name_is_rejected():
+    with pytest.raises(ValueError, match="Unknown prompt template"):
+        get_prompt_template("missing")
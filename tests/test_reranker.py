@@ -0,0 +1,82 @@
+import pytest
+
+import reranker
+from reranker import CrossEncoderReranker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def perf_counter(self):
+        return self.now
+
+
+class FakeCrossEncoder:
+    """Scores a pair by the number in its chunk text; each pair takes ms_per_pair of clock time."""
+
+    def __init__(self, clock, ms_per_pair):
+        self.clock = clock
+        self.ms_per_pair = ms_per_pair
+        self.batches = []
+
+    def predict(self, pairs, batch_size):
+        self.batches.append(len(pairs))
+        self.clock.now += len(pairs) * self.ms_per_pair / 1000
+        return [float(content) for _, content in pairs]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(reranker.time, "perf_counter", clock.perf_counter)
+    # No real model is loaded; tests plug in FakeCrossEncoder
+    monkeypatch.setattr(CrossEncoderReranker, "_load_model", lambda self: None)
+    return clock
+
+
+def make_reranker(clock, ms_per_pair, budget_ms, batch_size=4):
+    rr = CrossEncoderReranker(model_name="fake", batch_size=batch_size, time_budget_ms=budget_ms)
+    rr.model = FakeCrossEncoder(clock, ms_per_pair)
+    return rr
+
+
+def chunks(n):
+    return [{"id": f"c{i}", "content": str(i)} for i in range(n)]
+
+
+def test_rerank_orders_by_score_and_caches(clock):
+    rr = make_reranker(clock, ms_per_pair=1, budget_ms=100)
+
+    ranked, stats = rr.rerank("What is asthma?", chunks(6), top_k=3)
+
+    assert [chunk["id"] for chunk in ranked] == ["c5", "c4", "c3"]
+    assert stats["reranked"] and stats["scored"] == 6
+
+    _, stats = rr.rerank("what is  ASTHMA?", chunks(6), top_k=3)
+    assert stats["cache_hits"] == 6
+    assert stats["scored"] == 0
+
+
+def test_batches_shrink_to_fit_the_remaining_budget(clock):
+    rr = make_reranker(clock, ms_per_pair=10, budget_ms=75)
+
+    ranked, stats = rr.rerank("q", chunks(12), top_k=3)
+
+    # First batch is full (no latency measured yet), then only what still fits
+    assert rr.model.batches == [4, 3]
+    assert stats["rerank_ms"] <= 75
+    assert stats["budget_exhausted"]
+    assert [chunk["id"] for chunk in ranked] == ["c0", "c1", "c2"]
+
+
+def test_no_batch_starts_once_the_budget_cannot_fit_a_pair(clock):
+    rr = make_reranker(clock, ms_per_pair=10, budget_ms=1000)
+    rr.rerank("warm up", chunks(4), top_k=1)
+    rr.time_budget_ms = 5
+
+    _, stats = rr.rerank("q", chunks(4), top_k=1)
+
+    assert rr.model.batches == [4]
+    assert stats["scored"] == 0
+    assert stats["budget_exhausted"]
@@ -0,0 +1,154 @@
+import asyncio
+
+import pytest
+
+import resilience
+from resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    ProviderHTTPError,
+    RetryPolicy,
+    acall_with_retry,
+    call_with_retry,
+    is_retryable,
+    retry_after_seconds,
+)
+
+
+@pytest.fixture
+def no_sleep(monkeypatch):
+    delays = []
+    monkeypatch.setattr(resilience.time, "sleep", delays.append)
+    return delays
+
+
+def flaky(failures, error=None):
+    """Callable that raises error for the first failures calls, then returns 'ok'."""
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise error or ProviderHTTPError("test", 503)
+        return "ok"
+    fn.calls = calls
+    return fn
+
+
+def test_retryable_errors():
+    assert is_retryable(ProviderHTTPError("test", 429))
+    assert is_retryable(ProviderHTTPError("test", 503))
+    assert is_retryable(TimeoutError())
+    assert is_retryable(ConnectionError())
+    assert not is_retryable(ProviderHTTPError("test", 400))
+    assert not is_retryable(CircuitOpenError("open"))
+    assert not is_retryable(ValueError("bad input"))
+
+
+def test_retry_after_headers():
+    assert retry_after_seconds(ProviderHTTPError("test", 429, {"retry-after": "3"})) == 3.0
+    assert retry_after_seconds(ProviderHTTPError("test", 429, {"retry-after-ms": "250"})) == 0.25
+    assert retry_after_seconds(ProviderHTTPError("test", 429)) is None
+
+
+def test_backoff_is_jittered_and_capped():
+    policy = RetryPolicy(max_retries=10, base_delay=0.5, max_delay=2.0)
+    error = ProviderHTTPError("test", 503)
+
+    for attempt in range(6):
+        delay = policy.next_delay(attempt, error)
+        assert 0 <= delay <= min(2.0, 0.5 * 2 ** attempt)
+
+
+def test_policy_gives_up():
+    policy = RetryPolicy(max_retries=2, max_retry_after=5)
+
+    assert policy.next_delay(2, ProviderHTTPError("test", 503)) is None
+    assert policy.next_delay(0, ProviderHTTPError("test", 400)) is None
+    assert policy.next_delay(0, ProviderHTTPError("test", 429, {"retry-after": "4"})) == 4.0
+    assert policy.next_delay(0, ProviderHTTPError("test", 429, {"retry-after": "60"})) is None
+
+
+def test_policy_from_env_prefers_provider_settings(monkeypatch):
+    monkeypatch.setenv("MEDBOT_LLM_MAX_RETRIES", "4")
+    monkeypatch.setenv("MEDBOT_AZURE_MAX_RETRIES", "1")
+
+    assert RetryPolicy.from_env("azure").max_retries == 1
+    assert RetryPolicy.from_env("groq").max_retries == 4
+
+
+def test_transient_failures_are_retried(no_sleep):
+    fn = flaky(2)
+    breaker = CircuitBreaker("test", failure_threshold=5)
+
+    assert call_with_retry(fn, RetryPolicy(max_retries=2), breaker) == "ok"
+    assert len(fn.calls) == 3
+    assert len(no_sleep) == 2
+    assert breaker.get_status()["consecutive_failures"] == 0
+
+
+def test_retries_run_out(no_sleep):
+    fn = flaky(5)
+
+    with pytest.raises(ProviderHTTPError):
+        call_with_retry(fn, RetryPolicy(max_retries=2), CircuitBreaker("test"))
+    assert len(fn.calls) == 3
+
+
+def test_permanent_errors_are_not_retried(no_sleep):
+    fn = flaky(1, ProviderHTTPError("test", 400))
+    breaker = CircuitBreaker("test", failure_threshold=1)
+
+    with pytest.raises(ProviderHTTPError):
+        call_with_retry(fn, RetryPolicy(max_retries=3), breaker)
+    assert len(fn.calls) == 1
+    assert breaker.state == "closed"
+
+
+def test_async_retry():
+    fn = flaky(1)
+
+    async def call():
+        return fn()
+
+    result = asyncio.run(acall_with_retry(call, RetryPolicy(max_retries=1, base_delay=0.001), CircuitBreaker("test")))
+
+    assert result == "ok"
+    assert len(fn.calls) == 2
+
+
+def test_breaker_opens_fails_fast_and_recovers(no_sleep, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(resilience.time, "time", lambda: now[0])
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_seconds=30)
+    policy = RetryPolicy(max_retries=0)
+
+    for _ in range(2):
+        with pytest.raises(ProviderHTTPError):
+            call_with_retry(flaky(1), policy, breaker)
+    assert breaker.state == "open"
+
+    fn = flaky(0)
+    with pytest.raises(CircuitOpenError):
+        call_with_retry(fn, policy, breaker)
+    assert fn.calls == []
+
+    now[0] += 31
+    assert call_with_retry(fn, policy, breaker) == "ok"
+    assert breaker.state == "closed"
+    assert breaker.get_status()["opened"] == 1
+
+
+def test_half_open_allows_a_single_probe(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(resilience.time, "time", lambda: now[0])
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=10)
+    breaker.record_failure()
+
+    now[0] += 11
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    assert not breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == "open"
@@ -0,0 +1,130 @@
+import numpy as np
+import pytest
+
+import semantic_cache
+from semantic_cache import SemanticAnswerCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(semantic_cache.time, "time", clock.time)
+    return clock
+
+
+def unit(*values):
+    return np.array(values, dtype=np.float32)
+
+
+def test_similar_question_in_scope_hits(tmp_path, clock):
+    cache = SemanticAnswerCache(str(tmp_path), threshold=0.95)
+    cache.store(unit(1, 0, 0), "scope-a", {"response": "answer"})
+
+    payload, similarity = cache.lookup(unit(1, 0.05, 0), "scope-a")
+
+    assert payload == {"response": "answer"}
+    assert similarity >= 0.95
+    assert cache.lookup(unit(0, 1, 0), "scope-a") is None
+    assert cache.lookup(unit(1, 0, 0), "scope-b") is None
+    assert cache.get_stats()["hits"] == 1
+    assert cache.get_stats()["misses"] == 2
+
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    cache = SemanticAnswerCache(str(tmp_path), ttl_seconds=60)
+    cache.store(unit(1, 0, 0), "scope", {"response": "answer"})
+
+    clock.now += 59
+    assert cache.lookup(unit(1, 0, 0), "scope") is not None
+
+    clock.now += 2
+    assert cache.lookup(unit(1, 0, 0), "scope") is None
+    assert cache.get_stats()["expired"] == 1
+    assert cache.get_stats()["entries"] == 0
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path, clock):
+    cache = SemanticAnswerCache(str(tmp_path), max_entries=2)
+    cache.store(unit(1, 0, 0), "scope", {"response": "x"})
+    clock.now += 1
+    cache.store(unit(0, 1, 0), "scope", {"response": "y"})
+    clock.now += 1
+    cache.lookup(unit(1, 0, 0), "scope")  # x is now more recently used than y
+    clock.now += 1
+
+    cache.store(unit(0, 0, 1), "scope", {"response": "z"})
+
+    assert cache.get_stats()["evictions"] == 1
+    assert cache.lookup(unit(0, 1, 0), "scope") is None
+    assert cache.lookup(unit(1, 0, 0), "scope")[0] == {"response": "x"}
+    assert cache.lookup(unit(0, 0, 1), "scope")[0] == {"response": "z"}
+
+
+def test_cache_is_persisted(tmp_path, clock):
+    cache = SemanticAnswerCache(str(tmp_path))
+    cache.store(unit(1, 0, 0), "scope", {"response": "answer"})
+    cache.flush()
+
+    reloaded = SemanticAnswerCache(str(tmp_path))
+
+    assert reloaded.lookup(unit(1, 0, 0), "scope")[0] == {"response": "answer"}
+
+
+def test_saves_are_debounced(tmp_path, clock):
+    cache = SemanticAnswerCache(str(tmp_path), save_interval=3600)
+    cache.store(unit(1, 0, 0), "scope", {"response": "answer"})
+
+    assert SemanticAnswerCache(str(tmp_path)).get_stats()["entries"] == 0
+
+    cache.flush()
+    assert SemanticAnswerCache(str(tmp_path)).get_stats()["entries"] == 1
+
+
+def test_every_change_is_saved_without_an_interval(tmp_path, clock):
+    cache = SemanticAnswerCache(str(tmp_path), save_interval=0)
+    cache.store(unit(1, 0, 0), "scope", {"response": "answer"})
+
+    assert SemanticAnswerCache(str(tmp_path)).get_stats()["entries"] == 1
+
+
+def test_last_use_survives_a_restart(tmp_path, clock):
+    cache = SemanticAnswerCache(str(tmp_path), max_entries=2, save_interval=0)
+    cache.store(unit(1, 0, 0), "scope", {"response": "x"})
+    clock.now += 1
+    cache.store(unit(0, 1, 0), "scope", {"response": "y"})
+    clock.now += 1
+    cache.lookup(unit(1, 0, 0), "scope")  # x is now more recently used than y
+    clock.now += 1
+
+    reloaded = SemanticAnswerCache(str(tmp_path), max_entries=2)
+    reloaded.store(unit(0, 0, 1), "scope", {"response": "z"})
+
+    assert reloaded.lookup(unit(0, 1, 0), "scope") is None
+    assert reloaded.lookup(unit(1, 0, 0), "scope")[0] == {"response": "x"}
+
+
+def test_dimension_change_resets_the_cache(tmp_path, clock):
+    cache = SemanticAnswerCache(str(tmp_path))
+    cache.store(unit(1, 0, 0), "scope", {"response": "old"})
+
+    assert cache.lookup(unit(1, 0), "scope") is None
+
+    cache.store(unit(1, 0), "scope", {"response": "new"})
+    assert cache.get_stats()["entries"] == 1
+
+
+def test_clear(tmp_path, clock):
+    cache = SemanticAnswerCache(str(tmp_path))
+    cache.store(unit(1, 0, 0), "scope", {"response": "answer"})
+    cache.clear()
+
+    assert cache.lookup(unit(1, 0, 0), "scope") is None
+    assert SemanticAnswerCache(str(tmp_path)).get_stats()["entries"] == 0
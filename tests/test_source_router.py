@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from source_router import SourceCentroids
+
+
+def make_centroids(tmp_path):
+    centroids = SourceCentroids(str(tmp_path / "centroids.npz"))
+    centroids.add(["a_0", "a_1", "b_0"], ["a.pdf", "a.pdf", "b.pdf"],
+                  np.array([[1, 0, 0], [0, 1, 0], [0, 0, 1]], dtype=np.float32))
+    return centroids
+
+
+def test_centroids_are_source_means(tmp_path):
+    centroids = make_centroids(tmp_path)
+
+    assert centroids.sources == ["a.pdf", "b.pdf"]
+    assert centroids.counts.tolist() == [2, 1]
+    assert centroids.centroids[0] == pytest.approx(np.array([1, 1, 0]) / np.sqrt(2))
+    assert centroids.route(np.array([0, 0, 1], dtype=np.float32), 1) == ["b.pdf"]
+
+
+def test_re_ingested_chunks_are_not_counted_twice(tmp_path):
+    centroids = make_centroids(tmp_path)
+
+    centroids.add(["a_1", "a_2"], ["a.pdf", "a.pdf"], np.array([[0, 1, 0], [0, 1, 0]], dtype=np.float32))
+
+    assert centroids.counts.tolist() == [3, 1]
+    assert centroids.sums[0].tolist() == [1, 2, 0]
+    centroids.add(["a_0", "a_1", "a_2", "b_0"], ["a.pdf", "a.pdf", "a.pdf", "b.pdf"], np.ones((4, 3), dtype=np.float32))
+    assert centroids.counts.tolist() == [3, 1]
+    assert centroids.sums[0].tolist() == [1, 2, 0]
+
+
+def test_counted_ids_survive_a_restart(tmp_path):
+    make_centroids(tmp_path).save()
+
+    reloaded = SourceCentroids(str(tmp_path / "centroids.npz"))
+    reloaded.add(["a_0", "b_0"], ["a.pdf", "b.pdf"], np.ones((2, 3), dtype=np.float32))
+
+    assert reloaded.counts.tolist() == [2, 1]
+    assert len(reloaded) == 2
+
+
+def test_file_without_ids_is_dropped_for_a_rebuild(tmp_path):
+    path = tmp_path / "centroids.npz"
+    np.savez(path, sums=np.ones((1, 3)), counts=np.array([1]), sources='["a.pdf"]')
+
+    assert len(SourceCentroids(str(path))) == 0
+
+
+def test_rebuild_from_collection(tmp_path):
+    class Collection:
+        def count(self):
+            return 2
+
+        def get(self, include, limit, offset):
+            return {"ids": ["a_0", "b_0"][offset:offset + limit],
+                    "metadatas": [{"source": "a.pdf"}, {"source": "b.pdf"}][offset:offset + limit],
+                    "embeddings": [[1, 0, 0], [0, 0, 1]][offset:offset + limit]}
+
+    centroids = make_centroids(tmp_path)
+    centroids.rebuild_from_collection(Collection(), page_size=1)
+
+    assert centroids.counts.tolist() == [1, 1]
+    assert centroids.ids == ["a_0", "b_0"]